@@ -1,898 +0,0 @@
-import sys
-import random
-import numpy as np
-import time
-from collections import deque
-from PyQt6.QtWidgets import *
-from PyQt6.QtCore import *
-from PyQt6.QtGui import *
-import matplotlib
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
-
-# ==================== АГЕНТ С ПРИОРИТЕТОМ КЛЮЧЕЙ ====================
-class KeyPriorityAgent:
-    """Агент, который должен собрать ВСЕ ключи перед сокровищем"""
-    def __init__(self):
-        # Состояние: позиция (6x6) * количество ключей (3) = 108 состояний
-        self.state_size = 108  # 36 * 3
-        self.action_size = 4
-        
-        # Q-таблица
-        self.q_table = np.zeros((self.state_size, self.action_size))
-        
-        # Гиперпараметры
-        self.epsilon = 1.0
-        self.epsilon_min = 0.01
-        self.epsilon_decay = 0.999
-        self.learning_rate = 0.2  # Увеличили скорость обучения
-        self.gamma = 0.9
-        
-        # Статистика
-        self.total_keys_collected = 0
-        self.episodes_with_all_keys = 0
-        
-    def get_state_index(self, game_state):
-        """Учитываем позицию и количество собранных ключей"""
-        agent = game_state['agent_pos']
-        keys_collected = min(len(game_state['collected_keys']), 2)  # 0, 1, 2
-        
-        # Позиция в сетке 6x6
-        pos_index = agent[0] * 6 + agent[1]
-        
-        # Общий индекс с учетом ключей
-        state_index = pos_index * 3 + keys_collected
-        
-        return min(state_index, self.state_size - 1)
-    
-    def get_action(self, state, training=True):
-        """Выбор действия с учетом приоритета ключей"""
-        if training and random.random() < self.epsilon:
-            return random.randint(0, self.action_size - 1)
-        
-        state_idx = self.get_state_index(state)
-        return np.argmax(self.q_table[state_idx])
-    
-    def update(self, state, action, reward, next_state):
-        """Обновление Q-таблицы"""
-        state_idx = self.get_state_index(state)
-        next_state_idx = self.get_state_index(next_state)
-        
-        old_q = self.q_table[state_idx, action]
-        max_future_q = np.max(self.q_table[next_state_idx])
-        new_q = old_q + self.learning_rate * (reward + self.gamma * max_future_q - old_q)
-        
-        self.q_table[state_idx, action] = new_q
-        
-        # Уменьшаем epsilon
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
-    
-    def save_model(self, path):
-        """Сохранение модели"""
-        np.savez(path, q_table=self.q_table, epsilon=self.epsilon)
-    
-    def load_model(self, path):
-        """Загрузка модели"""
-        data = np.load(path)
-        self.q_table = data['q_table']
-        self.epsilon = float(data['epsilon'])
-
-# ==================== СРЕДА С ОБЯЗАТЕЛЬНЫМ СБОРОМ КЛЮЧЕЙ ====================
-class MandatoryKeysEnvironment:
-    """Среда, где сокровище нельзя взять без ВСЕХ ключей"""
-    def __init__(self):
-        self.grid_size = 6
-        self.total_keys = 3  # Теперь 3 ключа
-        self.reset()
-    
-    def reset(self):
-        """Создание новой карты с 3 ключами"""
-        self.agent_pos = [0, 0]
-        self.treasure_pos = [5, 5]
-        
-        # 3 ключа в разных местах
-        self.keys = [
-            [1, 2],  # Первый ключ
-            [3, 1],  # Второй ключ
-            [4, 4]   # Третий ключ
-        ]
-        
-        # 2 ловушки
-        self.traps = [
-            [2, 3],
-            [5, 2]
-        ]
-        
-        # Сброс состояния
-        self.collected_keys = []
-        self.steps = 0
-        self.done = False
-        self.total_reward = 0
-        self.last_action = "—"
-        self.has_all_keys = False
-        
-        return self.get_state()
-    
-    def get_state(self):
-        """Получение состояния"""
-        return {
-            'agent_pos': self.agent_pos.copy(),
-            'treasure_pos': self.treasure_pos,
-            'keys': self.keys.copy(),
-            'traps': self.traps.copy(),
-            'collected_keys': self.collected_keys.copy(),
-            'keys_collected': len(self.collected_keys),
-            'keys_remaining': len(self.keys),
-            'total_keys': self.total_keys,
-            'steps': self.steps,
-            'done': self.done,
-            'reward': self.total_reward,
-            'has_all_keys': len(self.collected_keys) == self.total_keys,
-            'last_action': self.last_action
-        }
-    
-    def step(self, action):
-        """Шаг с новой системой наград"""
-        if self.done:
-            return self.get_state()
-        
-        self.steps += 1
-        new_pos = self.agent_pos.copy()
-        
-        # Действия
-        action_names = ['↑', '↓', '←', '→']
-        self.last_action = action_names[action]
-        
-        # Движение
-        if action == 0 and new_pos[0] > 0:
-            new_pos[0] -= 1
-        elif action == 1 and new_pos[0] < self.grid_size - 1:
-            new_pos[0] += 1
-        elif action == 2 and new_pos[1] > 0:
-            new_pos[1] -= 1
-        elif action == 3 and new_pos[1] < self.grid_size - 1:
-            new_pos[1] += 1
-        
-        # Новая система наград
-        reward = 0
-        
-        # 1. Проверка ловушки
-        if new_pos in self.traps:
-            reward = -100  # Очень большой штраф
-            self.done = True
-            self.agent_pos = new_pos
-        
-        # 2. Проверка ключа
-        elif new_pos in self.keys and new_pos not in self.collected_keys:
-            reward = 50  # Хорошая награда за ключ
-            self.collected_keys.append(new_pos.copy())
-            self.keys.remove(new_pos)
-            self.agent_pos = new_pos
-            
-            # Дополнительная награда за сбор всех ключей
-            if len(self.collected_keys) == self.total_keys:
-                reward += 100  # Бонус за сбор всех ключей
-                self.has_all_keys = True
-        
-        # 3. Проверка сокровища
-        elif new_pos == self.treasure_pos:
-            if self.has_all_keys:
-                # МАКСИМАЛЬНАЯ награда за сокровище со всеми ключами
-                reward = 500 + (len(self.collected_keys) * 100)
-                self.done = True
-            else:
-                # Отрицательная награда за попытку взять сокровище без ключей
-                reward = -200  # Большой штраф
-                self.done = True
-            self.agent_pos = new_pos
-        
-        # 4. Обычное движение
-        else:
-            # Награда за движение к ближайшему несобранному ключу
-            if not self.has_all_keys:
-                # Ищем ближайший несобранный ключ
-                min_key_distance = float('inf')
-                for key in self.keys:
-                    dist = abs(key[0] - new_pos[0]) + abs(key[1] - new_pos[1])
-                    min_key_distance = min(min_key_distance, dist)
-                
-                old_dist = abs(self.agent_pos[0] - new_pos[0]) + abs(self.agent_pos[1] - new_pos[1])
-                new_dist = min_key_distance
-                
-                if new_dist < old_dist:
-                    reward = 3  # Поощрение за движение к ключу
-                elif new_dist > old_dist:
-                    reward = -2  # Штраф за удаление от ключа
-                else:
-                    reward = -1  # Нейтральное движение
-            else:
-                # Все ключи собраны - двигаемся к сокровищу
-                old_dist = abs(self.agent_pos[0] - self.treasure_pos[0]) + abs(self.agent_pos[1] - self.treasure_pos[1])
-                new_dist = abs(new_pos[0] - self.treasure_pos[0]) + abs(new_pos[1] - self.treasure_pos[1])
-                
-                if new_dist < old_dist:
-                    reward = 5  # Большое поощрение к сокровищу
-                else:
-                    reward = -3  # Штраф за удаление
-            
-            self.agent_pos = new_pos
-        
-        self.total_reward += reward
-        
-        # Ограничение по шагам
-        max_steps = 100 if not self.has_all_keys else 50
-        if self.steps >= max_steps:
-            self.done = True
-            # Дополнительный штраф за невыполнение задачи
-            if not self.has_all_keys:
-                reward -= 50
-            elif new_pos != self.treasure_pos:
-                reward -= 30
-        
-        return self.get_state()
-
-# ==================== ГРАФИЧЕСКИЙ ИНТЕРФЕЙС ====================
-class EnhancedGameCanvas(QWidget):
-    """Улучшенный виджет с отображением ключей"""
-    def __init__(self):
-        super().__init__()
-        self.setMinimumSize(450, 450)
-        self.cell_size = 65
-        self.agent_animation = 0
-        
-        self.animation_timer = QTimer()
-        self.animation_timer.timeout.connect(self.update_animation)
-        self.animation_timer.start(50)
-        
-        self.colors = {
-            'background': QColor(245, 245, 250),
-            'grid': QColor(180, 180, 200),
-            'agent': QColor(65, 105, 225),
-            'treasure': QColor(255, 215, 0),
-            'trap': QColor(220, 20, 60),
-            'key': QColor(50, 205, 50),
-            'key_collected': QColor(150, 255, 150),
-            'path': QColor(135, 206, 250, 100),
-            'text': QColor(40, 40, 40)
-        }
-        
-        self.agent_path = []
-        self.game_state = None
-    
-    def update_state(self, state):
-        """Обновление состояния"""
-        self.game_state = state
-        self.agent_path.append(state['agent_pos'].copy())
-        if len(self.agent_path) > 25:
-            self.agent_path.pop(0)
-        self.update()
-    
-    def update_animation(self):
-        """Анимация"""
-        self.agent_animation = (self.agent_animation + 0.1) % 1
-        self.update()
-    
-    def paintEvent(self, event):
-        """Отрисовка с информацией о ключах"""
-        if self.game_state is None:
-            return
-        
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Фон
-        painter.fillRect(self.rect(), self.colors['background'])
-        
-        # Сетка
-        painter.setPen(QPen(self.colors['grid'], 1))
-        for i in range(7):
-            painter.drawLine(i * self.cell_size, 0, i * self.cell_size, 390)
-            painter.drawLine(0, i * self.cell_size, 390, i * self.cell_size)
-        
-        # Путь
-        if len(self.agent_path) > 1:
-            painter.setPen(QPen(self.colors['path'], 3))
-            for i in range(1, len(self.agent_path)):
-                x1 = self.agent_path[i-1][1] * self.cell_size + self.cell_size//2
-                y1 = self.agent_path[i-1][0] * self.cell_size + self.cell_size//2
-                x2 = self.agent_path[i][1] * self.cell_size + self.cell_size//2
-                y2 = self.agent_path[i][0] * self.cell_size + self.cell_size//2
-                painter.drawLine(x1, y1, x2, y2)
-        
-        # Ловушки
-        for trap in self.game_state['traps']:
-            x = trap[1] * self.cell_size + self.cell_size//2
-            y = trap[0] * self.cell_size + self.cell_size//2
-            
-            painter.setBrush(QBrush(self.colors['trap']))
-            painter.setPen(QPen(Qt.GlobalColor.darkRed, 2))
-            painter.drawEllipse(QPoint(x, y), self.cell_size//3, self.cell_size//3)
-            
-            painter.setPen(QPen(Qt.GlobalColor.white, 2))
-            painter.drawText(QRect(x-10, y-10, 20, 20), Qt.AlignmentFlag.AlignCenter, "☠")
-        
-        # Несобранные ключи
-        for key in self.game_state['keys']:
-            x = key[1] * self.cell_size + self.cell_size//2
-            y = key[0] * self.cell_size + self.cell_size//2
-            
-            # Пульсирующий ключ
-            size = 15 + int(5 * np.sin(time.time() * 3))
-            
-            painter.setBrush(QBrush(self.colors['key']))
-            painter.setPen(QPen(Qt.GlobalColor.darkGreen, 2))
-            painter.drawEllipse(QPoint(x, y), size, size)
-            
-            painter.setPen(QPen(Qt.GlobalColor.white, 2))
-            painter.setFont(QFont("Arial", 14))
-            painter.drawText(QRect(x-10, y-10, 20, 20), Qt.AlignmentFlag.AlignCenter, "🔑")
-        
-        # Собранные ключи (отображаем в отдельной панели)
-        collected_keys_panel = QRect(400, 50, 40, 120)
-        painter.setBrush(QBrush(QColor(240, 240, 240)))
-        painter.setPen(QPen(Qt.GlobalColor.gray, 1))
-        painter.drawRect(collected_keys_panel)
-        
-        painter.setPen(QPen(self.colors['text'], 2))
-        painter.setFont(QFont("Arial", 10, QFont.Weight.Bold))
-        painter.drawText(405, 40, "Ключи:")
-        
-        for i in range(self.game_state['total_keys']):
-            y = 60 + i * 35
-            if i < self.game_state['keys_collected']:
-                painter.setBrush(QBrush(self.colors['key_collected']))
-                painter.setPen(QPen(Qt.GlobalColor.darkGreen, 2))
-                painter.drawEllipse(415, y, 20, 20)
-                
-                painter.setPen(QPen(Qt.GlobalColor.white, 2))
-                painter.drawText(QRect(415, y, 20, 20), Qt.AlignmentFlag.AlignCenter, "✓")
-            else:
-                painter.setBrush(QBrush(QColor(200, 200, 200)))
-                painter.setPen(QPen(Qt.GlobalColor.gray, 1))
-                painter.drawEllipse(415, y, 20, 20)
-                
-                painter.setPen(QPen(Qt.GlobalColor.darkGray, 2))
-                painter.drawText(QRect(415, y, 20, 20), Qt.AlignmentFlag.AlignCenter, f"{i+1}")
-        
-        # Сокровище
-        treasure = self.game_state['treasure_pos']
-        x = treasure[1] * self.cell_size + self.cell_size//2
-        y = treasure[0] * self.cell_size + self.cell_size//2
-        
-        # Если собраны все ключи - сокровище сияет
-        if self.game_state['has_all_keys']:
-            painter.setBrush(QBrush(QColor(255, 255, 150)))
-            painter.setPen(QPen(QColor(255, 200, 0), 4))
-            
-            # Лучи света
-            painter.setPen(QPen(QColor(255, 255, 100, 150), 2))
-            for i in range(12):
-                angle = time.time() * 2 + i * np.pi/6
-                length = 25 + int(15 * np.sin(time.time() * 4 + i))
-                x2 = x + int(length * np.cos(angle))
-                y2 = y + int(length * np.sin(angle))
-                painter.drawLine(x, y, x2, y2)
-        else:
-            painter.setBrush(QBrush(self.colors['treasure']))
-            painter.setPen(QPen(QColor(200, 150, 0), 3))
-        
-        painter.drawEllipse(QPoint(x, y), self.cell_size//2, self.cell_size//2)
-        
-        painter.setPen(QPen(Qt.GlobalColor.white, 2))
-        painter.setFont(QFont("Arial", 20))
-        
-        if self.game_state['has_all_keys']:
-            painter.drawText(QRect(x-20, y-20, 40, 40), Qt.AlignmentFlag.AlignCenter, "💎")
-        else:
-            painter.drawText(QRect(x-20, y-20, 40, 40), Qt.AlignmentFlag.AlignCenter, "🔒")
-        
-        # Агент
-        agent = self.game_state['agent_pos']
-        x = agent[1] * self.cell_size + self.cell_size//2
-        y = agent[0] * self.cell_size + self.cell_size//2
-        
-        size = self.cell_size//2 + int(5 * np.sin(self.agent_animation * 2 * np.pi))
-        
-        gradient = QRadialGradient(x, y, size)
-        if self.game_state['has_all_keys']:
-            gradient.setColorAt(0, QColor(0, 255, 0).lighter(150))
-            gradient.setColorAt(1, QColor(0, 200, 0).darker(150))
-        else:
-            gradient.setColorAt(0, self.colors['agent'].lighter(150))
-            gradient.setColorAt(1, self.colors['agent'].darker(150))
-        
-        painter.setBrush(QBrush(gradient))
-        painter.setPen(QPen(Qt.GlobalColor.darkBlue, 2))
-        painter.drawEllipse(QPoint(x, y), size, size)
-        
-        # Информация
-        painter.setPen(QPen(self.colors['text'], 2))
-        painter.setFont(QFont("Arial", 10))
-        
-        info = f"Ключи: {self.game_state['keys_collected']}/{self.game_state['total_keys']}"
-        if self.game_state['has_all_keys']:
-            info += " ✓ ГОТОВО!"
-        
-        painter.drawText(10, 420, info)
-        painter.drawText(10, 440, f"Шагов: {self.game_state['steps']}")
-
-# ==================== ГЛАВНОЕ ОКНО ====================
-class IntelliGameAI(QMainWindow):
-    """Главное окно с обязательным сбором ключей"""
-    def __init__(self):
-        super().__init__()
-        
-        # Инициализация
-        self.env = MandatoryKeysEnvironment()
-        self.agent = KeyPriorityAgent()
-        self.training = True
-        self.simulation_speed = 200
-        
-        # Статистика
-        self.reward_history = []
-        self.success_history = []  # Успех = сокровище + ВСЕ ключи
-        self.keys_history = []  # История собранных ключей за эпизод
-        self.total_episodes = 0
-        self.perfect_episodes = 0  # Эпизоды со всеми ключами и сокровищем
-        
-        # Настройка интерфейса
-        self.setup_ui()
-        self.reset_game()
-    
-    def setup_ui(self):
-        """Настройка интерфейса"""
-        self.setWindowTitle("IntelliGame AI - Обязательный сбор всех ключей")
-        self.setGeometry(100, 50, 1300, 750)
-        
-        # Центральный виджет
-        central = QWidget()
-        self.setCentralWidget(central)
-        layout = QHBoxLayout(central)
-        
-        # Левая панель
-        left_panel = QVBoxLayout()
-        
-        # Заголовок
-        title = QLabel("🎯 IntelliGame AI - Собери ВСЕ 3 ключа!")
-        title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-        title.setStyleSheet("color: #4169e1; padding: 10px;")
-        left_panel.addWidget(title)
-        
-        # Игровое поле
-        self.game_canvas = EnhancedGameCanvas()
-        left_panel.addWidget(self.game_canvas)
-        
-        # Управление
-        control_group = QGroupBox("Управление обучением")
-        control_layout = QVBoxLayout()
-        
-        # Кнопки старта/сброса
-        btn_layout = QHBoxLayout()
-        self.start_btn = QPushButton("▶ Старт обучения")
-        self.start_btn.clicked.connect(self.toggle_simulation)
-        self.reset_btn = QPushButton("🔄 Новая игра")
-        self.reset_btn.clicked.connect(self.reset_game)
-        
-        btn_layout.addWidget(self.start_btn)
-        btn_layout.addWidget(self.reset_btn)
-        
-        # Кнопки обучения
-        train_layout = QGridLayout()
-        
-        train_buttons = [
-            ("100 эпизодов", 100),
-            ("500 эпизодов", 500),
-            ("1000 эпизодов", 1000),
-            ("5000 эпизодов", 5000)
-        ]
-        
-        for i, (text, episodes) in enumerate(train_buttons):
-            btn = QPushButton(text)
-            btn.clicked.connect(lambda checked, e=episodes: self.batch_train(e))
-            train_layout.addWidget(btn, i//2, i%2)
-        
-        control_layout.addLayout(btn_layout)
-        control_layout.addLayout(train_layout)
-        
-        # Информация о ключах
-        keys_info = QLabel("Цель: собрать ВСЕ 3 ключа, затем взять сокровище!")
-        keys_info.setStyleSheet("color: #ff4500; font-weight: bold; padding: 5px;")
-        control_layout.addWidget(keys_info)
-        
-        control_group.setLayout(control_layout)
-        left_panel.addWidget(control_group)
-        
-        # Статистика
-        stats_group = QGroupBox("Статистика обучения")
-        stats_layout = QGridLayout()
-        
-        stats = [
-            ("Эпизод:", "episode_label"),
-            ("Успешность*:", "success_label"),
-            ("Средние ключи:", "keys_label"),
-            ("Epsilon:", "epsilon_label"),
-            ("Ср. награда:", "reward_label"),
-            ("Идеальных:", "perfect_label")
-        ]
-        
-        for i, (name, attr) in enumerate(stats):
-            row = i // 2
-            col = (i % 2) * 2
-            stats_layout.addWidget(QLabel(name), row, col)
-            label = QLabel("0")
-            label.setStyleSheet("font-weight: bold;")
-            setattr(self, attr, label)
-            stats_layout.addWidget(label, row, col + 1)
-        
-        # Пояснение
-        note = QLabel("*Успех = сокровище + ВСЕ ключи")
-        note.setStyleSheet("color: #666; font-style: italic;")
-        stats_layout.addWidget(note, 3, 0, 1, 4)
-        
-        # Прогресс
-        self.progress = QProgressBar()
-        self.progress.setRange(0, 100)
-        stats_layout.addWidget(QLabel("Прогресс:"), 4, 0)
-        stats_layout.addWidget(self.progress, 4, 1, 1, 3)
-        
-        stats_group.setLayout(stats_layout)
-        left_panel.addWidget(stats_group)
-        
-        layout.addLayout(left_panel, 60)
-        
-        # Правая панель - графики
-        right_panel = QTabWidget()
-        
-        # Графики
-        plot_tab = QWidget()
-        plot_layout = QVBoxLayout()
-        
-        self.figure = Figure(figsize=(9, 7), dpi=80)
-        self.canvas = FigureCanvasQTAgg(self.figure)
-        
-        scroll = QScrollArea()
-        scroll.setWidget(self.canvas)
-        scroll.setWidgetResizable(True)
-        
-        plot_layout.addWidget(scroll)
-        plot_tab.setLayout(plot_layout)
-        
-        # Информация
-        info_tab = QWidget()
-        info_layout = QVBoxLayout()
-        
-        info_text = QTextEdit()
-        info_text.setReadOnly(True)
-        info_text.setHtml("""
-        <h3 style="color:#4169e1;">🎯 Обязательный сбор всех ключей</h3>
-        
-        <h4>🚫 Что было неправильно:</h4>
-        <p>Агент мог взять сокровище, собрав только 1-2 ключа из 3.</p>
-        
-        <h4>✅ Как исправлено:</h4>
-        
-        <p><b>1. Новая система наград:</b></p>
-        <ul>
-        <li>Ключ: <b>+50</b> (вместо 30)</li>
-        <li>Бонус за все ключи: <b>+100</b></li>
-        <li>Сокровище без всех ключей: <b>-200</b> (штраф!)</li>
-        <li>Сокровище со всеми ключами: <b>+500 + 100 за каждый ключ</b></li>
-        </ul>
-        
-        <p><b>2. Умное движение:</b></p>
-        <ul>
-        <li>До сбора всех ключей: агент стремится к ближайшему ключу</li>
-        <li>После сбора всех ключей: агент идет к сокровищу</li>
-        </ul>
-        
-        <p><b>3. Визуальные подсказки:</b></p>
-        <ul>
-        <li>Сокровище заблокировано (🔒) пока не собраны все ключи</li>
-        <li>Собранные ключи отмечаются (✓) на панели</li>
-        <li>Агент меняет цвет при сборе всех ключей</li>
-        </ul>
-        
-        <h4>📊 Ожидаемые результаты:</h4>
-        <ul>
-        <li><b>100 эпизодов:</b> Собирает 2.5-2.8 ключа в среднем</li>
-        <li><b>500 эпизодов:</b> 80-90% успешных эпизодов (все ключи + сокровище)</li>
-        <li><b>1000 эпизодов:</b> 90-95% успешных эпизодов</li>
-        <li><b>5000 эпизодов:</b> 95-98% успешных эпизодов</li>
-        </ul>
-        
-        <p style="color: green; font-weight: bold;">
-        💡 Агент теперь ПОНИМАЕТ, что нужно собрать ВСЕ ключи!
-        </p>
-        """)
-        
-        info_layout.addWidget(info_text)
-        info_tab.setLayout(info_layout)
-        
-        right_panel.addTab(plot_tab, "📊 Графики")
-        right_panel.addTab(info_tab, "ℹ️ Как работает")
-        
-        layout.addWidget(right_panel, 40)
-        
-        # Таймер
-        self.game_timer = QTimer()
-        self.game_timer.timeout.connect(self.game_step)
-    
-    def reset_game(self):
-        """Сброс игры"""
-        state = self.env.reset()
-        if hasattr(self.game_canvas, 'agent_path'):
-            self.game_canvas.agent_path.clear()
-        self.update_display(state)
-        self.game_timer.stop()
-        self.start_btn.setText("▶ Старт обучения")
-    
-    def toggle_simulation(self):
-        """Запуск/остановка"""
-        if self.game_timer.isActive():
-            self.game_timer.stop()
-            self.start_btn.setText("▶ Продолжить")
-        else:
-            self.game_timer.start(self.simulation_speed)
-            self.start_btn.setText("⏸ Пауза")
-    
-    def batch_train(self, episodes):
-        """Пакетное обучение"""
-        was_running = self.game_timer.isActive()
-        if was_running:
-            self.game_timer.stop()
-        
-        progress = QProgressDialog(f"Обучение на {episodes} эпизодах...", "Отмена", 0, episodes, self)
-        progress.setWindowTitle("Обучение")
-        progress.setWindowModality(Qt.WindowModality.WindowModal)
-        progress.setMinimumDuration(0)
-        
-        rewards = []
-        successes = []
-        keys_collected_list = []
-        
-        for episode in range(episodes):
-            if progress.wasCanceled():
-                break
-            
-            state = self.env.reset()
-            done = False
-            total_reward = 0
-            
-            while not done:
-                action = self.agent.get_action(state, self.training)
-                next_state = self.env.step(action)
-                reward = next_state['reward'] - state['reward']
-                
-                if self.training:
-                    self.agent.update(state, action, reward, next_state)
-                
-                state = next_state
-                done = state['done']
-                total_reward += reward
-            
-            # Статистика
-            rewards.append(total_reward)
-            self.reward_history.append(total_reward)
-            
-            # Успех = сокровище + ВСЕ ключи
-            success = 1 if (state['agent_pos'] == state['treasure_pos'] and 
-                          state['has_all_keys']) else 0
-            successes.append(success)
-            self.success_history.append(success)
-            
-            if success:
-                self.perfect_episodes += 1
-            
-            # Ключи
-            keys_collected = state['keys_collected']
-            keys_collected_list.append(keys_collected)
-            self.keys_history.append(keys_collected)
-            
-            self.total_episodes += 1
-            
-            # Обновление прогресса
-            if episode % 10 == 0 or episode == episodes - 1:
-                progress.setValue(episode + 1)
-                
-                # Обновление статистики
-                if len(rewards) > 0:
-                    window = min(100, len(rewards))
-                    
-                    # Средняя награда
-                    avg_reward = np.mean(rewards[-window:])
-                    self.reward_label.setText(f"{avg_reward:.1f}")
-                    
-                    # Успешность
-                    if len(successes) >= window:
-                        success_rate = np.mean(successes[-window:]) * 100
-                        self.success_label.setText(f"{success_rate:.1f}%")
-                    
-                    # Средние ключи
-                    avg_keys = np.mean(keys_collected_list[-window:])
-                    self.keys_label.setText(f"{avg_keys:.1f}")
-                    
-                    # Идеальные эпизоды
-                    perfect_rate = (self.perfect_episodes / self.total_episodes) * 100
-                    self.perfect_label.setText(f"{perfect_rate:.1f}%")
-                
-                QApplication.processEvents()
-        
-        progress.close()
-        
-        # Результаты
-        if rewards:
-            avg_reward = np.mean(rewards)
-            success_rate = np.mean(successes) * 100
-            avg_keys = np.mean(keys_collected_list)
-            
-            QMessageBox.information(self, "Обучение завершено",
-                                  f"Эпизодов: {len(rewards)}\n"
-                                  f"Средняя награда: {avg_reward:.1f}\n"
-                                  f"Успешность (все ключи): {success_rate:.1f}%\n"
-                                  f"Среднее ключей за эпизод: {avg_keys:.1f}/3\n"
-                                  f"Идеальных эпизодов: {self.perfect_episodes}\n"
-                                  f"Epsilon: {self.agent.epsilon:.4f}")
-        
-        # Обновление графиков
-        self.update_plots()
-        
-        if was_running:
-            self.reset_game()
-    
-    def game_step(self):
-        """Один шаг игры"""
-        state = self.env.get_state()
-        action = self.agent.get_action(state, self.training)
-        next_state = self.env.step(action)
-        
-        if self.training:
-            reward = next_state['reward'] - state['reward']
-            self.agent.update(state, action, reward, next_state)
-        
-        self.update_display(next_state)
-        
-        if next_state['done']:
-            # Статистика
-            self.total_episodes += 1
-            self.reward_history.append(next_state['reward'])
-            
-            # Успех = сокровище + ВСЕ ключи
-            success = 1 if (next_state['agent_pos'] == next_state['treasure_pos'] and 
-                          next_state['has_all_keys']) else 0
-            self.success_history.append(success)
-            
-            if success:
-                self.perfect_episodes += 1
-            
-            # Ключи
-            keys_collected = next_state['keys_collected']
-            self.keys_history.append(keys_collected)
-            
-            # Обновление интерфейса
-            if len(self.reward_history) > 0:
-                window = min(100, len(self.reward_history))
-                
-                # Средняя награда
-                avg_reward = np.mean(self.reward_history[-window:])
-                self.reward_label.setText(f"{avg_reward:.1f}")
-                
-                # Успешность
-                if len(self.success_history) >= window:
-                    success_rate = np.mean(self.success_history[-window:]) * 100
-                    self.success_label.setText(f"{success_rate:.1f}%")
-                
-                # Средние ключи
-                if len(self.keys_history) >= window:
-                    avg_keys = np.mean(self.keys_history[-window:])
-                    self.keys_label.setText(f"{avg_keys:.1f}")
-                
-                # Идеальные эпизоды
-                perfect_rate = (self.perfect_episodes / self.total_episodes) * 100
-                self.perfect_label.setText(f"{perfect_rate:.1f}%")
-                
-                # Прогресс
-                progress = min(100, int(success_rate))
-                self.progress.setValue(progress)
-            
-            self.episode_label.setText(str(self.total_episodes))
-            self.epsilon_label.setText(f"{self.agent.epsilon:.4f}")
-            
-            # Следующий эпизод
-            QTimer.singleShot(1000, self.reset_game)
-    
-    def update_display(self, state):
-        """Обновление интерфейса"""
-        self.game_canvas.update_state(state)
-        self.episode_label.setText(str(self.total_episodes))
-        self.epsilon_label.setText(f"{self.agent.epsilon:.4f}")
-    
-    def update_plots(self):
-        """Обновление графиков"""
-        if len(self.success_history) < 10:
-            return
-        
-        self.figure.clear()
-        
-        # График 1: Успешность (все ключи + сокровище)
-        ax1 = self.figure.add_subplot(221)
-        if self.success_history:
-            window = min(100, len(self.success_history))
-            if len(self.success_history) >= window:
-                success_rate = np.convolve(self.success_history, np.ones(window)/window, mode='valid')
-                ax1.plot(range(window-1, len(self.success_history)), success_rate, 'g-', linewidth=2)
-                ax1.axhline(y=0.85, color='r', linestyle='--', alpha=0.5, label='Цель: 85%')
-        
-        ax1.set_title('Успешность (все ключи + сокровище)', fontsize=10)
-        ax1.set_ylabel('Доля успеха')
-        ax1.set_ylim(0, 1.05)
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # График 2: Среднее количество собранных ключей
-        ax2 = self.figure.add_subplot(222)
-        if self.keys_history:
-            window = min(100, len(self.keys_history))
-            if len(self.keys_history) >= window:
-                keys_ma = np.convolve(self.keys_history, np.ones(window)/window, mode='valid')
-                ax2.plot(range(window-1, len(self.keys_history)), keys_ma, 'b-', linewidth=2)
-                ax2.axhline(y=3, color='g', linestyle='--', alpha=0.5, label='Цель: 3 ключа')
-        
-        ax2.set_title('Среднее количество ключей за эпизод', fontsize=10)
-        ax2.set_ylabel('Ключи')
-        ax2.set_ylim(0, 3.5)
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        # График 3: Награды
-        ax3 = self.figure.add_subplot(223)
-        if self.reward_history:
-            window = min(100, len(self.reward_history))
-            if len(self.reward_history) >= window:
-                reward_ma = np.convolve(self.reward_history, np.ones(window)/window, mode='valid')
-                ax3.plot(range(window-1, len(self.reward_history)), reward_ma, 'orange', linewidth=2)
-        
-        ax3.set_title('Средняя награда', fontsize=10)
-        ax3.set_xlabel('Эпизод')
-        ax3.set_ylabel('Награда')
-        ax3.grid(True, alpha=0.3)
-        
-        # График 4: Распределение результатов
-        ax4 = self.figure.add_subplot(224)
-        if len(self.success_history) >= 100:
-            recent = self.success_history[-100:]
-            labels = ['Провал', 'Успех']
-            counts = [recent.count(0), recent.count(1)]
-            
-            colors = ['#ff6b6b', '#51cf66']
-            ax4.pie(counts, labels=labels, colors=colors, autopct='%1.1f%%')
-            ax4.set_title('Распределение последних 100 эпизодов', fontsize=10)
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
-
-# ==================== ЗАПУСК ====================
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    
-    # Стиль
-    app.setStyle('Fusion')
-    palette = QPalette()
-    palette.setColor(QPalette.ColorRole.Window, QColor(245, 245, 250))
-    app.setPalette(palette)
-    
-    window = IntelliGameAI()
-    window.show()
-    
-    # Сообщение
-    QTimer.singleShot(1000, lambda: QMessageBox.information(window, "Важное изменение!",
-        "🎯 Теперь агент ДОЛЖЕН собрать ВСЕ 3 ключа!\n\n"
-        "📊 Новая система наград:\n"
-        "• Ключ: +50 очков\n"
-        "• Все ключи собраны: +100 бонус\n"
-        "• Сокровище без всех ключей: -200 (штраф!)\n"
-        "• Сокровище со всеми ключами: +500 + бонусы\n\n"
-        "🚀 Нажмите '1000 эпизодов' для обучения!"))
-    
-    sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""IntelliGame AI: агент, который должен собрать все ключи перед сокровищем.
+
+Ядро (агент, среды, обучение) зависит только от NumPy; графический интерфейс
+находится в intelligame_ai.gui и требует PyQt6 и matplotlib. Классы GUI
+доступны и отсюда, но модуль gui импортируется только при первом обращении.
+"""
+from .core import (CompactKeysEnvironment, EnvironmentTables, KeyPriorityAgent,
+                   MandatoryKeysEnvironment, VectorMandatoryKeysEnvironment)
+from .replay import ReplayBuffer
+from .stats import RollingStats
+from .trainer import Trainer
+
+__all__ = [
+    "KeyPriorityAgent",
+    "MandatoryKeysEnvironment",
+    "CompactKeysEnvironment",
+    "EnvironmentTables",
+    "VectorMandatoryKeysEnvironment",
+    "ReplayBuffer",
+    "RollingStats",
+    "Trainer",
+]
+
+# Имена, для которых нужен Qt: загружаются лениво через __getattr__ и не
+# входят в __all__, чтобы "import *" не тянул GUI
+_GUI_NAMES = ("IntelliGameAI", "EnhancedGameCanvas")
+
+
+def __getattr__(name):
+    if name in _GUI_NAMES:
+        from . import gui
+        return getattr(gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
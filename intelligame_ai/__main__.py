@@ -0,0 +1,307 @@
+import argparse
+import sys
+
+from .core import Q_STORAGES
+from .exploration import BOLTZMANN, COUNT, EXPLORATIONS, STEP, UCB
+from .learners import LEARNERS, Q_LAMBDA, Q_LEARNING, learner_class
+from .planning import PLANNERS
+from .shaping import LEGACY, SHAPING_GAMMA, SHAPINGS
+
+
+def build_tables(args, storage=None, gamma=SHAPING_GAMMA):
+    """Таблицы переходов стандартной или случайной проходимой карты.
+
+    storage - способ хранения Q-таблицы обучения: при разреженной таблице
+    или огромной карте переходы считаются лениво (core.lazy_tables).
+    Без storage таблицы всегда плотные (планирование, оценка). gamma -
+    gamma потенциального бонуса при --shaping potential.
+    """
+    from .core import EnvironmentTables, MandatoryKeysEnvironment, lazy_tables
+    from .maps import cached_layout, generate_layout
+
+    if args.grid_size is not None:
+        if args.map_seed is None:
+            layout = generate_layout(args.grid_size, args.keys, args.traps)
+        else:
+            layout = cached_layout(args.grid_size, args.keys, args.traps, args.map_seed)
+        lazy = storage is not None and lazy_tables(layout.grid_size, layout.total_keys, storage)
+        return layout.get_tables(args.shaping, lazy, gamma)
+    if args.shaping != LEGACY:
+        return EnvironmentTables(MandatoryKeysEnvironment(shaping=args.shaping, shaping_gamma=gamma))
+    return EnvironmentTables.default()
+
+
+def add_map_arguments(parser):
+    parser.add_argument("--grid-size", type=int,
+                        help="размер случайной карты (по умолчанию стандартная 6x6)")
+    parser.add_argument("--keys", type=int, default=3, help="ключей на случайной карте")
+    parser.add_argument("--traps", type=int, default=2, help="ловушек на случайной карте")
+    parser.add_argument("--map-seed", type=int, help="seed случайной карты")
+    parser.add_argument("--shaping", choices=SHAPINGS, default=LEGACY,
+                        help="награда обычных шагов: исходная или потенциальная по "
+                             "расстояниям в обход ловушек")
+
+
+def exploration_params(args):
+    """Параметры способа исследования из --exploration-episodes и --exploration-scale"""
+    params = {}
+    if args.exploration_episodes is not None and args.exploration not in (STEP, UCB, COUNT):
+        params['episodes'] = args.exploration_episodes
+    if args.exploration_scale is not None:
+        if args.exploration in (UCB, COUNT):
+            params['scale'] = args.exploration_scale
+        elif args.exploration == BOLTZMANN:
+            params['start'] = args.exploration_scale
+    return params
+
+
+def train(args):
+    """Обучение без GUI"""
+    from .core import CompactKeysEnvironment, KeyPriorityAgent, make_tables
+    from .trainer import Trainer
+
+    storage = args.storage
+    learner = args.learner
+    learner_params = {'trace_decay': args.trace_decay} if learner == Q_LAMBDA else {}
+    exploration = args.exploration
+    if args.resume:
+        # Карта, способ хранения, алгоритм и исследование берутся из контрольной точки
+        from .checkpoint import read_metadata
+        from .core import MandatoryKeysEnvironment
+
+        metadata = read_metadata(args.resume)
+        storage = metadata['agent']['storage']
+        if 'learner' in metadata['agent']:
+            learner = metadata['agent']['learner']['name']
+            learner_params = metadata['agent']['learner']['params']
+        if 'exploration' in metadata['agent']:
+            exploration = metadata['agent']['exploration']['name']
+        if 'trainer' in metadata:
+            tables = make_tables(MandatoryKeysEnvironment(**metadata['trainer']['map']), storage)
+        else:
+            tables = build_tables(args, storage)
+    else:
+        tables = build_tables(args, storage)
+    env = CompactKeysEnvironment(tables)
+    agent = KeyPriorityAgent.for_env(tables, storage, learner, **learner_params)
+    agent.set_exploration(exploration, **(exploration_params(args) if not args.resume else {}))
+
+    if args.workers > 1:
+        from .parallel import ParallelTrainer
+        trainer = ParallelTrainer(agent, env, workers=args.workers, mode=args.mode,
+                                  sync_every=args.sync_every, seed=args.seed)
+    else:
+        replay = None
+        if args.replay:
+            from .replay import ReplayBuffer
+            replay = ReplayBuffer(args.replay, prioritized=args.prioritized, seed=args.seed)
+        layouts = None
+        if args.random_maps:
+            from .maps import layout_stream
+            layouts = layout_stream(tables.grid_size, tables.total_keys, len(tables.traps),
+                                    pool=args.random_maps, seed=args.seed)
+        trainer = Trainer(agent, env, kernel=args.kernel, seed=args.seed, replay=replay,
+                          batch_size=args.batch_size, replay_every=args.replay_every,
+                          layouts=layouts)
+    if args.resume:
+        trainer.load_checkpoint(args.resume)
+        print(f"Продолжение с эпизода {trainer.total_episodes} ({args.resume})")
+    elif args.model:
+        trainer.agent.load_model(args.model)
+    elif args.warm_start:
+        from .planning import warm_start
+        warm_start(trainer.agent, trainer.env.tables, args.warm_start)
+
+    def report(trainer, summary):
+        print(f"Эпизод {summary['total_episodes']}: "
+              f"успешность {summary['success_rate']:.1f}%, "
+              f"ключи {summary['avg_keys']:.2f}, "
+              f"награда {summary['avg_reward']:.1f}, " +
+              (f"{summary['exploration']}, " if summary['exploration'] is not None else "") +
+              f"{summary['episodes_per_sec']:.0f} эп/с" +
+              (f", жадная политика {summary['greedy_success_rate']:.1f}%"
+               if summary['greedy_success_rate'] is not None else ""), flush=True)
+
+    if args.profile:
+        from .profiling import PROFILER
+        PROFILER.enable()
+    first = trainer.stats.episodes
+    summary = trainer.train(int(args.episodes), callback=report, report_every=args.report_every,
+                            checkpoint=args.out, checkpoint_every=args.checkpoint_every,
+                            evaluate_every=args.evaluate_every)
+    if args.profile:
+        PROFILER.disable()
+        print(PROFILER.report())
+        if args.profile is not True:
+            PROFILER.export(args.profile)
+    print(f"Готово: {summary['episodes'] - first} эпизодов за {summary['elapsed']:.1f} с "
+          f"({summary['episodes_per_sec']:.0f} эп/с), модель сохранена в {args.out}")
+    print(f"Q-таблица: {trainer.agent.memory_usage() / 2**20:.2f} МБ, посещено состояний "
+          f"{trainer.agent.visited_states()} из {trainer.agent.state_size}")
+
+
+def solve(args):
+    """Оптимальная политика планированием по таблицам переходов"""
+    from .core import KeyPriorityAgent
+    from .planning import greedy_rollout, reachable_states, solve as plan
+
+    tables = build_tables(args, gamma=args.gamma)
+    q, iterations, elapsed = plan(tables, args.gamma, args.method)
+    reward, success, keys, steps = greedy_rollout(q, tables)
+    print(f"{args.method}: {iterations} итераций за {elapsed * 1000:.1f} мс, "
+          f"достижимых состояний {int(reachable_states(tables).sum())} из {tables.n_states}")
+    print(f"Жадная политика: награда {reward}, успех {success}, ключи {keys}, шагов {steps}")
+
+    if args.out:
+        agent = KeyPriorityAgent.for_env(tables)
+        agent.gamma = args.gamma
+        agent.q_table = q
+        agent.epsilon = agent.epsilon_min
+        agent.save_model(args.out)
+        print(f"Модель сохранена в {args.out}")
+
+
+def benchmark(args):
+    """Бенчмарки скорости и сходимости с фиксированными seed"""
+    from .benchmark import main as run
+    sys.exit(run(args.out, args.compare, args.seed, args.quick, args.imports, args.tolerance))
+
+
+def serve(args):
+    """HTTP-сервер жадной политики обученной модели"""
+    from .inference import GreedyPolicy, serve as run
+
+    policy = GreedyPolicy.from_checkpoint(args.model)
+    print(f"Политика на {policy.n_states} состояний: http://{args.host}:{args.port} "
+          f"(/health, /action, /path)", flush=True)
+    run(policy, args.host, args.port)
+
+
+def gui(args):
+    """Запуск графического интерфейса"""
+    from .gui import main
+    main(model=args.model)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m intelligame_ai",
+                                     description="IntelliGame AI - обязательный сбор всех ключей")
+    commands = parser.add_subparsers(dest="command")
+
+    train_parser = commands.add_parser("train", help="обучение без GUI")
+    train_parser.add_argument("--episodes", type=float, default=1000, help="число эпизодов (можно 1e6)")
+    train_parser.add_argument("--out", default="model.ckpt", help="куда сохранить контрольную точку")
+    train_parser.add_argument("--model", help="продолжить обучение с сохраненной модели")
+    train_parser.add_argument("--resume", metavar="CHECKPOINT",
+                              help="продолжить с контрольной точки вместе с картой и статистикой")
+    train_parser.add_argument("--checkpoint-every", type=int,
+                              help="сохранять контрольную точку в --out каждые N эпизодов")
+    train_parser.add_argument("--report-every", type=int, default=1000, help="как часто печатать прогресс")
+    train_parser.add_argument("--kernel", action="store_true",
+                              help="скомпилированное ядро обучения (numba, если установлена)")
+    train_parser.add_argument("--seed", type=int,
+                              help="seed обучения: действия агента в цикле и в ядре, "
+                                   "буфер повторов, процессы, пул карт")
+    add_map_arguments(train_parser)
+    train_parser.add_argument("--random-maps", type=int, default=0, metavar="POOL",
+                              help="каждый эпизод - случайная карта из POOL seed (0 - одна карта)")
+    train_parser.add_argument("--storage", choices=Q_STORAGES, default="auto",
+                              help="хранение Q-таблицы")
+    train_parser.add_argument("--learner", choices=LEARNERS, default=LEARNERS[0],
+                              help="алгоритм обучения")
+    train_parser.add_argument("--trace-decay", type=float, default=0.3, metavar="LAMBDA",
+                              help="затухание следов для q_lambda")
+    train_parser.add_argument("--exploration", choices=EXPLORATIONS, default=STEP,
+                              help="способ исследования (step - epsilon после каждого шага)")
+    train_parser.add_argument("--exploration-episodes", type=int, metavar="N",
+                              help="за сколько эпизодов linear/exponential/boltzmann доходят до минимума")
+    train_parser.add_argument("--exploration-scale", type=float,
+                              help="вес бонуса для ucb/count, начальная температура для boltzmann")
+    train_parser.add_argument("--workers", type=int, default=1, help="число процессов обучения")
+    train_parser.add_argument("--mode", choices=["hogwild", "average"], default="hogwild",
+                              help="синхронизация Q-таблицы между процессами")
+    train_parser.add_argument("--sync-every", type=int, default=1000,
+                              help="эпизодов между синхронизациями процессов")
+    train_parser.add_argument("--replay", type=int, default=0,
+                              help="емкость памяти повтора опыта (0 - без повтора)")
+    train_parser.add_argument("--batch-size", type=int, default=32, help="переходов в пакете повтора")
+    train_parser.add_argument("--replay-every", type=int, default=1, help="шагов между пакетами повтора")
+    train_parser.add_argument("--prioritized", action="store_true",
+                              help="выбирать переходы по величине TD-ошибки")
+    train_parser.add_argument("--evaluate-every", type=int,
+                              help="оценивать жадную политику со всех стартов каждые N эпизодов")
+    train_parser.add_argument("--profile", nargs="?", const=True, metavar="PATH",
+                              help="замеры горячих путей; PATH - сохранить в .json/.csv")
+    train_parser.add_argument("--warm-start", nargs="?", const=PLANNERS[0], choices=PLANNERS,
+                              help="начать с Q-таблицы, найденной планированием")
+    train_parser.set_defaults(func=train)
+
+    solve_parser = commands.add_parser("solve", help="оптимальная политика без обучения")
+    add_map_arguments(solve_parser)
+    solve_parser.add_argument("--method", choices=PLANNERS, default=PLANNERS[0],
+                              help="метод планирования")
+    solve_parser.add_argument("--gamma", type=float, default=0.9, help="коэффициент дисконтирования")
+    solve_parser.add_argument("--out", help="сохранить решение как модель")
+    solve_parser.set_defaults(func=solve)
+
+    bench_parser = commands.add_parser("benchmark", help="бенчмарки скорости и сходимости")
+    bench_parser.add_argument("--out", help="куда сохранить JSON (по умолчанию - вывод)")
+    bench_parser.add_argument("--compare", help="JSON прошлого запуска для поиска регрессий")
+    bench_parser.add_argument("--tolerance", type=float, default=0.1,
+                              help="допустимое ухудшение при сравнении (доля)")
+    bench_parser.add_argument("--seed", type=int, default=0, help="seed всех замеров")
+    bench_parser.add_argument("--quick", action="store_true", help="в 10 раз меньше повторов")
+    bench_parser.add_argument("--imports", action="store_true", help="добавить время импорта модулей")
+    bench_parser.set_defaults(func=benchmark)
+
+    serve_parser = commands.add_parser("serve", help="HTTP-сервер жадной политики")
+    serve_parser.add_argument("model", help="контрольная точка или модель .npz")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="адрес сервера")
+    serve_parser.add_argument("--port", type=int, default=8765, help="порт сервера")
+    serve_parser.set_defaults(func=serve)
+
+    gui_parser = commands.add_parser("gui", help="графический интерфейс (по умолчанию)")
+    gui_parser.add_argument("--model", help="загрузить обученную модель для просмотра")
+    gui_parser.set_defaults(func=gui)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in commands.choices and argv[0] not in ("-h", "--help"):
+        argv = ["gui"] + argv
+    args = parser.parse_args(argv)
+    if args.command == "train" and args.workers > 1:
+        # ParallelTrainer обучает без повтора опыта и на одной карте, ядро выбирает сам
+        ignored = [flag for flag, value in (("--replay", args.replay),
+                                            ("--prioritized", args.prioritized),
+                                            ("--random-maps", args.random_maps),
+                                            ("--kernel", args.kernel)) if value]
+        if ignored:
+            train_parser.error(f"{', '.join(ignored)} нельзя сочетать с --workers > 1")
+    if args.command == "train" and (args.kernel or args.replay):
+        # При --resume способ хранения и алгоритм берутся из контрольной точки
+        agent_info = {}
+        if args.resume:
+            from .checkpoint import read_metadata
+            agent_info = read_metadata(args.resume)['agent']
+        learner = agent_info.get('learner', {'name': Q_LEARNING if args.resume else args.learner})
+        if args.replay and args.kernel:
+            train_parser.error("--replay нельзя сочетать с --kernel")
+        if args.replay and not learner_class(learner['name']).batch:
+            train_parser.error(f"--replay не поддерживается алгоритмом {learner['name']}")
+    if args.command == "train" and args.kernel:
+        # Ядро обучения обновляет на месте только плотные таблицы float64/float32
+        from .core import DEFAULT_GRID_SIZE, DEFAULT_KEYS, resolve_storage
+        from .kernel import KERNEL_STORAGES
+        if args.resume:
+            storage = agent_info['storage']
+        elif args.grid_size is not None:
+            storage = resolve_storage(args.grid_size ** 2 << args.keys, 4, args.storage)
+        else:
+            storage = resolve_storage(DEFAULT_GRID_SIZE ** 2 << len(DEFAULT_KEYS), 4, args.storage)
+        if storage not in KERNEL_STORAGES:
+            train_parser.error(f"--kernel работает только с --storage "
+                               f"{' или '.join(KERNEL_STORAGES)}, а не {storage}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
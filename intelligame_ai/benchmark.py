@@ -0,0 +1,270 @@
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from .core import (CompactKeysEnvironment, KeyPriorityAgent, MandatoryKeysEnvironment,
+                   VectorMandatoryKeysEnvironment)
+from .exploration import EXPLORATIONS
+from .learners import LEARNERS
+from .trainer import Trainer
+
+# ==================== БЕНЧМАРКИ ====================
+BENCHMARK_VERSION = 2
+TARGET_SUCCESS = 85  # Цель на графике успешности, %
+
+# Метрики, где больше - лучше (остальные - меньше лучше)
+HIGHER_IS_BETTER = ("steps_per_sec", "updates_per_sec", "episodes_per_sec")
+
+def seed_everything(seed):
+    """Фиксирует глобальные генераторы random и np.random"""
+    random.seed(seed)
+    np.random.seed(seed)
+
+def _best_time(run, repeat):
+    """Лучшее время из repeat запусков run() (меньше всего шума)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _rate(count, elapsed):
+    return count / elapsed if elapsed > 0 else 0.0
+
+def bench_env_step(steps=100000, seed=0, repeat=3):
+    """Шаги в секунду: MandatoryKeysEnvironment, CompactKeysEnvironment и векторная среда"""
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(0, 4, steps).tolist()
+    results = {}
+
+    for name, env in (("scalar", MandatoryKeysEnvironment()), ("compact", CompactKeysEnvironment())):
+        def run():
+            env.reset()
+            for action in actions:
+                env.step(action)
+                if env.done:
+                    env.reset()
+        results[name] = {'steps_per_sec': _rate(steps, _best_time(run, repeat))}
+
+    num_envs = 1024
+    env = VectorMandatoryKeysEnvironment(num_envs)
+    batches = rng.integers(0, 4, (max(1, steps // num_envs), num_envs))
+    def run():
+        env.reset()
+        for batch in batches:
+            env.step(batch)
+    results['vector'] = {'steps_per_sec': _rate(batches.size, _best_time(run, repeat))}
+    return results
+
+def bench_agent_update(updates=100000, seed=0, repeat=3):
+    """Обновления Q-таблицы в секунду: update по словарям и update_index по индексам"""
+    seed_everything(seed)
+    env = MandatoryKeysEnvironment()
+    agent = KeyPriorityAgent()
+    rng = np.random.default_rng(seed)
+
+    # Заранее собранные переходы, чтобы мерить только обновление
+    states = []
+    state = env.get_state()
+    for action in rng.integers(0, 4, 1000).tolist():
+        next_state = env.step(action)
+        states.append((state, action, next_state))
+        state = env.reset() if env.done else next_state
+    indexed = [(agent.get_state_index(s), a, agent.get_state_index(n)) for s, a, n in states]
+
+    def run_update():
+        for i in range(updates):
+            s, a, n = states[i % len(states)]
+            agent.update(s, a, 1.0, n)
+
+    def run_update_index():
+        for i in range(updates):
+            s, a, n = indexed[i % len(indexed)]
+            agent.update_index(s, a, 1.0, n)
+
+    return {
+        'update': {'updates_per_sec': _rate(updates, _best_time(run_update, repeat))},
+        'update_index': {'updates_per_sec': _rate(updates, _best_time(run_update_index, repeat))},
+    }
+
+def bench_episodes(episodes=5000, seed=0, kernel=False, repeat=3, learner="q_learning",
+                   exploration="step"):
+    """Эпизоды в секунду в цикле пакетного обучения (Trainer.run_episodes).
+
+    Каждый повтор начинается с нового агента и того же seed, поэтому
+    выполняет одну и ту же работу.
+    """
+    if kernel:
+        Trainer(kernel=True, seed=seed).run_episodes(10)  # Компиляция не входит в замер
+    best = float("inf")
+    for _ in range(repeat):
+        seed_everything(seed)
+        trainer = Trainer(KeyPriorityAgent(learner=learner, exploration=exploration), kernel=kernel,
+                          seed=seed)
+        start = time.perf_counter()
+        _, successes, _ = trainer.run_episodes(episodes)
+        best = min(best, time.perf_counter() - start)
+    return {
+        'episodes_per_sec': _rate(episodes, best),
+        'final_success_rate': float(successes[-100:].mean() * 100),
+    }
+
+def episodes_to_target(seed=0, target=TARGET_SUCCESS, max_episodes=20000, check_every=50,
+                       learner="q_learning", exploration="step"):
+    """Сколько эпизодов нужно до успешности target% по последним 100 (None - не достигнута).
+
+    Обучение идет пачками по check_every эпизодов, но первый эпизод, на
+    котором скользящая успешность дошла до цели, ищется с точностью до одного.
+    """
+    seed_everything(seed)
+    trainer = Trainer(KeyPriorityAgent(learner=learner, exploration=exploration))
+    window = trainer.stats.window
+    successes = np.zeros(0, dtype=np.int64)
+    while len(successes) < max_episodes:
+        _, batch, _ = trainer.run_episodes(min(check_every, max_episodes - len(successes)))
+        successes = np.concatenate([successes, np.asarray(batch, dtype=np.int64)])
+        if len(successes) >= window:
+            totals = np.cumsum(np.concatenate([[0], successes]))
+            # Успешность окон, кончающихся на эпизодах window, window + 1, ...
+            rates = (totals[window:] - totals[:-window]) * 100 / window
+            reached = np.flatnonzero(rates >= target)
+            if reached.size:
+                return int(reached[0]) + window
+    return None
+
+def bench_convergence(seeds=(0, 1, 2), target=TARGET_SUCCESS, max_episodes=20000,
+                      learner="q_learning", exploration="step"):
+    """episodes_to_target по нескольким seed"""
+    runs = [episodes_to_target(seed, target, max_episodes, learner=learner, exploration=exploration)
+            for seed in seeds]
+    reached = [episodes for episodes in runs if episodes is not None]
+    return {
+        'target': target,
+        'seeds': list(seeds),
+        'episodes': runs,
+        'median_episodes': float(np.median(reached)) if reached else None,
+        'unreached': len(runs) - len(reached),
+    }
+
+def bench_learners(episodes=2000, seeds=(0, 1, 2), target=TARGET_SUCCESS):
+    """Алгоритмы обучения: скорость эпизодов и число эпизодов до цели"""
+    results = {}
+    for learner in LEARNERS:
+        convergence = bench_convergence(seeds, target, learner=learner)
+        results[learner] = {
+            'episodes_per_sec': bench_episodes(episodes, seeds[0], learner=learner)['episodes_per_sec'],
+            'episodes': convergence['episodes'],
+            'median_episodes': convergence['median_episodes'],
+        }
+    return results
+
+def bench_explorations(episodes=2000, seeds=(0, 1, 2), target=TARGET_SUCCESS):
+    """Способы исследования: скорость эпизодов и число эпизодов до цели"""
+    results = {}
+    for exploration in EXPLORATIONS:
+        convergence = bench_convergence(seeds, target, exploration=exploration)
+        results[exploration] = {
+            'episodes_per_sec': bench_episodes(episodes, seeds[0],
+                                               exploration=exploration)['episodes_per_sec'],
+            'episodes': convergence['episodes'],
+            'median_episodes': convergence['median_episodes'],
+        }
+    return results
+
+def run_benchmarks(seed=0, quick=False, imports=False):
+    """Все бенчмарки; результат - словарь, готовый для JSON"""
+    scale = 10 if quick else 1
+    seeds = tuple(range(seed, seed + (1 if quick else 3)))
+    results = {
+        'env_step': bench_env_step(100000 // scale, seed),
+        'agent_update': bench_agent_update(100000 // scale, seed),
+        'episodes': {'python': bench_episodes(5000 // scale, seed)},
+        'convergence': bench_convergence(seeds),
+        'learners': bench_learners(2000 // scale, seeds),
+        'explorations': bench_explorations(2000 // scale, seeds),
+    }
+    from .kernel import HAVE_NUMBA
+    if HAVE_NUMBA:
+        results['episodes']['kernel'] = bench_episodes(100000 // scale, seed, kernel=True)
+    if imports:
+        from .importtime import check_core_imports
+        _, measured = check_core_imports(repeat=1 if quick else 3)
+        results['imports'] = {result.pop('module'): result for result in measured}
+
+    return {
+        'version': BENCHMARK_VERSION,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'seed': seed,
+        'quick': quick,
+        'platform': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'numba': HAVE_NUMBA,
+        },
+        'results': results,
+    }
+
+def _flatten(results, prefix=""):
+    """{'a': {'b': 1}} -> {'a.b': 1} (только числа и None)"""
+    flat = {}
+    for name, value in results.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, key + "."))
+        elif value is None or isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[key] = value
+    return flat
+
+def compare(baseline, current, tolerance=0.1):
+    """Регрессии current относительно baseline: список (метрика, было, стало).
+
+    Скорости должны не падать больше чем на tolerance, число эпизодов до
+    цели - не расти больше чем на tolerance. Цель, которая перестала
+    достигаться (число -> None, больше seed без цели), - тоже регрессия.
+    """
+    old = _flatten(baseline['results'])
+    new = _flatten(current['results'])
+    regressions = []
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] is None:
+            continue
+        if key.endswith(HIGHER_IS_BETTER):
+            worse = new[key] is None or new[key] < old[key] * (1 - tolerance)
+        elif key.endswith("median_episodes"):
+            worse = new[key] is None or new[key] > old[key] * (1 + tolerance)
+        elif key.endswith("unreached"):
+            worse = new[key] > old[key]
+        else:
+            continue
+        if worse:
+            regressions.append((key, old[key], new[key]))
+    return regressions
+
+def main(out=None, baseline=None, seed=0, quick=False, imports=False, tolerance=0.1):
+    """Запуск бенчмарков, вывод JSON и сравнение с baseline; код возврата"""
+    report = run_benchmarks(seed, quick, imports)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, tolerance)
+        for key, old, new in regressions:
+            new = "не достигнута" if new is None else f"{new:.1f}"
+            print(f"Регрессия {key}: {old:.1f} -> {new}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(quick="--quick" in sys.argv))
@@ -0,0 +1,274 @@
+import json
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from .core import DENSE_DTYPES, KeyPriorityAgent, SparseQTable
+
+# ==================== КОНТРОЛЬНЫЕ ТОЧКИ ====================
+# Файл: MAGIC, длина заголовка (uint64, little-endian), JSON-заголовок с
+# метаданными и описанием массивов, затем массивы без сжатия. Каждый массив
+# начинается с границы ALIGNMENT байт, поэтому Q-таблицу можно открыть через
+# np.memmap прямо из файла.
+MAGIC = b"IGQCKPT\x00"
+CHECKPOINT_VERSION = 1
+ALIGNMENT = 64
+HYPERPARAMETERS = ('epsilon', 'epsilon_min', 'epsilon_decay', 'learning_rate', 'gamma')
+Q_ARRAYS = ('q_table', 'q_states', 'q_rows')  # Только их можно открыть через memmap
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _json_default(value):
+    """Числа и массивы NumPy в заголовке (например, в параметрах карты)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} нельзя записать в заголовок")
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=_json_default))
+
+def is_checkpoint(path):
+    """Файл в формате контрольной точки (а не старый .npz)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def _storage(q_table):
+    """Имя способа хранения Q-таблицы из Q_STORAGES"""
+    if isinstance(q_table, SparseQTable):
+        return "sparse"
+    for storage, dtype in DENSE_DTYPES.items():
+        if q_table.dtype == dtype:
+            return storage
+    return "dense"
+
+def _table_arrays(prefix, table):
+    """Массивы Q-таблицы: prefix_table или, для разреженной, prefix_states и prefix_rows"""
+    if isinstance(table, SparseQTable):
+        states, rows = table.items()
+        return {f"{prefix}_states": states, f"{prefix}_rows": rows}
+    return {f"{prefix}_table": table}
+
+def save_checkpoint(path, agent, trainer=None, stats=None):
+    """Атомарная запись контрольной точки.
+
+    Кроме Q-таблицы сохраняются размеры карты, гиперпараметры, алгоритм
+    обучения (с его дополнительными таблицами), способ исследования (с
+    положением расписания и счетчиками посещений) и счетчики агента, а если
+    переданы - счетчики и карта Trainer и состояние RollingStats. Файл
+    пишется во временный рядом и заменяет path одним os.replace, поэтому
+    прерванная запись не портит прошлую точку.
+    """
+    arrays = _table_arrays('q', agent.q_table)
+    for name, table in agent.learner.tables().items():
+        arrays.update(_table_arrays(f"learner_{name}", table))
+    for name, table in agent.exploration.tables().items():
+        arrays.update(_table_arrays(f"exploration_{name}", table))
+
+    metadata = {
+        'version': CHECKPOINT_VERSION,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'agent': {
+            'grid_size': agent.grid_size,
+            'total_keys': agent.total_keys,
+            'state_size': agent.state_size,
+            'action_size': agent.action_size,
+            'storage': _storage(agent.q_table),
+            'hyperparameters': {name: getattr(agent, name) for name in HYPERPARAMETERS},
+            'learner': {'name': agent.learner.name, 'params': agent.learner.params(),
+                        'tables': list(agent.learner.tables())},
+            'exploration': {'name': agent.exploration.name, 'params': agent.exploration.params(),
+                            'state': agent.exploration.state(),
+                            'tables': list(agent.exploration.tables())},
+            'total_keys_collected': agent.total_keys_collected,
+            'episodes_with_all_keys': agent.episodes_with_all_keys,
+        },
+    }
+    if trainer is not None:
+        metadata['trainer'] = {
+            'total_episodes': trainer.total_episodes,
+            'perfect_episodes': trainer.perfect_episodes,
+            'map': trainer.env.tables.config,
+        }
+    if stats is not None:
+        metadata['stats'] = {name: getattr(stats, name) for name in
+                             ('window', 'sums', 'position', 'count', 'episodes', 'totals',
+                              'history_len', 'stride')}
+        arrays['stats_ring'] = stats.ring
+        arrays['stats_history'] = stats.history
+
+    # Смещения массивов считаются от начала данных
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset = _align(offset + array.nbytes)
+    metadata['arrays'] = layout
+
+    header = json.dumps(metadata, ensure_ascii=False, default=_json_default).encode("utf-8")
+    prefix = len(MAGIC) + 8
+    header += b" " * (_align(prefix + len(header)) - prefix - len(header))
+
+    def write(f):
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        data_offset = f.tell()
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_offset + layout[name]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(array).data)
+
+    _atomic_write(path, write)
+
+def _atomic_write(path, write):
+    """write(f) во временный файл в той же папке, затем os.replace"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    _fsync_dir(path)
+
+def _fsync_dir(path):
+    """fsync папки файла: без него переименование может потеряться при сбое"""
+    if os.name == "nt":
+        return  # В Windows папку нельзя открыть для fsync
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_metadata(path):
+    """Заголовок контрольной точки (без чтения массивов)"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: не контрольная точка IntelliGame AI")
+        prefix = f.read(8)
+        length = struct.unpack("<Q", prefix)[0] if len(prefix) == 8 else None
+        header = f.read(length) if length is not None else b""
+    if length is None or len(header) < length:
+        raise ValueError(f"{path}: файл обрезан")
+    try:
+        metadata = json.loads(header.decode("utf-8"))
+    except ValueError:
+        raise ValueError(f"{path}: заголовок поврежден") from None
+    if metadata['version'] > CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: формат версии {metadata['version']}, "
+                         f"поддерживается до {CHECKPOINT_VERSION}")
+
+    metadata['data_offset'] = len(MAGIC) + 8 + length
+    end = max((spec['offset'] + int(np.prod(spec['shape'])) * np.dtype(spec['dtype']).itemsize
+               for spec in metadata['arrays'].values()), default=0)
+    if os.path.getsize(path) < metadata['data_offset'] + end:
+        raise ValueError(f"{path}: файл обрезан")
+    return metadata
+
+def _read_array(path, metadata, name, mmap_mode=None):
+    spec = metadata['arrays'][name]
+    dtype = np.dtype(spec['dtype'])
+    shape = tuple(spec['shape'])
+    offset = metadata['data_offset'] + spec['offset']
+    if mmap_mode and name in Q_ARRAYS and np.prod(shape):
+        return np.memmap(path, dtype, mode=mmap_mode, offset=offset, shape=shape)
+    return np.fromfile(path, dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+
+def _read_table(path, metadata, prefix, agent, mmap_mode=None):
+    """Q-таблица, записанная _table_arrays"""
+    if f"{prefix}_table" in metadata['arrays']:
+        return _read_array(path, metadata, f"{prefix}_table", mmap_mode)
+    states = _read_array(path, metadata, f"{prefix}_states")
+    rows = _read_array(path, metadata, f"{prefix}_rows", mmap_mode)
+    table = SparseQTable(agent.state_size, agent.action_size, rows.dtype,
+                         capacity=max(len(rows), 1))
+    if len(rows):
+        table.data = rows
+        table.index = dict(zip(states.tolist(), range(len(rows))))
+    return table
+
+def load_checkpoint(path, agent=None, trainer=None, stats=None, mmap_mode=None):
+    """Восстановление из контрольной точки; возвращает агента.
+
+    agent=None - новый KeyPriorityAgent под размеры из файла; алгоритм
+    обучения и способ исследования агента заменяются сохраненными (в файлах
+    без них - Q-обучение и "step").
+    trainer и stats получают сохраненные счетчики и статистику (если они
+    есть в файле).
+    mmap_mode ('r', 'r+', 'c') открывает Q-таблицу через np.memmap без
+    копирования в память: 'r' - только чтение (учиться на такой таблице
+    нельзя, Trainer.load_checkpoint при обучении открывает ее как 'c'),
+    'r+' - изменения пишутся в файл, 'c' - изменения остаются в памяти.
+    Строки разреженной таблицы лежат в файле, пока таблица не вырастет:
+    после этого изменения и при 'r+' остаются в памяти.
+    """
+    metadata = read_metadata(path)
+    info = metadata['agent']
+    if agent is None:
+        # Разреженная заглушка не выделяет таблицу, которую сразу заменим
+        agent = KeyPriorityAgent(info['grid_size'], info['total_keys'], storage="sparse")
+    if info['state_size'] != agent.state_size:
+        raise ValueError(f"Модель на {info['state_size']} состояний, "
+                         f"а агенту нужно {agent.state_size}")
+    if trainer is not None and 'trainer' in metadata:
+        if _jsonable(trainer.env.tables.config) != metadata['trainer']['map']:
+            raise ValueError("Контрольная точка сохранена для другой карты")
+
+    agent.q_table = _read_table(path, metadata, 'q', agent, mmap_mode)
+    learner = info.get('learner', {'name': "q_learning", 'params': {}, 'tables': []})
+    agent.set_learner(learner['name'], **learner['params'])
+    if learner['tables']:
+        agent.learner.load_tables({name: _read_table(path, metadata, f"learner_{name}", agent)
+                                   for name in learner['tables']})
+    exploration = info.get('exploration', {'name': "step", 'params': {}, 'state': {'episode': 0},
+                                           'tables': []})
+    agent.set_exploration(exploration['name'], **exploration['params'])
+    agent.exploration.load_state(exploration['state'])
+    if exploration['tables']:
+        agent.exploration.load_tables({name: _read_table(path, metadata, f"exploration_{name}", agent)
+                                       for name in exploration['tables']})
+
+    for name, value in info['hyperparameters'].items():
+        setattr(agent, name, value)
+    agent.total_keys_collected = info['total_keys_collected']
+    agent.episodes_with_all_keys = info['episodes_with_all_keys']
+
+    if trainer is not None and 'trainer' in metadata:
+        trainer.total_episodes = metadata['trainer']['total_episodes']
+        trainer.perfect_episodes = metadata['trainer']['perfect_episodes']
+    if stats is not None and 'stats' in metadata:
+        for name, value in metadata['stats'].items():
+            setattr(stats, name, value)
+        stats.ring = _read_array(path, metadata, 'stats_ring')
+        stats.history = _read_array(path, metadata, 'stats_history')
+    return agent
+
+if __name__ == "__main__":
+    from .trainer import Trainer
+
+    path = os.path.join(tempfile.gettempdir(), "intelligame_checkpoint.ckpt")
+    trainer = Trainer(seed=0)
+    trainer.train(2000, report_every=500)
+    trainer.save_checkpoint(path)
+    print(f"Сохранено: {os.path.getsize(path)} байт, заголовок:")
+    print(json.dumps(read_metadata(path)['agent'], ensure_ascii=False, indent=2))
+
+    resumed = Trainer()
+    resumed.load_checkpoint(path, mmap_mode='c')
+    print("Q-таблица через memmap:", isinstance(resumed.agent.q_table, np.memmap))
+    print("Совпадение:", np.array_equal(resumed.agent.q_table, trainer.agent.q_table),
+          resumed.stats.success_rate == trainer.stats.success_rate)
+    os.unlink(path)
@@ -0,0 +1,992 @@
+import random
+import sys
+import numpy as np
+
+from .maps import KEY, TRAP, TREASURE, Layout, generate_layout, step_limits
+from .shaping import LEGACY, POTENTIAL, SHAPING_GAMMA, SHAPINGS, STEP_COST
+
+ACTION_NAMES = ['↑', '↓', '←', '→']
+
+# Стандартная карта 6x6
+DEFAULT_GRID_SIZE = 6
+DEFAULT_KEYS = [
+    [1, 2],  # Первый ключ
+    [3, 1],  # Второй ключ
+    [4, 4]   # Третий ключ
+]
+DEFAULT_TRAPS = [
+    [2, 3],
+    [5, 2]
+]
+MAX_GRID_SIZE = 256
+
+# Способы хранения Q-таблицы; в режиме "auto" плотная таблица используется,
+# пока занимает не больше DENSE_Q_LIMIT
+Q_STORAGES = ("auto", "dense", "float32", "float16", "sparse")
+DENSE_DTYPES = {"dense": np.float64, "float32": np.float32, "float16": np.float16}
+DENSE_Q_LIMIT = 256 * 2**20
+# С этого числа состояний (или при разреженной Q-таблице) таблицы переходов
+# считаются лениво (LazyEnvironmentTables): плотные таблицы и их списки
+# заняли бы гигабайты, а обучение посещает малую часть состояний
+LAZY_TABLES_STATES = 2**18
+
+# ==================== ХРАНЕНИЕ Q-ТАБЛИЦЫ ====================
+class SparseQTable:
+    """Q-таблица, строки которой выделяются при первом посещении.
+
+    Номер строки ищется по словарю состояние -> строка, сами строки лежат
+    подряд в растущем массиве data. Поддерживает обращения q[s], q[s, a] и
+    присваивания q[s] = row, q[s, a] = x, как у массива NumPy. Непосещенные
+    состояния читаются как нули.
+    """
+    def __init__(self, state_size, action_size, dtype=np.float64, capacity=1024):
+        self.shape = (state_size, action_size)
+        self.dtype = np.dtype(dtype)
+        self.index = {}  # Состояние -> номер строки в data
+        self.data = np.zeros((capacity, action_size), dtype=self.dtype)
+        self._zeros = np.zeros(action_size, dtype=self.dtype)
+        self._zeros.flags.writeable = False
+
+    def _row(self, state):
+        """Номер строки состояния (выделяется при первом обращении)"""
+        row = self.index.get(state)
+        if row is None:
+            row = len(self.index)
+            if row == len(self.data):
+                self.data = np.concatenate([self.data, np.zeros_like(self.data)])
+            self.index[state] = row
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            state, action = key
+            row = self.index.get(state)
+            return 0.0 if row is None else self.data[row, action]
+        row = self.index.get(key)
+        return self._zeros if row is None else self.data[row]
+
+    def __setitem__(self, key, value):
+        # Номер строки берется до обращения к data: _row может заменить массив
+        if isinstance(key, tuple):
+            state, action = key
+            row = self._row(state)
+            self.data[row, action] = value
+        else:
+            row = self._row(key)
+            self.data[row] = value
+
+    def take(self, states):
+        """Строки для массива состояний (непосещенные - нули), без выделения"""
+        rows = np.array([self.index.get(state, -1) for state in states.tolist()], dtype=np.int64)
+        values = self.data[rows]
+        values[rows < 0] = 0
+        return values
+
+    def rows(self, states):
+        """Номера строк в data для массива состояний (с выделением новых)"""
+        return np.array([self._row(state) for state in states.tolist()], dtype=np.int64)
+
+    @property
+    def visited(self):
+        """Число состояний, для которых выделены строки"""
+        return len(self.index)
+
+    @property
+    def nbytes(self):
+        """Примерный объем памяти: массив строк плюс словарь индексов"""
+        return self.data.nbytes + sys.getsizeof(self.index) + len(self.index) * 28
+
+    def items(self):
+        """Посещенные состояния (по возрастанию) и их строки"""
+        states = np.array(sorted(self.index), dtype=np.int64)
+        rows = self.data[[self.index[state] for state in states.tolist()]]
+        return states, rows.reshape(-1, self.shape[1])
+
+def resolve_storage(state_size, action_size, storage="auto"):
+    """Способ хранения, где "auto" заменен на "dense" или "sparse" по DENSE_Q_LIMIT"""
+    if storage == "auto":
+        return "dense" if state_size * action_size * 8 <= DENSE_Q_LIMIT else "sparse"
+    return storage
+
+def make_q_table(state_size, action_size, storage="auto"):
+    """Q-таблица с выбранным способом хранения.
+
+    "dense" - float64, "float32"/"float16" - компактные плотные таблицы,
+    "sparse" - SparseQTable, "auto" - dense, если помещается в DENSE_Q_LIMIT.
+    """
+    storage = resolve_storage(state_size, action_size, storage)
+    if storage == "sparse":
+        return SparseQTable(state_size, action_size)
+    if storage not in DENSE_DTYPES:
+        raise ValueError(f"Неизвестный способ хранения Q-таблицы: {storage}")
+    return np.zeros((state_size, action_size), dtype=DENSE_DTYPES[storage])
+
+# ==================== АГЕНТ С ПРИОРИТЕТОМ КЛЮЧЕЙ ====================
+class KeyPriorityAgent:
+    """Агент, который должен собрать ВСЕ ключи перед сокровищем.
+
+    learner - алгоритм обучения из learners.LEARNERS (по умолчанию
+    Q-обучение), learner_params - его параметры. exploration - способ
+    исследования (имя из exploration.EXPLORATIONS или объект оттуда).
+    """
+    def __init__(self, grid_size=DEFAULT_GRID_SIZE, total_keys=len(DEFAULT_KEYS), storage="auto",
+                 learner="q_learning", exploration="step", **learner_params):
+        # Состояние: позиция (N x N) * маска собранных ключей (2**K)
+        self.grid_size = grid_size
+        self.total_keys = total_keys
+        self.n_masks = 1 << total_keys
+        self.state_size = grid_size * grid_size * self.n_masks
+        self.action_size = 4
+        
+        # Q-таблица (см. make_q_table)
+        self.q_table = make_q_table(self.state_size, self.action_size, storage)
+        
+        # Гиперпараметры
+        self.epsilon = 1.0
+        self.epsilon_min = 0.01
+        self.epsilon_decay = 0.999
+        self.learning_rate = 0.2  # Увеличили скорость обучения
+        self.gamma = 0.9
+        
+        # Случайные числа исследования и алгоритма обучения: по умолчанию
+        # глобальный random, Trainer(seed=...) ставит свой random.Random
+        self.rng = random
+        
+        # Алгоритм обучения (learners.py) и способ исследования (exploration.py)
+        self.set_learner(learner, **learner_params)
+        self.set_exploration(exploration)
+        
+        # Статистика
+        self.total_keys_collected = 0
+        self.episodes_with_all_keys = 0
+        
+    @classmethod
+    def for_env(cls, env, storage="auto", learner="q_learning", **learner_params):
+        """Агент с Q-таблицей под размеры карты среды"""
+        return cls(env.grid_size, env.total_keys, storage, learner, **learner_params)
+    
+    def set_learner(self, name, **params):
+        """Смена алгоритма обучения; Q-таблица сохраняется"""
+        from .learners import make_learner
+        self.learner = make_learner(name, self, **params)
+    
+    def set_exploration(self, exploration="step", **params):
+        """Смена способа исследования: имя (с параметрами) или готовый объект"""
+        if isinstance(exploration, str):
+            from .exploration import make_exploration
+            exploration = make_exploration(exploration, **params)
+        self.exploration = exploration
+    
+    def start_episode(self):
+        """Начало эпизода: алгоритм сбрасывает следы прошлого, расписание
+        исследования переходит к следующему эпизоду
+        """
+        self.learner.start_episode()
+        self.exploration.start_episode(self)
+    
+    def memory_usage(self):
+        """Объем памяти Q-таблицы в байтах"""
+        return self.q_table.nbytes
+    
+    def visited_states(self):
+        """Число посещенных состояний (для плотной таблицы - ненулевых строк)"""
+        if isinstance(self.q_table, SparseQTable):
+            return self.q_table.visited
+        return int(np.count_nonzero(self.q_table.any(axis=1)))
+    
+    def get_state_index(self, game_state):
+        """Учитываем позицию и то, какие именно ключи собраны"""
+        agent = game_state['agent_pos']
+        
+        # Позиция в сетке N x N
+        pos_index = agent[0] * self.grid_size + agent[1]
+        
+        # Общий индекс с учетом маски ключей
+        return pos_index * self.n_masks + game_state['key_mask']
+    
+    def get_action(self, state, training=True):
+        """Выбор действия с учетом приоритета ключей"""
+        return self.get_action_index(self.get_state_index(state), training)
+    
+    def get_action_index(self, state_idx, training=True):
+        """Выбор действия по готовому индексу состояния (без словаря).
+
+        При обучении действие выбирает способ исследования, иначе - жадно.
+        """
+        if training:
+            return self.exploration.select(self, state_idx)
+        
+        return np.argmax(self.q_table[state_idx])
+    
+    def update(self, state, action, reward, next_state, terminated=False, next_action=None):
+        """Обновление Q-таблицы"""
+        self.update_index(self.get_state_index(state), action, reward,
+                          self.get_state_index(next_state), terminated, next_action)
+    
+    def update_index(self, state_idx, action, reward, next_state_idx, terminated=False,
+                     next_action=None):
+        """Обновление Q-таблицы по готовым индексам состояний (см. learners.py).
+
+        next_action - следующее действие агента; нужно алгоритмам с
+        learner.on_policy (SARSA).
+        """
+        self.learner.update(state_idx, action, reward, next_state_idx, terminated, next_action)
+        
+        # Расписание "step" уменьшает epsilon после каждого обновления
+        self.exploration.after_update(self)
+    
+    def update_batch(self, states, actions, rewards, next_states, terminated, weights=None):
+        """Пакетное TD-обновление по массивам переходов (например, из ReplayBuffer).
+
+        Одинаковые пары (s, a) в пакете получают среднее обновление, weights -
+        необязательные веса ошибок. Epsilon не меняется: это повтор опыта, а не
+        новые шаги. Возвращает TD-ошибки до обновления. Поддерживается не
+        всеми алгоритмами (learner.batch).
+        """
+        return self.learner.update_batch(states, actions, rewards, next_states, terminated, weights)
+    
+    def save_model(self, path):
+        """Сохранение модели в формате контрольной точки (см. checkpoint.py)"""
+        from .checkpoint import save_checkpoint
+        save_checkpoint(path, self)
+    
+    def load_model(self, path, mmap_mode=None):
+        """Загрузка модели: контрольная точка или старый .npz.
+
+        mmap_mode - открыть Q-таблицу контрольной точки через np.memmap.
+        """
+        from .checkpoint import is_checkpoint, load_checkpoint
+        if is_checkpoint(path):
+            load_checkpoint(path, self, mmap_mode=mmap_mode)
+            return
+        data = np.load(path)
+        if 'q_states' in data:
+            state_size = int(data['state_size'])
+        else:
+            state_size = data['q_table'].shape[0]
+        if state_size != self.state_size:
+            raise ValueError(f"Модель на {state_size} состояний, "
+                             f"а агенту нужно {self.state_size}")
+        
+        if 'q_states' in data:
+            rows = data['q_rows']
+            self.q_table = SparseQTable(self.state_size, self.action_size, rows.dtype,
+                                        capacity=max(len(rows), 1))
+            for state, row in zip(data['q_states'].tolist(), rows):
+                self.q_table[state] = row
+        else:
+            self.q_table = data['q_table']
+        self.epsilon = float(data['epsilon'])
+        # Дополнительные таблицы алгоритма начинаются с загруженной
+        self.set_learner(self.learner.name, **self.learner.params())
+
+# ==================== СРЕДА С ОБЯЗАТЕЛЬНЫМ СБОРОМ КЛЮЧЕЙ ====================
+class MandatoryKeysEnvironment:
+    """Среда, где сокровище нельзя взять без ВСЕХ ключей"""
+    def __init__(self, gym_api=False, grid_size=DEFAULT_GRID_SIZE, keys=None, traps=None,
+                 treasure_pos=None, start_pos=None, max_steps=None, max_steps_with_keys=None,
+                 shaping=LEGACY, shaping_gamma=SHAPING_GAMMA):
+        if not 2 <= grid_size <= MAX_GRID_SIZE:
+            raise ValueError(f"Размер карты должен быть от 2 до {MAX_GRID_SIZE}")
+        if shaping not in SHAPINGS:
+            raise ValueError(f"Неизвестный способ формирования награды: {shaping}")
+        if keys is None and grid_size != DEFAULT_GRID_SIZE:
+            raise ValueError("Для нестандартной карты укажите keys "
+                             "или используйте maps.generate_layout")
+        
+        self.grid_size = grid_size
+        self.gym_api = gym_api  # step() -> (obs, reward, terminated, truncated, info)
+        self.shaping = shaping  # Награда обычных шагов (см. shaping.py)
+        self.shaping_gamma = shaping_gamma  # gamma потенциального бонуса
+        
+        # Раскладка карты (по умолчанию - стандартная 6x6 с 3 ключами и 2 ловушками)
+        self.start_pos = list(start_pos) if start_pos is not None else [0, 0]
+        self.treasure_pos = (list(treasure_pos) if treasure_pos is not None
+                             else [grid_size - 1, grid_size - 1])
+        self.key_positions = [list(key) for key in (keys if keys is not None else DEFAULT_KEYS)]
+        if traps is None:
+            traps = DEFAULT_TRAPS if keys is None else []
+        self.traps = [list(trap) for trap in traps]
+        self.total_keys = len(self.key_positions)
+        self._check_layout()
+        
+        # Лимиты шагов: до сбора всех ключей и после (растут с размером карты)
+        default_steps, default_steps_with_keys = step_limits(grid_size, self.total_keys)
+        self.max_steps = max_steps if max_steps is not None else default_steps
+        self.max_steps_with_keys = (max_steps_with_keys if max_steps_with_keys is not None
+                                    else default_steps_with_keys)
+        
+        # Таблицы расстояний до ключей и сокровища (вместо перебора ключей на каждом шаге)
+        self.layout = Layout(grid_size, self.key_positions, self.traps, self.treasure_pos,
+                             self.start_pos, self.max_steps, self.max_steps_with_keys)
+        self.reset()
+    
+    @classmethod
+    def from_layout(cls, layout, **kwargs):
+        """Среда по готовой карте (maps.Layout) с ее таблицами расстояний"""
+        env = cls(**layout.config(), **kwargs)
+        env.layout = layout
+        return env
+    
+    @classmethod
+    def with_random_layout(cls, grid_size, n_keys, n_traps=0, seed=None, **kwargs):
+        """Среда на случайной проходимой карте (maps.generate_layout)"""
+        limits = {name: kwargs.pop(name) for name in ('max_steps', 'max_steps_with_keys')
+                  if name in kwargs}
+        return cls.from_layout(generate_layout(grid_size, n_keys, n_traps, seed, **limits), **kwargs)
+    
+    def _check_layout(self):
+        """Проверка раскладки карты"""
+        if self.total_keys < 1:
+            raise ValueError("На карте должен быть хотя бы один ключ")
+        cells = [self.start_pos, self.treasure_pos] + self.key_positions + self.traps
+        for cell in cells:
+            if not (0 <= cell[0] < self.grid_size and 0 <= cell[1] < self.grid_size):
+                raise ValueError(f"Клетка {cell} вне карты {self.grid_size}x{self.grid_size}")
+        key_cells = [tuple(key) for key in self.key_positions]
+        if len(set(key_cells)) != len(key_cells):
+            raise ValueError("Два ключа в одной клетке")
+    
+    def config(self):
+        """Параметры, из которых можно заново построить эту карту"""
+        return {
+            'grid_size': self.grid_size,
+            'keys': [key.copy() for key in self.key_positions],
+            'traps': [trap.copy() for trap in self.traps],
+            'treasure_pos': self.treasure_pos.copy(),
+            'start_pos': self.start_pos.copy(),
+            'max_steps': self.max_steps,
+            'max_steps_with_keys': self.max_steps_with_keys,
+            'shaping': self.shaping,
+            **({'shaping_gamma': self.shaping_gamma} if self.shaping == POTENTIAL else {}),
+        }
+    
+    def reset(self, layout=None):
+        """Создание новой карты.
+
+        layout - другая карта (maps.Layout) для этого и следующих эпизодов.
+        """
+        if layout is not None:
+            self.grid_size = layout.grid_size
+            self.key_positions = [key.copy() for key in layout.key_positions]
+            self.traps = [trap.copy() for trap in layout.traps]
+            self.treasure_pos = layout.treasure_pos.copy()
+            self.start_pos = layout.start_pos.copy()
+            self.total_keys = layout.total_keys
+            self.max_steps = layout.max_steps
+            self.max_steps_with_keys = layout.max_steps_with_keys
+            self.layout = layout
+        self.agent_pos = self.start_pos.copy()
+        
+        # Сброс состояния (несобранные ключи - self.keys - определяются маской)
+        self.collected_keys = []  # В порядке сбора
+        self.key_mask = 0  # Бит i - собран i-й ключ
+        self._keys_mask = None  # Маска, для которой построен self._keys
+        self.steps = 0
+        self.done = False
+        self.terminated = False  # Ловушка или сокровище
+        self.truncated = False  # Обрыв по лимиту шагов
+        self.total_reward = 0
+        self.last_action = "—"
+        self.has_all_keys = False
+        
+        if self.gym_api:
+            return self.get_state(), self.get_info()
+        return self.get_state()
+    
+    @property
+    def keys(self):
+        """Несобранные ключи (по маске key_mask; список строится раз на маску)"""
+        mask = self.key_mask
+        if self._keys_mask != mask:
+            self._keys = [key.copy() for i, key in enumerate(self.key_positions)
+                          if not mask & (1 << i)]
+            self._keys_mask = mask
+        return self._keys.copy()
+    
+    def get_state(self):
+        """Получение состояния"""
+        return {
+            'agent_pos': self.agent_pos.copy(),
+            'treasure_pos': self.treasure_pos,
+            'keys': self.keys,
+            'traps': self.traps.copy(),
+            'collected_keys': self.collected_keys.copy(),
+            'key_mask': self.key_mask,
+            'grid_size': self.grid_size,
+            'keys_collected': len(self.collected_keys),
+            'keys_remaining': self.total_keys - len(self.collected_keys),
+            'total_keys': self.total_keys,
+            'steps': self.steps,
+            'done': self.done,
+            'reward': self.total_reward,
+            'has_all_keys': len(self.collected_keys) == self.total_keys,
+            'last_action': self.last_action
+        }
+    
+    def get_info(self):
+        """Итоги эпизода для режима gym_api"""
+        return {
+            'success': self.done and self.has_all_keys and self.agent_pos == self.treasure_pos,
+            'keys_collected': len(self.collected_keys),
+        }
+    
+    def step(self, action):
+        """Шаг с новой системой наград.
+
+        По умолчанию возвращает словарь состояния. В режиме gym_api возвращает
+        (obs, reward, terminated, truncated, info), где reward - точная награда
+        за шаг, включая штраф за исчерпание лимита шагов.
+        """
+        if self.done:
+            if self.gym_api:
+                return self.get_state(), 0, self.terminated, self.truncated, self.get_info()
+            return self.get_state()
+        
+        self.steps += 1
+        new_pos = self.agent_pos.copy()
+        old_cell = self.agent_pos[0] * self.grid_size + self.agent_pos[1]
+        old_mask = self.key_mask
+        
+        # Действия
+        self.last_action = ACTION_NAMES[action]
+        
+        # Движение
+        if action == 0 and new_pos[0] > 0:
+            new_pos[0] -= 1
+        elif action == 1 and new_pos[0] < self.grid_size - 1:
+            new_pos[0] += 1
+        elif action == 2 and new_pos[1] > 0:
+            new_pos[1] -= 1
+        elif action == 3 and new_pos[1] < self.grid_size - 1:
+            new_pos[1] += 1
+        
+        # Новая система наград
+        reward = 0
+        failed = False  # Ловушка или сокровище без ключей
+        new_cell = new_pos[0] * self.grid_size + new_pos[1]
+        flags = self.layout.cell_flags[new_cell]
+        key_id = self.layout.key_ids[new_cell]
+        
+        # 1. Проверка ловушки
+        if flags & TRAP:
+            reward = -100  # Очень большой штраф
+            self.done = True
+            failed = True
+            self.agent_pos = new_pos
+        
+        # 2. Проверка ключа
+        elif flags & KEY and not self.key_mask & (1 << key_id):
+            reward = 50  # Хорошая награда за ключ
+            self.collected_keys.append(new_pos.copy())
+            self.key_mask |= 1 << key_id
+            self.agent_pos = new_pos
+            
+            # Дополнительная награда за сбор всех ключей
+            if len(self.collected_keys) == self.total_keys:
+                reward += 100  # Бонус за сбор всех ключей
+                self.has_all_keys = True
+        
+        # 3. Проверка сокровища
+        elif flags & TREASURE:
+            if self.has_all_keys:
+                # МАКСИМАЛЬНАЯ награда за сокровище со всеми ключами
+                reward = 500 + (len(self.collected_keys) * 100)
+                self.done = True
+            else:
+                # Отрицательная награда за попытку взять сокровище без ключей
+                reward = -200  # Большой штраф
+                self.done = True
+                failed = True
+            self.agent_pos = new_pos
+        
+        # 4. Обычное движение
+        else:
+            if self.shaping == POTENTIAL:
+                reward = STEP_COST  # Направление учитывает потенциал ниже
+            # Награда за движение к ближайшему несобранному ключу
+            elif not self.has_all_keys:
+                # Расстояние до ближайшего несобранного ключа - из таблицы карты
+                old_dist = abs(self.agent_pos[0] - new_pos[0]) + abs(self.agent_pos[1] - new_pos[1])
+                new_dist = self.layout.nearest_key_distance(self.key_mask)[new_cell]
+                
+                if new_dist < old_dist:
+                    reward = 3  # Поощрение за движение к ключу
+                elif new_dist > old_dist:
+                    reward = -2  # Штраф за удаление от ключа
+                else:
+                    reward = -1  # Нейтральное движение
+            else:
+                # Все ключи собраны - двигаемся к сокровищу
+                treasure_distance = self.layout.treasure_distance
+                old_dist = treasure_distance[self.agent_pos[0] * self.grid_size + self.agent_pos[1]]
+                new_dist = treasure_distance[new_cell]
+                
+                if new_dist < old_dist:
+                    reward = 5  # Большое поощрение к сокровищу
+                else:
+                    reward = -3  # Штраф за удаление
+            
+            self.agent_pos = new_pos
+        
+        self.terminated = self.done
+        
+        # gamma * Phi(s') - Phi(s) по расстояниям в обход ловушек
+        if self.shaping == POTENTIAL:
+            reward += self.layout.shaping.bonus(old_mask, old_cell, self.key_mask,
+                                                new_cell, failed, self.shaping_gamma)
+        
+        # Ограничение по шагам
+        max_steps = self.max_steps if not self.has_all_keys else self.max_steps_with_keys
+        if self.steps >= max_steps:
+            self.done = True
+            self.truncated = not self.terminated
+            # Дополнительный штраф за невыполнение задачи
+            if not self.has_all_keys:
+                reward -= 50
+            elif new_pos != self.treasure_pos:
+                reward -= 30
+        
+        # Штраф учитывается в общей награде, иначе агент его не видит
+        self.total_reward += reward
+        
+        if self.gym_api:
+            return self.get_state(), reward, self.terminated, self.truncated, self.get_info()
+        return self.get_state()
+
+# ==================== ТАБЛИЦЫ ПЕРЕХОДОВ ====================
+class EnvironmentTables:
+    """Таблицы переходов MandatoryKeysEnvironment по упакованным состояниям.
+
+    Состояние s = позиция * 2**total_keys + маска собранных ключей; это же
+    число - индекс строки Q-таблицы KeyPriorityAgent. Таблицы строятся один
+    раз по правилам MandatoryKeysEnvironment.step, векторно для каждой маски.
+    """
+    _default = None
+    lazy = False  # См. LazyEnvironmentTables
+
+    def __init__(self, env=None):
+        env = env if env is not None else MandatoryKeysEnvironment()
+        self._init_map(env)
+
+        masks = np.arange(self.n_states) % self.n_masks
+        popcount = np.array([bin(m).count('1') for m in range(self.n_masks)])
+        self.keys_collected = popcount[masks]
+        self.has_all_keys = masks == self.full_mask
+        self.max_steps = np.where(self.has_all_keys, env.max_steps_with_keys, env.max_steps)
+
+        shape = (self.n_states, self.action_size)
+        self.next_state = np.zeros(shape, dtype=np.int64)
+        self.reward = np.zeros(shape, dtype=self.reward_dtype)
+        self.timeout_reward = np.zeros(shape, dtype=self.reward_dtype)
+        self.terminal = np.zeros(shape, dtype=bool)
+        self.success = np.zeros(shape, dtype=bool)
+        self._build()
+
+        self.next_state_list = None
+
+    def _init_map(self, env):
+        """Параметры карты и размеры (общие с LazyEnvironmentTables)"""
+        self.config = env.config()
+        self.layout = env.layout
+        self.shaping = env.shaping
+        self.shaping_gamma = env.shaping_gamma
+        self.grid_size = env.grid_size
+        self.total_keys = env.total_keys
+        self.start_pos = env.start_pos.copy()
+        self.treasure_pos = env.treasure_pos.copy()
+        self.key_positions = [key.copy() for key in env.key_positions]
+        self.traps = [trap.copy() for trap in env.traps]
+
+        self.action_size = 4
+        self.n_masks = 1 << self.total_keys
+        self.full_mask = self.n_masks - 1
+        self.n_cells = self.grid_size * self.grid_size
+        self.n_states = self.n_cells * self.n_masks
+        self.start_state = self.pack(self.start_pos, 0)
+        # С потенциалами награды дробные
+        self.reward_dtype = np.float64 if self.shaping == POTENTIAL else np.int64
+        self._geometry = None
+
+    def _build(self):
+        """Заполнение таблиц по правилам MandatoryKeysEnvironment.step"""
+        cells = np.arange(self.n_cells)
+        for mask in range(self.n_masks):
+            block = self._transitions(mask, cells)
+            states = cells * self.n_masks + mask
+            for name, values in block.items():
+                getattr(self, name)[states] = values
+
+    def _cell_geometry(self):
+        """Переходы и свойства соседних клеток для всех клеток (считаются один раз)"""
+        if self._geometry is not None:
+            return self._geometry
+        size = self.grid_size
+        cells = np.arange(self.n_cells)
+        rows, cols = np.divmod(cells, size)
+
+        # Переходы по клеткам: moves[клетка, действие] (↑, ↓, ←, →)
+        moves = np.stack([
+            np.where(rows > 0, cells - size, cells),
+            np.where(rows < size - 1, cells + size, cells),
+            np.where(cols > 0, cells - 1, cells),
+            np.where(cols < size - 1, cells + 1, cells),
+        ], axis=1)
+        moved = moves != cells[:, None]
+
+        is_trap = np.zeros(self.n_cells, dtype=bool)
+        for trap in self.traps:
+            is_trap[trap[0] * size + trap[1]] = True
+        key_bit = np.zeros(self.n_cells, dtype=np.int64)
+        for i, key in enumerate(self.key_positions):
+            key_bit[key[0] * size + key[1]] = 1 << i
+        treasure_cell = self.treasure_pos[0] * size + self.treasure_pos[1]
+        treasure_dist = self.layout.treasure_field
+
+        self._geometry = {
+            'moves': moves,
+            'moved': moved,
+            'trap': is_trap[moves],
+            'bit': key_bit[moves],
+            'at_treasure': moves == treasure_cell,
+            'closer_to_treasure': treasure_dist[moves] < treasure_dist[:, None],
+        }
+        return self._geometry
+
+    def _transitions(self, mask, cells):
+        """Строки таблиц для клеток cells (массив) с маской ключей mask"""
+        geometry = self._cell_geometry()
+        moves, moved = geometry['moves'][cells], geometry['moved'][cells]
+        trap, bit = geometry['trap'][cells], geometry['bit'][cells]
+        at_treasure = geometry['at_treasure'][cells]
+
+        had_all = mask == self.full_mask
+        key = ~trap & (bit != 0) & ((bit & mask) == 0)
+        new_mask = np.where(key, bit | mask, mask)
+        treasure = ~trap & ~key & at_treasure
+        plain = ~(trap | key | treasure)
+
+        reward = np.where(trap, -100, 0)
+        reward = np.where(key, np.where(new_mask == self.full_mask, 150, 50), reward)
+        if self.shaping == POTENTIAL:
+            reward = np.where(treasure, 500 + self.total_keys * 100 if had_all else -200,
+                              reward)
+            plain_reward = STEP_COST
+        elif had_all:
+            reward = np.where(treasure, 500 + self.total_keys * 100, reward)
+            plain_reward = np.where(geometry['closer_to_treasure'][cells], 5, -3)
+        else:
+            reward = np.where(treasure, -200, reward)
+            # Расстояние до ближайшего несобранного ключа против старого
+            # "расстояния" (0 или 1), как в MandatoryKeysEnvironment.step
+            key_dist = self.layout.key_fields
+            remaining = [key_dist[i] for i in range(self.total_keys) if not mask & (1 << i)]
+            new_dist = np.min(remaining, axis=0)[moves]
+            old_dist = moved.astype(np.int64)
+            plain_reward = np.where(new_dist < old_dist, 3,
+                                    np.where(new_dist > old_dist, -2, -1))
+        reward = np.where(plain, plain_reward, reward)
+        if self.shaping == POTENTIAL:
+            reward = reward + self.layout.shaping.bonus_table(
+                mask, cells[:, None], new_mask, moves, trap | (treasure & (not had_all)),
+                self.shaping_gamma)
+
+        # Штраф, если шаг оказался последним по лимиту
+        penalty = np.where(new_mask != self.full_mask, -50,
+                           np.where(at_treasure, 0, -30))
+
+        return {
+            'next_state': moves * self.n_masks + new_mask,
+            'reward': reward,
+            'timeout_reward': reward + penalty,
+            'terminal': trap | treasure,
+            'success': treasure & had_all,
+        }
+
+    @classmethod
+    def default(cls):
+        """Таблицы для стандартной карты (строятся один раз на процесс)"""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def build_lists(self):
+        """Списки Python для скалярного быстрого пути (строятся один раз).
+
+        Индексация списков заметно дешевле, чем доступ к элементам массивов NumPy.
+        """
+        if self.next_state_list is None:
+            self.reward_list = self.reward.tolist()
+            self.timeout_reward_list = self.timeout_reward.tolist()
+            self.terminal_list = self.terminal.tolist()
+            self.success_list = self.success.tolist()
+            self.max_steps_list = self.max_steps.tolist()
+            self.next_state_list = self.next_state.tolist()
+        return self
+
+    def dense(self):
+        """Плотные таблицы этой карты (для оценки, планирования и ядра обучения)"""
+        return self
+
+    def pack(self, pos, mask):
+        """Позиция [строка, столбец] и маска ключей -> упакованное состояние"""
+        return (pos[0] * self.grid_size + pos[1]) * self.n_masks + mask
+
+    def unpack(self, state):
+        """Упакованное состояние -> (позиция [строка, столбец], маска ключей)"""
+        cell, mask = divmod(state, self.n_masks)
+        return [cell // self.grid_size, cell % self.grid_size], mask
+
+class _LazyRows(dict):
+    """Строки таблицы по состоянию; отсутствующие достраивает LazyEnvironmentTables"""
+    def __init__(self, tables):
+        super().__init__()
+        self.tables = tables
+
+    def __missing__(self, state):
+        self.tables._fill(state)
+        return dict.__getitem__(self, state)
+
+class _KeysCollected:
+    """keys_collected[состояние] без массива на все состояния"""
+    def __init__(self, n_masks):
+        self.n_masks = n_masks
+
+    def __getitem__(self, state):
+        return bin(state % self.n_masks).count('1')
+
+class LazyEnvironmentTables(EnvironmentTables):
+    """Таблицы переходов, которые считаются по мере обучения.
+
+    Вместо плотных массивов на все состояния (на карте 64x64 с 10 ключами -
+    4 млн состояний, гигабайты вместе со списками) - словари *_list с теми
+    же строками, что у EnvironmentTables. При первом обращении к состоянию
+    строки считаются сразу для всей строки сетки с той же маской ключей
+    (теми же векторными правилами), так что память растет с числом
+    посещенных состояний. Хватает CompactKeysEnvironment и Trainer; оценке,
+    планированию и ядру обучения плотные таблицы строит dense() - только
+    когда они действительно нужны.
+    """
+    lazy = True
+
+    def __init__(self, env=None):
+        env = env if env is not None else MandatoryKeysEnvironment()
+        self._init_map(env)
+        self._env = env
+        self._dense = None
+        self.max_steps_pair = (env.max_steps, env.max_steps_with_keys)
+        self.keys_collected = _KeysCollected(self.n_masks)
+        self.next_state_list = _LazyRows(self)
+        self.reward_list = _LazyRows(self)
+        self.timeout_reward_list = _LazyRows(self)
+        self.terminal_list = _LazyRows(self)
+        self.success_list = _LazyRows(self)
+        self.max_steps_list = _LazyRows(self)
+
+    def _fill(self, state):
+        """Строки всех клеток строки сетки, где лежит state, с его маской ключей"""
+        cell, mask = divmod(state, self.n_masks)
+        first = cell - cell % self.grid_size
+        cells = np.arange(first, first + self.grid_size)
+        states = (cells * self.n_masks + mask).tolist()
+        for name, values in self._transitions(mask, cells).items():
+            getattr(self, name + "_list").update(zip(states, values.tolist()))
+        limit = self.max_steps_pair[mask == self.full_mask]
+        self.max_steps_list.update(dict.fromkeys(states, limit))
+
+    def dense(self):
+        if self._dense is None:
+            self._dense = EnvironmentTables(self._env)
+        return self._dense
+
+    @property
+    def cached_states(self):
+        """Сколько состояний уже посчитано"""
+        return len(self.next_state_list)
+
+def lazy_tables(grid_size, total_keys, storage="auto"):
+    """Нужны ли LazyEnvironmentTables: при разреженной Q-таблице или больше
+    LAZY_TABLES_STATES состояний
+    """
+    n_states = grid_size * grid_size << total_keys
+    return (resolve_storage(n_states, 4, storage) == "sparse" or
+            n_states > LAZY_TABLES_STATES)
+
+def make_tables(env, storage="auto"):
+    """Таблицы переходов среды: ленивые, если того требует lazy_tables"""
+    if lazy_tables(env.grid_size, env.total_keys, storage):
+        return LazyEnvironmentTables(env)
+    return EnvironmentTables(env)
+
+# ==================== КОМПАКТНАЯ СРЕДА ====================
+class CompactKeysEnvironment:
+    """Быстрый вариант MandatoryKeysEnvironment для цикла обучения.
+
+    Состояние хранится одним упакованным целым числом, step() возвращает
+    (индекс состояния, награда, done) без копирования списков. Словарь
+    для отрисовки строится только по запросу через get_state().
+    """
+    __slots__ = ('tables', 'state', 'steps', 'done', 'terminated', 'truncated', 'success',
+                 'total_reward', 'last_action')
+
+    def __init__(self, tables=None):
+        self.tables = tables if tables is not None else EnvironmentTables.default()
+        self.tables.build_lists()
+        self.reset()
+
+    def reset(self, layout=None):
+        """Новый эпизод; возвращает индекс состояния.
+
+        layout - другая карта (maps.Layout) того же размера и с тем же числом
+        ключей; ее таблицы переходов берутся из кэша карты.
+        """
+        if layout is not None:
+            self.tables = layout.get_tables(self.tables.shaping, self.tables.lazy,
+                                            self.tables.shaping_gamma)
+            self.tables.build_lists()
+        self.state = self.tables.start_state
+        self.steps = 0
+        self.done = False
+        self.terminated = False
+        self.truncated = False
+        self.success = False
+        self.total_reward = 0
+        self.last_action = None
+        return self.state
+
+    @property
+    def state_index(self):
+        """Индекс текущего состояния в Q-таблице агента"""
+        return self.state
+
+    @property
+    def keys_collected(self):
+        return int(self.tables.keys_collected[self.state])
+
+    def step(self, action):
+        """Шаг: (индекс состояния, награда, done)"""
+        tables = self.tables
+        if self.done:
+            return self.state, 0, True
+
+        state = self.state
+        self.state = tables.next_state_list[state][action]
+        self.steps += 1
+        self.last_action = action
+        self.success = tables.success_list[state][action]
+        self.terminated = tables.terminal_list[state][action]
+
+        # Ограничение по шагам (награда уже включает штраф)
+        if self.steps >= tables.max_steps_list[self.state]:
+            reward = tables.timeout_reward_list[state][action]
+            self.truncated = not self.terminated
+            self.done = True
+        else:
+            reward = tables.reward_list[state][action]
+            self.done = self.terminated
+
+        self.total_reward += reward
+
+        return self.state, reward, self.done
+
+    def get_state(self):
+        """Словарь в формате MandatoryKeysEnvironment.get_state (для отрисовки)"""
+        tables = self.tables
+        pos, mask = tables.unpack(self.state)
+        collected = [key.copy() for i, key in enumerate(tables.key_positions) if mask & (1 << i)]
+        return {
+            'agent_pos': pos,
+            'treasure_pos': tables.treasure_pos,
+            'keys': [key.copy() for i, key in enumerate(tables.key_positions) if not mask & (1 << i)],
+            'traps': [trap.copy() for trap in tables.traps],
+            'collected_keys': collected,
+            'key_mask': mask,
+            'grid_size': tables.grid_size,
+            'keys_collected': len(collected),
+            'keys_remaining': tables.total_keys - len(collected),
+            'total_keys': tables.total_keys,
+            'steps': self.steps,
+            'done': self.done,
+            'reward': self.total_reward,
+            'has_all_keys': len(collected) == tables.total_keys,
+            'last_action': ACTION_NAMES[self.last_action] if self.last_action is not None else "—"
+        }
+
+# ==================== ВЕКТОРНАЯ СРЕДА ====================
+class VectorMandatoryKeysEnvironment:
+    """N копий MandatoryKeysEnvironment, которые шагают одной операцией NumPy.
+
+    Правила, награды и лимиты шагов совпадают со скалярной средой. Завершившиеся
+    эпизоды автоматически сбрасываются в конце step().
+    """
+    def __init__(self, num_envs, tables=None):
+        self.num_envs = num_envs
+        self.tables = (tables if tables is not None else EnvironmentTables.default()).dense()
+
+        self.states = np.full(num_envs, self.tables.start_state, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.total_reward = np.zeros(num_envs, dtype=self.tables.reward.dtype)
+        self.done = np.zeros(num_envs, dtype=bool)
+
+    @property
+    def positions(self):
+        """Номера клеток агентов (строка * grid_size + столбец)"""
+        return self.states // self.tables.n_masks
+
+    @property
+    def key_mask(self):
+        """Битовые маски собранных ключей"""
+        return self.states % self.tables.n_masks
+
+    def reset(self, mask=None):
+        """Сброс всех (или выбранных маской) эпизодов"""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.states[mask] = self.tables.start_state
+        self.steps[mask] = 0
+        self.total_reward[mask] = 0
+        self.done[mask] = False
+        return self.state_indices()
+
+    def state_indices(self):
+        """Индексы состояний в той же схеме, что KeyPriorityAgent.get_state_index"""
+        return self.states.copy()
+
+    def step(self, actions):
+        """Шаг всех сред сразу.
+
+        Возвращает (индексы состояний, награды, done, info). Для завершившихся
+        эпизодов индексы уже относятся к новому эпизоду, а итоги эпизода лежат
+        в info: 'terminated', 'truncated', 'success', 'keys_collected',
+        'episode_reward', 'episode_steps'.
+        """
+        tables = self.tables
+        actions = np.asarray(actions)
+        states = self.states
+
+        self.states = tables.next_state[states, actions]
+        self.steps += 1
+        terminated = tables.terminal[states, actions]
+
+        # Ограничение по шагам (награда на последнем шаге включает штраф)
+        timeout = self.steps >= tables.max_steps[self.states]
+        rewards = np.where(timeout, tables.timeout_reward[states, actions],
+                           tables.reward[states, actions])
+        self.total_reward += rewards
+        self.done = terminated | timeout
+
+        done = self.done.copy()
+        info = {
+            'terminated': terminated,
+            'truncated': timeout & ~terminated,
+            'success': tables.success[states, actions],
+            'keys_collected': tables.keys_collected[self.states],
+            'episode_reward': self.total_reward.copy(),
+            'episode_steps': self.steps.copy(),
+        }
+
+        # Автосброс завершившихся эпизодов
+        if done.any():
+            self.reset(done)
+
+        return self.state_indices(), rewards, done, info
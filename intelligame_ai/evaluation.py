@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+
+from .core import EnvironmentTables
+from .inference import greedy_actions
+from .maps import generate_layout
+
+# ==================== ОЦЕНКА ЖАДНОЙ ПОЛИТИКИ ====================
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def start_states(tables):
+    """Упакованные состояния без ключей во всех свободных клетках карты.
+
+    Клетки ловушек, ключей и сокровища не считаются стартовыми.
+    """
+    occupied = {tuple(cell) for cell in tables.traps + tables.key_positions + [tables.treasure_pos]}
+    cells = [row * tables.grid_size + col
+             for row in range(tables.grid_size) for col in range(tables.grid_size)
+             if (row, col) not in occupied]
+    return np.array(cells, dtype=np.int64) * tables.n_masks
+
+def random_layouts(tables, count, seed=None):
+    """count случайных проходимых карт того же размера, с тем же числом ключей и ловушек"""
+    rng = np.random.default_rng(seed)
+    return [generate_layout(tables.grid_size, tables.total_keys, len(tables.traps),
+                            seed=int(rng.integers(2**31))).get_tables(
+                                tables.shaping, shaping_gamma=tables.shaping_gamma)
+            for _ in range(count)]
+
+def greedy_rollouts(actions, tables, states):
+    """Жадные эпизоды из всех states одновременно.
+
+    actions - действие для каждого состояния (см. inference.greedy_actions).
+    Правила и лимиты шагов те же, что в VectorMandatoryKeysEnvironment;
+    завершившиеся эпизоды выбывают из пачки. Возвращает словарь массивов
+    reward, success, keys, steps, truncated.
+    """
+    n = len(states)
+    rewards = np.zeros(n, dtype=tables.reward.dtype)
+    steps = np.zeros(n, dtype=np.int64)
+    success = np.zeros(n, dtype=bool)
+    keys = np.zeros(n, dtype=np.int64)
+    truncated = np.zeros(n, dtype=bool)
+
+    active = np.arange(n)
+    current = np.asarray(states, dtype=np.int64)
+    while len(active):
+        action = actions[current]
+        following = tables.next_state[current, action]
+        steps[active] += 1
+        terminated = tables.terminal[current, action]
+        timeout = steps[active] >= tables.max_steps[following]
+        rewards[active] += np.where(timeout, tables.timeout_reward[current, action],
+                                    tables.reward[current, action])
+
+        done = terminated | timeout
+        if done.any():
+            finished = active[done]
+            success[finished] = tables.success[current[done], action[done]]
+            keys[finished] = tables.keys_collected[following[done]]
+            truncated[finished] = ~terminated[done]
+            active = active[~done]
+            following = following[~done]
+        current = following
+
+    return {'reward': rewards, 'success': success, 'keys': keys, 'steps': steps,
+            'truncated': truncated}
+
+class _StackedTables:
+    """Несколько карт одного размера как одна: состояние карты i сдвинуто на i * n_states"""
+    def __init__(self, layouts):
+        first = layouts[0]
+        if any(t.n_states != first.n_states for t in layouts):
+            raise ValueError("Карты для оценки должны быть одного размера и с тем же числом ключей")
+        offsets = np.arange(len(layouts))[:, None, None] * first.n_states
+        self.next_state = (np.stack([t.next_state for t in layouts]) + offsets).reshape(-1, first.action_size)
+        for name in ('reward', 'timeout_reward', 'terminal', 'success', 'max_steps',
+                     'keys_collected'):
+            setattr(self, name, np.concatenate([getattr(t, name) for t in layouts]))
+
+def evaluate(q_table, tables=None, layouts=None):
+    """Оценка жадной политики по всем стартовым клеткам без исследования.
+
+    layouts - дополнительные карты того же размера (например, из
+    random_layouts): все эпизоды считаются одной векторной пачкой. Возвращает
+    сводку (успешность в %, средние ключи, награда, длина пути, доли числа
+    собранных ключей, перцентили награды и длины) и массивы по эпизодам.
+    """
+    tables = (tables if tables is not None else EnvironmentTables.default()).dense()
+    start = time.perf_counter()
+    actions = greedy_actions(q_table)
+    if len(actions) != tables.n_states:
+        raise ValueError(f"Q-таблица на {len(actions)} состояний, а карте нужно {tables.n_states}")
+
+    maps = [tables] + list(layouts or ())
+    if len(maps) == 1:
+        batch_tables = tables
+        states = start_states(tables)
+    else:
+        batch_tables = _StackedTables(maps)
+        actions = np.tile(actions, len(maps))
+        states = np.concatenate([start_states(t) + i * tables.n_states for i, t in enumerate(maps)])
+    results = greedy_rollouts(actions, batch_tables, states)
+
+    rewards, steps = results['reward'], results['steps']
+    return {
+        'episodes': len(states),
+        'layouts': len(maps),
+        'success_rate': float(results['success'].mean() * 100),
+        'avg_keys': float(results['keys'].mean()),
+        'avg_reward': float(rewards.mean()),
+        'avg_steps': float(steps.mean()),
+        'truncated_rate': float(results['truncated'].mean() * 100),
+        'keys_distribution': (np.bincount(results['keys'], minlength=tables.total_keys + 1)
+                              / len(states)).tolist(),
+        'reward_percentiles': dict(zip(PERCENTILES, np.percentile(rewards, PERCENTILES).tolist())),
+        'steps_percentiles': dict(zip(PERCENTILES, np.percentile(steps, PERCENTILES).tolist())),
+        'seconds': time.perf_counter() - start,
+        'start_states': states,
+        'results': results,
+    }
+
+if __name__ == "__main__":
+    from .planning import solve
+    from .trainer import Trainer
+
+    tables = EnvironmentTables.default()
+    trainer = Trainer()
+    for episodes in (0, 500, 1500):
+        if episodes:
+            trainer.train(episodes)
+        report = evaluate(trainer.agent.q_table, tables)
+        print(f"После {trainer.total_episodes} эпизодов: жадная успешность "
+              f"{report['success_rate']:.1f}% из {report['episodes']} стартов, "
+              f"ключи {report['avg_keys']:.2f}, шагов {report['avg_steps']:.1f}, "
+              f"{report['seconds'] * 1000:.2f} мс")
+
+    q, _, _ = solve(tables)
+    report = evaluate(q, tables, random_layouts(tables, 50, seed=0))
+    print(f"Оптимальная политика на {report['layouts']} картах ({report['episodes']} эпизодов): "
+          f"успешность {report['success_rate']:.1f}%, {report['seconds'] * 1000:.1f} мс")
@@ -0,0 +1,216 @@
+import numpy as np
+
+from .core import SparseQTable
+
+# ==================== ИССЛЕДОВАНИЕ ====================
+# Способы выбора действий при обучении (KeyPriorityAgent.exploration):
+# "step" - epsilon-жадный выбор, epsilon уменьшается после каждого
+# обновления (исходное поведение: скорость зависит от длины эпизодов),
+# "linear"/"exponential" - epsilon по номеру эпизода, "ucb" и "count" -
+# жадный выбор по Q плюс бонус за редкие действия (счетчики посещений),
+# "boltzmann" - выбор по softmax(Q / температура)
+STEP = "step"
+LINEAR = "linear"
+EXPONENTIAL = "exponential"
+UCB = "ucb"
+COUNT = "count"
+BOLTZMANN = "boltzmann"
+EXPLORATIONS = (STEP, LINEAR, EXPONENTIAL, UCB, COUNT, BOLTZMANN)
+
+def make_exploration(name, **params):
+    """Способ исследования по имени из EXPLORATIONS"""
+    classes = {cls.name: cls for cls in (StepDecay, LinearDecay, ExponentialDecay, UCB1,
+                                         CountBonus, Boltzmann)}
+    if name not in classes:
+        raise ValueError(f"Неизвестный способ исследования: {name}")
+    return classes[name](**params)
+
+def softmax(values, temperature):
+    """Вероятности softmax(values / temperature) по последней оси (строки Q или пачка строк)"""
+    scaled = np.asarray(values, dtype=np.float64) / temperature
+    scaled -= scaled.max(axis=-1, keepdims=True)  # Без переполнения exp
+    weights = np.exp(scaled)
+    return weights / weights.sum(axis=-1, keepdims=True)
+
+class StepDecay:
+    """Epsilon-жадный выбор; epsilon *= epsilon_decay после каждого обновления.
+
+    Базовый класс остальных способов: select выбирает действие, start_episode
+    и after_update двигают расписание, expected_value дает ожидание Q по
+    политике выбора (для Expected SARSA). Гиперпараметры epsilon берутся из
+    агента, поэтому один объект можно передавать разным агентам.
+    """
+    name = STEP
+    uses_epsilon = True  # Выбор зависит от agent.epsilon (его стоит показывать)
+
+    def __init__(self):
+        self.episode = 0  # Эпизодов с начала расписания
+
+    def params(self):
+        """Параметры для контрольной точки (make_exploration(name, **params))"""
+        return {}
+
+    def state(self):
+        return {'episode': self.episode}
+
+    def load_state(self, state):
+        self.episode = state['episode']
+
+    def tables(self):
+        """Массивы для контрольной точки (счетчики посещений)"""
+        return {}
+
+    def load_tables(self, tables):
+        pass
+
+    def start_episode(self, agent):
+        self.episode += 1
+
+    def select(self, agent, state_idx):
+        """Действие при обучении"""
+        if agent.rng.random() < agent.epsilon:
+            return agent.rng.randint(0, agent.action_size - 1)
+        return np.argmax(agent.q_table[state_idx])
+
+    def after_update(self, agent):
+        if agent.epsilon > agent.epsilon_min:
+            agent.epsilon *= agent.epsilon_decay
+
+    def expected_value(self, agent, states, rows):
+        """E[Q(s, a)] по политике выбора для строки Q (или пачки строк) состояний states"""
+        epsilon = agent.epsilon
+        return (1 - epsilon) * rows.max(axis=-1) + epsilon * rows.mean(axis=-1)
+
+    def describe(self, agent):
+        """Текущий параметр исследования для вывода (None - показывать нечего)"""
+        return f"epsilon {agent.epsilon:.4f}"
+
+class LinearDecay(StepDecay):
+    """Epsilon линейно от start до end (по умолчанию agent.epsilon_min) за
+    episodes эпизодов и дальше не меняется
+    """
+    name = LINEAR
+
+    def __init__(self, start=1.0, end=None, episodes=100):
+        super().__init__()
+        self.start = start
+        self.end = end
+        self.episodes = episodes
+
+    def params(self):
+        return {'start': self.start, 'end': self.end, 'episodes': self.episodes}
+
+    def value(self, end):
+        """Значение расписания для текущего эпизода"""
+        progress = min(self.episode / self.episodes, 1.0) if self.episodes > 0 else 1.0
+        return self.start + (end - self.start) * progress
+
+    def start_episode(self, agent):
+        agent.epsilon = self.value(agent.epsilon_min if self.end is None else self.end)
+        self.episode += 1
+
+    def after_update(self, agent):
+        pass
+
+class ExponentialDecay(LinearDecay):
+    """Epsilon экспоненциально от start до end за episodes эпизодов"""
+    name = EXPONENTIAL
+
+    def value(self, end):
+        progress = min(self.episode / self.episodes, 1.0) if self.episodes > 0 else 1.0
+        return self.start * (end / self.start) ** progress
+
+class CountBonus(StepDecay):
+    """Жадный выбор по Q(s, a) + scale / sqrt(n(s, a) + 1).
+
+    n(s, a) - сколько раз действие выбиралось в состоянии при обучении.
+    Счетчики - массив int32 того же размера, что Q-таблица (для
+    разреженной таблицы - разреженный), создаются при первом выборе.
+    Epsilon не используется.
+    """
+    name = COUNT
+    uses_epsilon = False
+
+    def __init__(self, scale=10.0):
+        super().__init__()
+        self.scale = scale
+        self.counts = None
+
+    def params(self):
+        return {'scale': self.scale}
+
+    def tables(self):
+        return {} if self.counts is None else {'counts': self.counts}
+
+    def load_tables(self, tables):
+        self.counts = tables['counts']
+
+    def bonus(self, counts):
+        return self.scale / np.sqrt(counts + 1.0)
+
+    def select(self, agent, state_idx):
+        if self.counts is None:
+            if isinstance(agent.q_table, SparseQTable):
+                self.counts = SparseQTable(agent.state_size, agent.action_size, np.int32)
+            else:
+                self.counts = np.zeros((agent.state_size, agent.action_size), dtype=np.int32)
+        action = np.argmax(agent.q_table[state_idx] + self.bonus(self.counts[state_idx]))
+        self.counts[state_idx, action] = self.counts[state_idx, action] + 1
+        return action
+
+    def after_update(self, agent):
+        pass
+
+    def expected_value(self, agent, states, rows):
+        # Выбор детерминирован: Q действия, которое select выбрал бы сейчас
+        if self.counts is None:
+            counts = np.zeros(rows.shape, dtype=np.int32)
+        elif isinstance(self.counts, SparseQTable):
+            counts = self.counts.take(np.atleast_1d(states)).reshape(rows.shape)
+        else:
+            counts = self.counts[states]
+        actions = np.argmax(rows + self.bonus(counts), axis=-1)
+        return np.take_along_axis(rows, np.expand_dims(actions, -1), axis=-1).squeeze(-1)
+
+    def describe(self, agent):
+        return None
+
+class UCB1(CountBonus):
+    """Жадный выбор по Q(s, a) + scale * sqrt(ln N(s) / n(s, a)), N(s) -
+    сумма n(s, .); еще не выбранные в состоянии действия идут первыми
+    """
+    name = UCB
+
+    def bonus(self, counts):
+        # counts - строка счетчиков или пачка строк (N(s) - по каждой строке)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bonus = self.scale * np.sqrt(np.log(counts.sum(axis=-1, keepdims=True) + 1.0) / counts)
+        return np.where(counts > 0, bonus, np.inf)
+
+class Boltzmann(ExponentialDecay):
+    """Выбор с вероятностями softmax(Q(s, .) / T); температура T
+    экспоненциально от start до end за episodes эпизодов. Epsilon не
+    используется.
+    """
+    name = BOLTZMANN
+    uses_epsilon = False
+
+    def __init__(self, start=10.0, end=0.5, episodes=100):
+        super().__init__(start, end, episodes)
+        self.temperature = start
+
+    def start_episode(self, agent):
+        self.temperature = self.value(self.end)
+        self.episode += 1
+
+    def select(self, agent, state_idx):
+        cumulative = np.cumsum(softmax(agent.q_table[state_idx], self.temperature))
+        action = np.searchsorted(cumulative, agent.rng.random() * cumulative[-1], side='right')
+        return min(int(action), agent.action_size - 1)
+
+    def expected_value(self, agent, states, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        return (softmax(rows, self.temperature) * rows).sum(axis=-1)
+
+    def describe(self, agent):
+        return f"температура {self.temperature:.2f}"
@@ -0,0 +1,1033 @@
+import math
+import sys
+import threading
+import numpy as np
+import time
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+from .core import KeyPriorityAgent, MandatoryKeysEnvironment
+from .exploration import BOLTZMANN, COUNT, EXPLORATIONS, EXPONENTIAL, LINEAR, STEP, UCB
+from .learners import DOUBLE_Q, EXPECTED_SARSA, LEARNERS, Q_LAMBDA, Q_LEARNING, SARSA
+from .profiling import LOOP, PROFILER, RENDER
+from .stats import REWARD, KEYS, SUCCESS, RollingStats, lttb
+from .trainer import Trainer
+
+# ==================== ОБУЧЕНИЕ В ОТДЕЛЬНОМ ПОТОКЕ ====================
+class TrainingWorker(QObject):
+    """Пакетное обучение вне потока GUI.
+
+    Эпизоды идут пачками по chunk, результаты копятся и отправляются сигналом
+    progress не чаще раза в interval секунд; в конце приходит finished с
+    остатком. Каждый сигнал - словарь с массивами rewards/successes/keys
+    новых эпизодов, счетчиком episodes и параметром исследования exploration.
+    """
+    progress = pyqtSignal(dict)
+    finished = pyqtSignal(dict)
+
+    def __init__(self, trainer, episodes, chunk=50, interval=0.1):
+        super().__init__()
+        self.trainer = trainer
+        self.episodes = episodes
+        self.chunk = chunk
+        self.interval = interval
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Остановка после текущей пачки (можно вызывать из любого потока)"""
+        self._cancelled.set()
+
+    def run(self):
+        start = last_report = time.perf_counter()
+        pending = []
+        done = 0
+        while done < self.episodes and not self._cancelled.is_set():
+            chunk = self.trainer.run_episodes(min(self.chunk, self.episodes - done))
+            pending.append(chunk)
+            done += len(chunk[0])
+
+            now = time.perf_counter()
+            if now - last_report >= self.interval:
+                self.progress.emit(self._report(pending, done, now - start))
+                pending = []
+                last_report = now
+
+        report = self._report(pending, done, time.perf_counter() - start)
+        report['cancelled'] = self._cancelled.is_set()
+        self.finished.emit(report)
+
+    def _report(self, pending, done, elapsed):
+        columns = list(zip(*pending)) or [[], [], []]
+        rewards, successes, keys = (np.concatenate(column) if column else np.zeros(0, dtype=np.int64)
+                                    for column in columns)
+        return {
+            'episodes': done,
+            'rewards': rewards,
+            'successes': successes,
+            'keys': keys,
+            'exploration': self.trainer.agent.exploration.describe(self.trainer.agent),
+            'elapsed': elapsed,
+        }
+
+# ==================== ГРАФИЧЕСКИЙ ИНТЕРФЕЙС ====================
+class EnhancedGameCanvas(QWidget):
+    """Улучшенный виджет с отображением ключей.
+
+    Неподвижные части (фон, сетка, ловушки) рисуются один раз в QPixmap
+    и пересоздаются только при смене карты или размера. Перья, кисти и
+    шрифты создаются один раз. Таймер анимации перерисовывает
+    только клетки агента, ключей и сокровища и стоит, пока виджет скрыт
+    или анимация выключена (например, во время пакетного обучения).
+    """
+    def __init__(self):
+        super().__init__()
+        self.setMinimumSize(450, 450)
+        self.cell_size = 65
+        self.agent_animation = 0
+        
+        self.animation_timer = QTimer(self)
+        self.animation_timer.timeout.connect(self.update_animation)
+        self.animation_enabled = True
+        
+        self.colors = {
+            'background': QColor(245, 245, 250),
+            'grid': QColor(180, 180, 200),
+            'agent': QColor(65, 105, 225),
+            'treasure': QColor(255, 215, 0),
+            'trap': QColor(220, 20, 60),
+            'key': QColor(50, 205, 50),
+            'key_collected': QColor(150, 255, 150),
+            'path': QColor(135, 206, 250, 100),
+            'text': QColor(40, 40, 40)
+        }
+        
+        # Перья, кисти и шрифты (создаются один раз)
+        self.pens = {
+            'grid': QPen(self.colors['grid'], 1),
+            'path': QPen(self.colors['path'], 3),
+            'trap': QPen(Qt.GlobalColor.darkRed, 2),
+            'white': QPen(Qt.GlobalColor.white, 2),
+            'key': QPen(Qt.GlobalColor.darkGreen, 2),
+            'panel': QPen(Qt.GlobalColor.gray, 1),
+            'text': QPen(self.colors['text'], 2),
+            'slot_empty': QPen(Qt.GlobalColor.darkGray, 2),
+            'rays': QPen(QColor(255, 255, 100, 150), 2),
+            'treasure': QPen(QColor(200, 150, 0), 3),
+            'agent': QPen(Qt.GlobalColor.darkBlue, 2),
+        }
+        self.brushes = {
+            'trap': QBrush(self.colors['trap']),
+            'key': QBrush(self.colors['key']),
+            'key_collected': QBrush(self.colors['key_collected']),
+            'panel': QBrush(QColor(240, 240, 240)),
+            'slot_empty': QBrush(QColor(200, 200, 200)),
+            'treasure': QBrush(self.colors['treasure']),
+            'treasure_open': QBrush(QColor(255, 255, 150)),
+        }
+        self.fonts = {
+            'key': QFont("Arial", 14),
+            'panel': QFont("Arial", 10, QFont.Weight.Bold),
+            'treasure': QFont("Arial", 20),
+            'info': QFont("Arial", 10),
+        }
+        
+        self.agent_path = []
+        self.game_state = None
+        
+        # Кэш неподвижных слоев: фон с сеткой и прозрачный слой ловушек
+        self.static_key = None
+        self.static_layers = None
+    
+    def update_state(self, state):
+        """Обновление состояния"""
+        self.game_state = state
+        self.agent_path.append(state['agent_pos'].copy())
+        if len(self.agent_path) > 25:
+            self.agent_path.pop(0)
+        self.update()
+    
+    def set_animation_enabled(self, enabled):
+        """Включение/выключение анимации (например, на время пакетного обучения)"""
+        self.animation_enabled = enabled
+        self.sync_animation_timer()
+    
+    def sync_animation_timer(self):
+        running = self.animation_enabled and self.isVisible() and not self.window().isMinimized()
+        if running and not self.animation_timer.isActive():
+            self.animation_timer.start(50)
+        elif not running:
+            self.animation_timer.stop()
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.sync_animation_timer()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.sync_animation_timer()
+    
+    def update_animation(self):
+        """Анимация: перерисовка только анимированных клеток"""
+        self.agent_animation = (self.agent_animation + 0.1) % 1
+        state = self.game_state
+        if state is None:
+            return
+        
+        self.update(self.cell_rect(state['agent_pos'], self.cell_size//2 + 8))
+        for key in state['keys']:
+            self.update(self.cell_rect(key, 24))
+        if state['has_all_keys']:
+            self.update(self.cell_rect(state['treasure_pos'], 44))
+    
+    def cell_center(self, pos):
+        return (pos[1] * self.cell_size + self.cell_size//2,
+                pos[0] * self.cell_size + self.cell_size//2)
+    
+    def cell_rect(self, pos, radius):
+        """Квадрат с центром в клетке pos"""
+        x, y = self.cell_center(pos)
+        return QRect(x - radius, y - radius, 2 * radius, 2 * radius)
+    
+    def static_pixmaps(self):
+        """Неподвижные слои (пересоздаются при смене карты или размера виджета)"""
+        state = self.game_state
+        ratio = self.devicePixelRatioF()
+        key = (state['grid_size'], tuple(map(tuple, state['traps'])), state['total_keys'],
+               self.width(), self.height(), ratio)
+        if key == self.static_key:
+            return self.static_layers
+        
+        def make_pixmap(fill):
+            pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(fill)
+            return pixmap
+        
+        # Фон и сетка
+        base = make_pixmap(self.colors['background'])
+        painter = QPainter(base)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(self.pens['grid'])
+        grid_size = state['grid_size']
+        side = grid_size * self.cell_size
+        for i in range(grid_size + 1):
+            painter.drawLine(i * self.cell_size, 0, i * self.cell_size, side)
+            painter.drawLine(0, i * self.cell_size, side, i * self.cell_size)
+        painter.end()
+        
+        # Ловушки (рисуются поверх пути агента)
+        overlay = make_pixmap(Qt.GlobalColor.transparent)
+        painter = QPainter(overlay)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font())
+        for trap in state['traps']:
+            x, y = self.cell_center(trap)
+            
+            painter.setBrush(self.brushes['trap'])
+            painter.setPen(self.pens['trap'])
+            painter.drawEllipse(QPoint(x, y), self.cell_size//3, self.cell_size//3)
+            
+            painter.setPen(self.pens['white'])
+            painter.drawText(QRect(x-10, y-10, 20, 20), Qt.AlignmentFlag.AlignCenter, "☠")
+        painter.end()
+        
+        self.static_key = key
+        self.static_layers = (base, overlay)
+        return self.static_layers
+    
+    def paintEvent(self, event):
+        """Отрисовка с информацией о ключах (только в пределах event.rect())"""
+        if self.game_state is None:
+            return
+        
+        state = self.game_state
+        dirty = event.rect()
+        base, overlay = self.static_pixmaps()
+        now = time.monotonic()
+        
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        
+        # Фон и сетка
+        painter.drawPixmap(dirty, base, self.pixmap_rect(dirty, base))
+        
+        # Путь
+        if len(self.agent_path) > 1:
+            painter.setPen(self.pens['path'])
+            for i in range(1, len(self.agent_path)):
+                x1, y1 = self.cell_center(self.agent_path[i-1])
+                x2, y2 = self.cell_center(self.agent_path[i])
+                painter.drawLine(x1, y1, x2, y2)
+        
+        # Ловушки
+        painter.drawPixmap(dirty, overlay, self.pixmap_rect(dirty, overlay))
+        
+        # Несобранные ключи
+        size = 15 + int(5 * math.sin(now * 3))  # Пульсирующий ключ
+        painter.setFont(self.fonts['key'])
+        for key in state['keys']:
+            x, y = self.cell_center(key)
+            
+            painter.setBrush(self.brushes['key'])
+            painter.setPen(self.pens['key'])
+            painter.drawEllipse(QPoint(x, y), size, size)
+            
+            painter.setPen(self.pens['white'])
+            painter.drawText(QRect(x-10, y-10, 20, 20), Qt.AlignmentFlag.AlignCenter, "🔑")
+        
+        # Собранные ключи (отображаем в отдельной панели)
+        collected_keys_panel = QRect(400, 50, 40, 120)
+        if dirty.intersects(QRect(400, 25, 50, 180)):
+            painter.setBrush(self.brushes['panel'])
+            painter.setPen(self.pens['panel'])
+            painter.drawRect(collected_keys_panel)
+            
+            painter.setPen(self.pens['text'])
+            painter.setFont(self.fonts['panel'])
+            painter.drawText(405, 40, "Ключи:")
+            
+            for i in range(state['total_keys']):
+                y = 60 + i * 35
+                if i < state['keys_collected']:
+                    painter.setBrush(self.brushes['key_collected'])
+                    painter.setPen(self.pens['key'])
+                    painter.drawEllipse(415, y, 20, 20)
+                    
+                    painter.setPen(self.pens['white'])
+                    painter.drawText(QRect(415, y, 20, 20), Qt.AlignmentFlag.AlignCenter, "✓")
+                else:
+                    painter.setBrush(self.brushes['slot_empty'])
+                    painter.setPen(self.pens['panel'])
+                    painter.drawEllipse(415, y, 20, 20)
+                    
+                    painter.setPen(self.pens['slot_empty'])
+                    painter.drawText(QRect(415, y, 20, 20), Qt.AlignmentFlag.AlignCenter, f"{i+1}")
+        
+        # Сокровище
+        x, y = self.cell_center(state['treasure_pos'])
+        
+        # Если собраны все ключи - сокровище сияет
+        if state['has_all_keys']:
+            painter.setBrush(self.brushes['treasure_open'])
+            
+            # Лучи света
+            painter.setPen(self.pens['rays'])
+            for i in range(12):
+                angle = now * 2 + i * math.pi/6
+                length = 25 + int(15 * math.sin(now * 4 + i))
+                x2 = x + int(length * math.cos(angle))
+                y2 = y + int(length * math.sin(angle))
+                painter.drawLine(x, y, x2, y2)
+        else:
+            painter.setBrush(self.brushes['treasure'])
+            painter.setPen(self.pens['treasure'])
+        
+        painter.drawEllipse(QPoint(x, y), self.cell_size//2, self.cell_size//2)
+        
+        painter.setPen(self.pens['white'])
+        painter.setFont(self.fonts['treasure'])
+        
+        if state['has_all_keys']:
+            painter.drawText(QRect(x-20, y-20, 40, 40), Qt.AlignmentFlag.AlignCenter, "💎")
+        else:
+            painter.drawText(QRect(x-20, y-20, 40, 40), Qt.AlignmentFlag.AlignCenter, "🔒")
+        
+        # Агент
+        x, y = self.cell_center(state['agent_pos'])
+        
+        size = self.cell_size//2 + int(5 * math.sin(self.agent_animation * 2 * math.pi))
+        
+        gradient = QRadialGradient(x, y, size)
+        if state['has_all_keys']:
+            gradient.setColorAt(0, QColor(0, 255, 0).lighter(150))
+            gradient.setColorAt(1, QColor(0, 200, 0).darker(150))
+        else:
+            gradient.setColorAt(0, self.colors['agent'].lighter(150))
+            gradient.setColorAt(1, self.colors['agent'].darker(150))
+        
+        painter.setBrush(QBrush(gradient))
+        painter.setPen(self.pens['agent'])
+        painter.drawEllipse(QPoint(x, y), size, size)
+        
+        # Информация
+        if dirty.intersects(QRect(0, 400, 400, 50)):
+            painter.setPen(self.pens['text'])
+            painter.setFont(self.fonts['info'])
+            
+            info = f"Ключи: {state['keys_collected']}/{state['total_keys']}"
+            if state['has_all_keys']:
+                info += " ✓ ГОТОВО!"
+            
+            painter.drawText(10, 420, info)
+            painter.drawText(10, 440, f"Шагов: {state['steps']}")
+    
+    @staticmethod
+    def pixmap_rect(rect, pixmap):
+        """Прямоугольник виджета -> прямоугольник в пикселях QPixmap"""
+        ratio = pixmap.devicePixelRatio()
+        return QRect(int(rect.x() * ratio), int(rect.y() * ratio),
+                     int(rect.width() * ratio), int(rect.height() * ratio))
+
+# ==================== ГЛАВНОЕ ОКНО ====================
+PLOT_POINTS = 300  # Точек на линию графика после прореживания (~ширина оси в пикселях)
+LEARNER_TITLES = {
+    Q_LEARNING: "Q-обучение",
+    SARSA: "SARSA",
+    EXPECTED_SARSA: "Expected SARSA",
+    DOUBLE_Q: "Двойное Q-обучение",
+    Q_LAMBDA: "Q(λ)",
+}
+EXPLORATION_TITLES = {
+    STEP: "ε по шагам",
+    LINEAR: "ε линейно по эпизодам",
+    EXPONENTIAL: "ε экспоненциально по эпизодам",
+    UCB: "UCB",
+    COUNT: "Бонус за редкие действия",
+    BOLTZMANN: "Больцман (softmax)",
+}
+
+class IntelliGameAI(QMainWindow):
+    """Главное окно с обязательным сбором ключей"""
+    def __init__(self):
+        super().__init__()
+        
+        # Инициализация
+        self.env = MandatoryKeysEnvironment(gym_api=True)
+        self.agent = KeyPriorityAgent()
+        self.trainer = Trainer(self.agent)
+        self.training = True
+        self.training_thread = None
+        self.training_worker = None
+        self.simulation_speed = 200
+        self.next_action = None  # Заранее выбранное действие для SARSA
+        
+        # Статистика (успех = сокровище + ВСЕ ключи)
+        self.stats = RollingStats()
+        
+        # Настройка интерфейса
+        self.setup_ui()
+        self.reset_game()
+    
+    def setup_ui(self):
+        """Настройка интерфейса"""
+        self.setWindowTitle("IntelliGame AI - Обязательный сбор всех ключей")
+        self.setGeometry(100, 50, 1300, 750)
+        
+        # Центральный виджет
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QHBoxLayout(central)
+        
+        # Левая панель
+        left_panel = QVBoxLayout()
+        
+        # Заголовок
+        title = QLabel("🎯 IntelliGame AI - Собери ВСЕ 3 ключа!")
+        title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        title.setStyleSheet("color: #4169e1; padding: 10px;")
+        left_panel.addWidget(title)
+        
+        # Игровое поле
+        self.game_canvas = EnhancedGameCanvas()
+        left_panel.addWidget(self.game_canvas)
+        
+        # Управление
+        control_group = QGroupBox("Управление обучением")
+        control_layout = QVBoxLayout()
+        
+        # Кнопки старта/сброса
+        btn_layout = QHBoxLayout()
+        self.start_btn = QPushButton("▶ Старт обучения")
+        self.start_btn.clicked.connect(self.toggle_simulation)
+        self.reset_btn = QPushButton("🔄 Новая игра")
+        self.reset_btn.clicked.connect(self.reset_game)
+        
+        btn_layout.addWidget(self.start_btn)
+        btn_layout.addWidget(self.reset_btn)
+        
+        # Кнопки обучения
+        train_layout = QGridLayout()
+        self.train_buttons = []
+        
+        train_buttons = [
+            ("100 эпизодов", 100),
+            ("500 эпизодов", 500),
+            ("1000 эпизодов", 1000),
+            ("5000 эпизодов", 5000)
+        ]
+        
+        for i, (text, episodes) in enumerate(train_buttons):
+            btn = QPushButton(text)
+            btn.clicked.connect(lambda checked, e=episodes: self.batch_train(e))
+            self.train_buttons.append(btn)
+            train_layout.addWidget(btn, i//2, i%2)
+        
+        # Алгоритм обучения (Q-таблица при смене сохраняется)
+        learner_layout = QHBoxLayout()
+        learner_layout.addWidget(QLabel("Алгоритм:"))
+        self.learner_combo = QComboBox()
+        for name in LEARNERS:
+            self.learner_combo.addItem(LEARNER_TITLES[name], name)
+        self.learner_combo.currentIndexChanged.connect(self.change_learner)
+        learner_layout.addWidget(self.learner_combo, 1)
+        
+        # Способ исследования (расписание начинается заново)
+        exploration_layout = QHBoxLayout()
+        exploration_layout.addWidget(QLabel("Исследование:"))
+        self.exploration_combo = QComboBox()
+        for name in EXPLORATIONS:
+            self.exploration_combo.addItem(EXPLORATION_TITLES[name], name)
+        self.exploration_combo.currentIndexChanged.connect(self.change_exploration)
+        exploration_layout.addWidget(self.exploration_combo, 1)
+        
+        control_layout.addLayout(btn_layout)
+        control_layout.addLayout(train_layout)
+        control_layout.addLayout(learner_layout)
+        control_layout.addLayout(exploration_layout)
+        
+        # Информация о ключах
+        keys_info = QLabel("Цель: собрать ВСЕ 3 ключа, затем взять сокровище!")
+        keys_info.setStyleSheet("color: #ff4500; font-weight: bold; padding: 5px;")
+        control_layout.addWidget(keys_info)
+        
+        control_group.setLayout(control_layout)
+        left_panel.addWidget(control_group)
+        
+        # Статистика
+        stats_group = QGroupBox("Статистика обучения")
+        stats_layout = QGridLayout()
+        
+        stats = [
+            ("Эпизод:", "episode_label"),
+            ("Успешность*:", "success_label"),
+            ("Средние ключи:", "keys_label"),
+            ("Исследование:", "epsilon_label"),
+            ("Ср. награда:", "reward_label"),
+            ("Идеальных:", "perfect_label"),
+            ("Жадная политика:", "greedy_label")
+        ]
+        
+        for i, (name, attr) in enumerate(stats):
+            row = i // 2
+            col = (i % 2) * 2
+            stats_layout.addWidget(QLabel(name), row, col)
+            label = QLabel("0")
+            label.setStyleSheet("font-weight: bold;")
+            setattr(self, attr, label)
+            stats_layout.addWidget(label, row, col + 1)
+        
+        self.greedy_label.setText("—")
+        self.greedy_label.setToolTip("Успешность без исследования со всех стартовых клеток; "
+                                     "считается после пакетного обучения")
+        
+        # Пояснение
+        note = QLabel("*Успех = сокровище + ВСЕ ключи")
+        note.setStyleSheet("color: #666; font-style: italic;")
+        stats_layout.addWidget(note, 4, 0, 1, 4)
+        
+        # Прогресс
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 100)
+        stats_layout.addWidget(QLabel("Прогресс:"), 5, 0)
+        stats_layout.addWidget(self.progress, 5, 1, 1, 3)
+        
+        stats_group.setLayout(stats_layout)
+        left_panel.addWidget(stats_group)
+        
+        layout.addLayout(left_panel, 60)
+        
+        # Правая панель - графики
+        right_panel = QTabWidget()
+        
+        # Графики
+        plot_tab = QWidget()
+        plot_layout = QVBoxLayout()
+        
+        # matplotlib загружается только вместе с окном; QtAgg - бэкенд для PyQt6
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+        from matplotlib.figure import Figure
+        
+        self.figure = Figure(figsize=(9, 7), dpi=80)
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        
+        self.setup_plots()
+        
+        scroll = QScrollArea()
+        scroll.setWidget(self.canvas)
+        scroll.setWidgetResizable(True)
+        
+        plot_layout.addWidget(scroll)
+        plot_tab.setLayout(plot_layout)
+        
+        # Информация
+        info_tab = QWidget()
+        info_layout = QVBoxLayout()
+        
+        info_text = QTextEdit()
+        info_text.setReadOnly(True)
+        info_text.setHtml("""
+        <h3 style="color:#4169e1;">🎯 Обязательный сбор всех ключей</h3>
+        
+        <h4>🚫 Что было неправильно:</h4>
+        <p>Агент мог взять сокровище, собрав только 1-2 ключа из 3.</p>
+        
+        <h4>✅ Как исправлено:</h4>
+        
+        <p><b>1. Новая система наград:</b></p>
+        <ul>
+        <li>Ключ: <b>+50</b> (вместо 30)</li>
+        <li>Бонус за все ключи: <b>+100</b></li>
+        <li>Сокровище без всех ключей: <b>-200</b> (штраф!)</li>
+        <li>Сокровище со всеми ключами: <b>+500 + 100 за каждый ключ</b></li>
+        </ul>
+        
+        <p><b>2. Умное движение:</b></p>
+        <ul>
+        <li>До сбора всех ключей: агент стремится к ближайшему ключу</li>
+        <li>После сбора всех ключей: агент идет к сокровищу</li>
+        </ul>
+        
+        <p><b>3. Визуальные подсказки:</b></p>
+        <ul>
+        <li>Сокровище заблокировано (🔒) пока не собраны все ключи</li>
+        <li>Собранные ключи отмечаются (✓) на панели</li>
+        <li>Агент меняет цвет при сборе всех ключей</li>
+        </ul>
+        
+        <h4>📊 Ожидаемые результаты:</h4>
+        <ul>
+        <li><b>100 эпизодов:</b> Собирает 2.5-2.8 ключа в среднем</li>
+        <li><b>500 эпизодов:</b> 80-90% успешных эпизодов (все ключи + сокровище)</li>
+        <li><b>1000 эпизодов:</b> 90-95% успешных эпизодов</li>
+        <li><b>5000 эпизодов:</b> 95-98% успешных эпизодов</li>
+        </ul>
+        
+        <p style="color: green; font-weight: bold;">
+        💡 Агент теперь ПОНИМАЕТ, что нужно собрать ВСЕ ключи!
+        </p>
+        """)
+        
+        info_layout.addWidget(info_text)
+        info_tab.setLayout(info_layout)
+        
+        right_panel.addTab(plot_tab, "📊 Графики")
+        right_panel.addTab(self.setup_performance_tab(), "⏱ Производительность")
+        right_panel.addTab(info_tab, "ℹ️ Как работает")
+        
+        layout.addWidget(right_panel, 40)
+        
+        # Таймер
+        self.game_timer = QTimer()
+        self.game_timer.timeout.connect(self.game_step)
+    
+    def setup_performance_tab(self):
+        """Вкладка профилирования: включение замеров, таблица, сброс и экспорт"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        
+        controls = QHBoxLayout()
+        self.profile_check = QCheckBox("Профилирование")
+        self.profile_check.toggled.connect(self.toggle_profiling)
+        self.profile_allocations = QCheckBox("Считать выделения памяти")
+        reset_btn = QPushButton("Сброс")
+        reset_btn.clicked.connect(lambda: (PROFILER.reset(), self.update_performance()))
+        export_btn = QPushButton("Экспорт...")
+        export_btn.clicked.connect(self.export_profile)
+        for widget in (self.profile_check, self.profile_allocations, reset_btn, export_btn):
+            controls.addWidget(widget)
+        layout.addLayout(controls)
+        
+        self.performance_text = QPlainTextEdit()
+        self.performance_text.setReadOnly(True)
+        self.performance_text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.performance_text.setPlainText("Профилирование выключено: замеры ничего не стоят.")
+        layout.addWidget(self.performance_text)
+        
+        # Таблица обновляется раз в секунду, только пока замеры включены
+        self.performance_timer = QTimer(self)
+        self.performance_timer.timeout.connect(self.update_performance)
+        return tab
+    
+    def toggle_profiling(self, enabled):
+        if enabled:
+            PROFILER.enable(self.profile_allocations.isChecked())
+            self.performance_timer.start(1000)
+        else:
+            PROFILER.disable()
+            self.performance_timer.stop()
+        self.profile_allocations.setEnabled(not enabled)
+        self.update_performance()
+    
+    def update_performance(self):
+        self.performance_text.setPlainText(PROFILER.report())
+    
+    def export_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт замеров", "profile.json",
+                                              "JSON (*.json);;CSV (*.csv)")
+        if path:
+            PROFILER.export(path)
+    
+    def change_learner(self):
+        """Смена алгоритма обучения из списка"""
+        name = self.learner_combo.currentData()
+        if name != self.agent.learner.name:
+            self.agent.set_learner(name)
+            self.next_action = None
+    
+    def sync_learner(self):
+        """Списки алгоритмов и способов исследования по агенту (например, после загрузки модели)"""
+        self.learner_combo.setCurrentIndex(self.learner_combo.findData(self.agent.learner.name))
+        self.exploration_combo.setCurrentIndex(
+            self.exploration_combo.findData(self.agent.exploration.name))
+        self.epsilon_label.setText(self.exploration_text())
+    
+    def exploration_text(self):
+        """epsilon или температура текущего способа исследования (для счетчика и итогов)"""
+        return self.agent.exploration.describe(self.agent) or "—"
+    
+    def change_exploration(self):
+        """Смена способа исследования из списка"""
+        name = self.exploration_combo.currentData()
+        if name != self.agent.exploration.name:
+            self.agent.set_exploration(name)
+            self.epsilon_label.setText(self.exploration_text())
+    
+    def reset_game(self):
+        """Сброс игры"""
+        if self.training_thread is not None:
+            return  # Агент занят потоком обучения (например, отложенный сброс после эпизода)
+        state, _ = self.env.reset()
+        self.agent.start_episode()
+        self.next_action = None
+        if hasattr(self.game_canvas, 'agent_path'):
+            self.game_canvas.agent_path.clear()
+        self.update_display(state)
+        self.game_timer.stop()
+        self.start_btn.setText("▶ Старт обучения")
+    
+    def toggle_simulation(self):
+        """Запуск/остановка"""
+        if self.game_timer.isActive():
+            self.game_timer.stop()
+            self.start_btn.setText("▶ Продолжить")
+        else:
+            self.game_timer.start(self.simulation_speed)
+            self.start_btn.setText("⏸ Пауза")
+    
+    def batch_train(self, episodes):
+        """Пакетное обучение в отдельном потоке"""
+        if self.training_thread is not None:
+            return
+        self.resume_after_training = self.game_timer.isActive()
+        self.game_timer.stop()
+        self.game_canvas.set_animation_enabled(False)
+        self.start_btn.setEnabled(False)
+        self.reset_btn.setEnabled(False)
+        self.learner_combo.setEnabled(False)
+        self.exploration_combo.setEnabled(False)
+        for btn in self.train_buttons:
+            btn.setEnabled(False)
+        
+        # Статистика текущего запуска
+        self.run_stats = RollingStats()
+        
+        worker = TrainingWorker(self.trainer, episodes)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.on_training_progress)
+        worker.finished.connect(self.on_training_finished)
+        # quit потокобезопасен; очередь GUI может быть занята ожиданием в closeEvent
+        worker.finished.connect(thread.quit, Qt.ConnectionType.DirectConnection)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        
+        self.train_progress = QProgressDialog(f"Обучение на {episodes} эпизодах...", "Отмена",
+                                              0, episodes, self)
+        self.train_progress.setWindowTitle("Обучение")
+        self.train_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.train_progress.setMinimumDuration(0)
+        self.train_progress.setAutoClose(False)
+        self.train_progress.setAutoReset(False)
+        # Прямой вызов: цикл событий потока обучения занят run()
+        self.train_progress.canceled.connect(worker.cancel, Qt.ConnectionType.DirectConnection)
+        
+        self.training_thread = thread
+        self.training_worker = worker
+        thread.start()
+    
+    def on_training_progress(self, report):
+        """Пачка результатов из потока обучения"""
+        batch = (report['rewards'], report['successes'], report['keys'])
+        self.run_stats.extend(*batch)
+        self.stats.extend(*batch)
+        
+        if not self.train_progress.wasCanceled():
+            self.train_progress.setValue(report['episodes'])
+        self.update_plots()
+        
+        if len(self.run_stats):
+            self.reward_label.setText(f"{self.run_stats.avg_reward:.1f}")
+            self.success_label.setText(f"{self.run_stats.success_rate:.1f}%")
+            self.keys_label.setText(f"{self.run_stats.avg_keys:.1f}")
+            perfect_rate = self.stats.mean(SUCCESS) * 100
+            self.perfect_label.setText(f"{perfect_rate:.1f}%")
+        self.episode_label.setText(str(len(self.stats)))
+        self.epsilon_label.setText(report['exploration'] or "—")
+    
+    def on_training_finished(self, report):
+        """Завершение обучения: остаток результатов, итоги и графики"""
+        self.on_training_progress(report)
+        self.train_progress.close()
+        self.training_thread = None
+        self.training_worker = None
+        self.game_canvas.set_animation_enabled(True)
+        self.start_btn.setEnabled(True)
+        self.reset_btn.setEnabled(True)
+        self.learner_combo.setEnabled(True)
+        self.exploration_combo.setEnabled(True)
+        for btn in self.train_buttons:
+            btn.setEnabled(True)
+        
+        # Результаты: жадная политика оценивается уже без потока обучения
+        evaluation = self.trainer.evaluate()
+        self.greedy_label.setText(f"{evaluation['success_rate']:.1f}%")
+        run = self.run_stats
+        if len(run):
+            QMessageBox.information(self, "Обучение завершено",
+                                  f"Эпизодов: {len(run)}\n"
+                                  f"Алгоритм: {LEARNER_TITLES[self.agent.learner.name]}\n"
+                                  f"Исследование: {EXPLORATION_TITLES[self.agent.exploration.name]}\n"
+                                  f"Средняя награда: {run.mean(REWARD):.1f}\n"
+                                  f"Успешность (все ключи): {run.mean(SUCCESS) * 100:.1f}%\n"
+                                  f"Жадная политика со всех стартов: "
+                                  f"{evaluation['success_rate']:.1f}%\n"
+                                  f"Среднее ключей за эпизод: {run.mean(KEYS):.1f}/3\n"
+                                  f"Идеальных эпизодов: {self.stats.perfect_episodes}\n"
+                                  f"Параметр исследования: {self.exploration_text()}\n"
+                                  f"Скорость: {report['episodes'] / max(report['elapsed'], 1e-9):.0f} эп/с")
+        
+        if self.resume_after_training:
+            self.reset_game()
+    
+    def changeEvent(self, event):
+        """Свернутое окно не анимируется"""
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.game_canvas.sync_animation_timer()
+    
+    def closeEvent(self, event):
+        """Остановка обучения перед закрытием окна"""
+        if self.training_thread is not None:
+            self.training_worker.cancel()
+            self.training_thread.wait()
+        super().closeEvent(event)
+    
+    def game_step(self):
+        """Один шаг игры"""
+        state = self.env.get_state()
+        action = self.next_action
+        if action is None:
+            action = self.agent.get_action(state, self.training)
+        next_state, reward, terminated, truncated, info = self.env.step(action)
+        
+        # SARSA обновляется по действию, которое агент выберет следующим
+        self.next_action = None
+        if self.training and self.agent.learner.on_policy and not terminated:
+            self.next_action = self.agent.get_action(next_state, self.training)
+        if self.training:
+            self.agent.update(state, action, reward, next_state, terminated, self.next_action)
+        
+        self.update_display(next_state)
+        
+        if terminated or truncated:
+            # Статистика (успех = сокровище + ВСЕ ключи)
+            stats = self.stats
+            stats.add(next_state['reward'], 1 if info['success'] else 0, info['keys_collected'])
+            
+            # Обновление интерфейса
+            self.reward_label.setText(f"{stats.avg_reward:.1f}")
+            self.success_label.setText(f"{stats.success_rate:.1f}%")
+            self.keys_label.setText(f"{stats.avg_keys:.1f}")
+            perfect_rate = stats.mean(SUCCESS) * 100
+            self.perfect_label.setText(f"{perfect_rate:.1f}%")
+            self.progress.setValue(min(100, int(stats.success_rate)))
+            
+            self.episode_label.setText(str(len(stats)))
+            self.epsilon_label.setText(self.exploration_text())
+            
+            # Следующий эпизод
+            QTimer.singleShot(1000, self.reset_game)
+    
+    def update_display(self, state):
+        """Обновление интерфейса"""
+        self.game_canvas.update_state(state)
+        self.episode_label.setText(str(len(self.stats)))
+        self.epsilon_label.setText(self.exploration_text())
+    
+    def setup_plots(self):
+        """Оси и линии графиков создаются один раз, дальше меняются только данные.
+
+        Линии и круговая диаграмма анимированные: при обновлении поверх
+        сохраненного фона перерисовываются только они (blitting). Полная
+        перерисовка нужна лишь при смене пределов осей.
+        """
+        fig = self.figure
+        
+        # График 1: Успешность (все ключи + сокровище)
+        ax1 = fig.add_subplot(221)
+        self.success_line, = ax1.plot([], [], 'g-', linewidth=2, animated=True)
+        ax1.axhline(y=0.85, color='r', linestyle='--', alpha=0.5, label='Цель: 85%')
+        ax1.set_title('Успешность (все ключи + сокровище)', fontsize=10)
+        ax1.set_ylabel('Доля успеха')
+        ax1.set_ylim(0, 1.05)
+        ax1.legend()
+        ax1.grid(True, alpha=0.3)
+        
+        # График 2: Среднее количество собранных ключей
+        ax2 = fig.add_subplot(222)
+        self.keys_line, = ax2.plot([], [], 'b-', linewidth=2, animated=True)
+        ax2.axhline(y=3, color='g', linestyle='--', alpha=0.5, label='Цель: 3 ключа')
+        ax2.set_title('Среднее количество ключей за эпизод', fontsize=10)
+        ax2.set_ylabel('Ключи')
+        ax2.set_ylim(0, 3.5)
+        ax2.legend()
+        ax2.grid(True, alpha=0.3)
+        
+        # График 3: Награды
+        ax3 = fig.add_subplot(223)
+        self.reward_line, = ax3.plot([], [], 'orange', linewidth=2, animated=True)
+        ax3.set_title('Средняя награда', fontsize=10)
+        ax3.set_xlabel('Эпизод')
+        ax3.set_ylabel('Награда')
+        ax3.grid(True, alpha=0.3)
+        
+        # График 4: Распределение результатов
+        ax4 = fig.add_subplot(224)
+        colors = ['#ff6b6b', '#51cf66']
+        self.pie_wedges, self.pie_labels, self.pie_percents = ax4.pie(
+            [1, 1], labels=['Провал', 'Успех'], colors=colors, autopct='%1.1f%%')
+        ax4.set_title('Распределение последних 100 эпизодов', fontsize=10)
+        
+        self.plot_axes = (ax1, ax2, ax3, ax4)
+        self.plot_lines = (self.success_line, self.keys_line, self.reward_line)
+        self.pie_artists = list(self.pie_wedges) + list(self.pie_labels) + list(self.pie_percents)
+        for artist in self.pie_artists:
+            artist.set_animated(True)
+            artist.set_visible(False)
+        
+        self.plot_limits = None
+        self.plot_background = None
+        self.canvas.mpl_connect('draw_event', self.on_plot_draw)
+        fig.tight_layout()
+    
+    def on_plot_draw(self, event):
+        """После полной перерисовки запоминаем фон и рисуем анимированные части"""
+        self.plot_background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_plot_artists()
+    
+    def draw_plot_artists(self):
+        for line in self.plot_lines:
+            line.axes.draw_artist(line)
+        for artist in self.pie_artists:
+            artist.axes.draw_artist(artist)
+    
+    def update_plots(self):
+        """Обновление графиков: новые данные линий и перерисовка только их"""
+        if len(self.stats) < 10:
+            return
+        
+        # Скользящие средние по 100 эпизодам из истории RollingStats,
+        # прореженные до PLOT_POINTS точек
+        episodes, reward_ma, success_rate, keys_ma = self.stats.get_history()
+        for line, values in ((self.success_line, success_rate), (self.keys_line, keys_ma),
+                             (self.reward_line, reward_ma)):
+            line.set_data(*lttb(episodes, values, PLOT_POINTS))
+        
+        if len(self.stats) >= 100:
+            self.update_pie(self.stats.recent_successes / self.stats.count)
+        
+        # Пределы растут ступенями, чтобы полная перерисовка была редкой
+        limits = self.plot_limits_for(episodes, reward_ma)
+        if limits != self.plot_limits or self.plot_background is None:
+            self.plot_limits = limits
+            x_max, reward_min, reward_max = limits
+            for ax in self.plot_axes[:3]:
+                ax.set_xlim(0, x_max)
+            self.plot_axes[2].set_ylim(reward_min, reward_max)
+            self.canvas.draw()
+            return
+        
+        self.canvas.restore_region(self.plot_background)
+        self.draw_plot_artists()
+        self.canvas.blit(self.figure.bbox)
+    
+    def plot_limits_for(self, episodes, reward_ma):
+        """Пределы осей: 1-2-5 x 10^k по эпизодам, шаг 250 по награде"""
+        x_max = 100
+        while len(episodes) and x_max < episodes[-1]:
+            x_max = x_max * 5 // 2 if str(x_max)[0] == '2' else x_max * 2
+        reward_min = np.floor(reward_ma.min() / 250) * 250 if len(reward_ma) else 0
+        reward_max = np.ceil(reward_ma.max() / 250) * 250 if len(reward_ma) else 250
+        if self.plot_limits is not None:
+            # Пределы по награде только расширяются
+            reward_min = min(reward_min, self.plot_limits[1])
+            reward_max = max(reward_max, self.plot_limits[2])
+        return x_max, reward_min, max(reward_max, reward_min + 250)
+    
+    def update_pie(self, success_fraction):
+        """Новые углы секторов круговой диаграммы без ее пересоздания"""
+        fractions = (1 - success_fraction, success_fraction)
+        theta = 0.0
+        for wedge, label, percent, fraction in zip(self.pie_wedges, self.pie_labels,
+                                                   self.pie_percents, fractions):
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + 360 * fraction)
+            middle = np.deg2rad(theta + 180 * fraction)
+            theta += 360 * fraction
+            x, y = np.cos(middle), np.sin(middle)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x >= 0 else 'right')
+            percent.set_position((0.6 * x, 0.6 * y))
+            percent.set_text(f"{fraction * 100:.1f}%")
+            visible = fraction > 0
+            for artist in (wedge, label, percent):
+                artist.set_visible(visible)
+
+# Замеры GUI (активны только при включенном профилировании)
+PROFILER.register(EnhancedGameCanvas, 'paintEvent', 'canvas.paintEvent', RENDER)
+PROFILER.register(IntelliGameAI, 'update_plots', 'gui.update_plots', RENDER)
+PROFILER.register(IntelliGameAI, 'game_step', 'gui.game_step', LOOP)
+
+# ==================== ЗАПУСК ====================
+def main(model=None):
+    """Запуск приложения; model - путь к обученной модели для просмотра"""
+    app = QApplication(sys.argv)
+    
+    # Стиль
+    app.setStyle('Fusion')
+    palette = QPalette()
+    palette.setColor(QPalette.ColorRole.Window, QColor(245, 245, 250))
+    app.setPalette(palette)
+    
+    window = IntelliGameAI()
+    if model:
+        window.agent.load_model(model)
+        window.sync_learner()
+        window.update_display(window.env.get_state())
+    window.show()
+    
+    # Сообщение
+    QTimer.singleShot(1000, lambda: QMessageBox.information(window, "Важное изменение!",
+        "🎯 Теперь агент ДОЛЖЕН собрать ВСЕ 3 ключа!\n\n"
+        "📊 Новая система наград:\n"
+        "• Ключ: +50 очков\n"
+        "• Все ключи собраны: +100 бонус\n"
+        "• Сокровище без всех ключей: -200 (штраф!)\n"
+        "• Сокровище со всеми ключами: +500 + бонусы\n\n"
+        "🚀 Нажмите '1000 эпизодов' для обучения!"))
+    
+    sys.exit(app.exec())
+
+if __name__ == "__main__":
+    main()
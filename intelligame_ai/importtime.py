@@ -0,0 +1,70 @@
+import json
+import subprocess
+import sys
+
+# ==================== ВРЕМЯ ИМПОРТА ====================
+# Модули, которые не должны тянуть тяжелые библиотеки (процессы обучения
+# импортируют только их)
+CORE_MODULES = ("intelligame_ai", "intelligame_ai.core", "intelligame_ai.trainer",
+                "intelligame_ai.planning", "intelligame_ai.kernel", "intelligame_ai.parallel",
+                "intelligame_ai.inference", "intelligame_ai.evaluation", "intelligame_ai.learners",
+                "intelligame_ai.exploration")
+GUI_MODULES = ("intelligame_ai.gui",)
+HEAVY_MODULES = ("PyQt6", "matplotlib", "numba")
+
+_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import numpy
+numpy_seconds = time.perf_counter() - start
+__import__(sys.argv[1])
+seconds = time.perf_counter() - start
+try:
+    # VmHWM - пик этого процесса; ru_maxrss после fork учитывает и родителя
+    with open("/proc/self/status") as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+except OSError:
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if sys.platform == "darwin":
+            rss /= 1024
+    except ImportError:
+        rss = None
+heavy = [name for name in sys.argv[2:] if name in sys.modules]
+print(json.dumps({"seconds": seconds, "numpy_seconds": numpy_seconds, "max_rss_mb": rss,
+                  "heavy": heavy}))
+"""
+
+def measure_import(module, repeat=3):
+    """Импорт модуля в чистом интерпретаторе (лучшее из repeat запусков).
+
+    Возвращает словарь: seconds (вместе с NumPy), numpy_seconds, max_rss_mb
+    (None, если модуль resource недоступен) и heavy - какие из HEAVY_MODULES
+    оказались загружены.
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _SNIPPET, module, *HEAVY_MODULES],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    best["module"] = module
+    return best
+
+def check_core_imports(repeat=3):
+    """Замеры CORE_MODULES и GUI_MODULES; ok=False, если ядро тянет тяжелые библиотеки"""
+    results = [measure_import(module, repeat) for module in CORE_MODULES + GUI_MODULES]
+    ok = all(not result["heavy"] for result in results if result["module"] in CORE_MODULES)
+    return ok, results
+
+if __name__ == "__main__":
+    ok, results = check_core_imports()
+    for result in results:
+        rss = "-" if result["max_rss_mb"] is None else f"{result['max_rss_mb']:.0f} МБ"
+        print(f"{result['module']:<26} {result['seconds'] * 1000:6.0f} мс "
+              f"(NumPy {result['numpy_seconds'] * 1000:.0f} мс), {rss}, "
+              f"загружены: {', '.join(result['heavy']) or '-'}")
+    print("Ядро без Qt/matplotlib/numba:", "да" if ok else "НЕТ")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .core import (CompactKeysEnvironment, EnvironmentTables, MandatoryKeysEnvironment,
+                   SparseQTable, make_tables)
+
+# ==================== ЖАДНАЯ ПОЛИТИКА БЕЗ ОБУЧЕНИЯ ====================
+PATH_CACHE_SIZE = 4096  # Сколько путей GreedyPolicy.path держит в кэше
+MAX_BODY = 1 << 20  # Предел тела HTTP-запроса, байт
+
+def greedy_actions(q_table, chunk=1 << 20):
+    """argmax по строкам Q-таблицы в массив int8 (по chunk строк за раз).
+
+    Как и np.argmax в KeyPriorityAgent, при равенстве берется первое
+    действие; непосещенные состояния разреженной таблицы получают 0.
+    """
+    if isinstance(q_table, SparseQTable):
+        actions = np.zeros(q_table.shape[0], dtype=np.int8)
+        states, rows = q_table.items()
+        actions[states] = np.argmax(rows, axis=1)
+        return actions
+    # Кусками, чтобы таблица через memmap не читалась в память целиком
+    actions = np.empty(len(q_table), dtype=np.int8)
+    for begin in range(0, len(q_table), chunk):
+        actions[begin:begin + chunk] = np.argmax(q_table[begin:begin + chunk], axis=1)
+    return actions
+
+class GreedyPolicy:
+    """Обученная политика как таблица "состояние -> действие".
+
+    Q-таблица нужна только в конструкторе: дальше ответы берутся из массива
+    int8 (один байт на состояние). Для путей нужны таблицы переходов карты.
+    Состояния - упакованные индексы (позиция * 2**K + маска ключей).
+    """
+    def __init__(self, q_table, tables=None):
+        self.actions = greedy_actions(q_table)
+        self.n_states = len(self.actions)
+        self.tables = tables
+        if tables is not None and tables.n_states != self.n_states:
+            raise ValueError(f"Политика на {self.n_states} состояний, "
+                             f"а карте нужно {tables.n_states}")
+        self._paths = {}
+
+    @classmethod
+    def from_agent(cls, agent, tables=None):
+        return cls(agent.q_table, tables)
+
+    @classmethod
+    def from_checkpoint(cls, path):
+        """Политика из контрольной точки (или старого .npz).
+
+        Q-таблица контрольной точки открывается через memmap и после
+        подсчета действий не держится в памяти. Карта берется из файла, если
+        он сохранен Trainer, иначе стандартная, если подходит по размеру;
+        для больших карт ее переходы считаются лениво (core.make_tables).
+        """
+        from .checkpoint import is_checkpoint, load_checkpoint, read_metadata
+        from .core import KeyPriorityAgent
+
+        tables = None
+        if is_checkpoint(path):
+            metadata = read_metadata(path)
+            agent = load_checkpoint(path, mmap_mode='r')
+            if 'trainer' in metadata:
+                tables = make_tables(MandatoryKeysEnvironment(**metadata['trainer']['map']),
+                                     metadata['agent']['storage'])
+        else:
+            agent = KeyPriorityAgent()
+            agent.load_model(path)
+        if tables is None and agent.state_size == EnvironmentTables.default().n_states:
+            tables = EnvironmentTables.default()
+        return cls(agent.q_table, tables)
+
+    def _check(self, states):
+        if not isinstance(states, np.ndarray):
+            # Проверка до asarray: большие целые не помещаются в int64
+            states = list(states)
+            if any(not 0 <= state < self.n_states for state in states):
+                raise ValueError(f"Состояния должны быть от 0 до {self.n_states - 1}")
+        states = np.asarray(states, dtype=np.int64)
+        if states.size and (states.min() < 0 or states.max() >= self.n_states):
+            raise ValueError(f"Состояния должны быть от 0 до {self.n_states - 1}")
+        return states
+
+    def act(self, state):
+        """Действие для одного состояния"""
+        if not 0 <= state < self.n_states:
+            raise ValueError(f"Состояния должны быть от 0 до {self.n_states - 1}")
+        return int(self.actions[state])
+
+    def act_batch(self, states):
+        """Действия для массива состояний (int8)"""
+        return self.actions[self._check(states)]
+
+    def path(self, state=None):
+        """Жадный путь из state (по умолчанию - стартовое) до конца эпизода.
+
+        Словарь: states (включая начальное), actions, reward, success, keys,
+        steps. Пути детерминированы, поэтому последние PATH_CACHE_SIZE
+        хранятся в кэше.
+        """
+        if self.tables is None:
+            raise ValueError("Для путей нужна карта (tables)")
+        state = self.tables.start_state if state is None else int(state)
+        cached = self._paths.get(state)
+        if cached is not None:
+            return cached
+        self.act(state)  # Проверка диапазона
+
+        env = CompactKeysEnvironment(self.tables)
+        env.state = state
+        states, actions = [state], []
+        done = False
+        while not done:
+            action = int(self.actions[env.state])
+            next_state, _, done = env.step(action)
+            actions.append(action)
+            states.append(next_state)
+        result = {
+            'states': states,
+            'actions': actions,
+            'reward': env.total_reward,
+            'success': env.success,
+            'keys': env.keys_collected,
+            'steps': env.steps,
+        }
+        if len(self._paths) >= PATH_CACHE_SIZE:
+            del self._paths[next(iter(self._paths))]  # Самый старый
+        self._paths[state] = result
+        return result
+
+    def info(self):
+        return {
+            'n_states': self.n_states,
+            'start_state': None if self.tables is None else self.tables.start_state,
+            'grid_size': None if self.tables is None else self.tables.grid_size,
+            'total_keys': None if self.tables is None else self.tables.total_keys,
+        }
+
+# ==================== HTTP-СЕРВЕР ====================
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+
+def _states_param(params):
+    """Состояния из запроса: ?state=5&state=6, ?states=5,6 или JSON"""
+    value = params.get('states', params.get('state'))
+    if value is None:
+        return None
+    if isinstance(value, (int, str)):
+        value = [value]
+    states = []
+    for item in value:
+        if isinstance(item, str):
+            states.extend(int(part) for part in item.split(",") if part)
+        elif isinstance(item, int) and not isinstance(item, bool):
+            states.append(item)
+        else:
+            raise ValueError(f"Состояние должно быть целым числом, а не {item!r}")
+    return states
+
+class PolicyServer:
+    """HTTP/1.1 сервер политики на asyncio (с keep-alive, ответы в JSON).
+
+    GET /health - размеры политики; GET|POST /action - действия для
+    состояний; GET|POST /path - жадные пути (без состояний - из стартового).
+    Состояния передаются как ?state=5&state=6, ?states=5,6 или телом
+    {"states": [5, 6]}.
+    """
+    def __init__(self, policy, host="127.0.0.1", port=8765):
+        self.policy = policy
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def respond(self, method, target, body=b""):
+        """(код, словарь ответа) для одного запроса"""
+        url = urlsplit(target)
+        try:
+            params = parse_qs(url.query)
+            if body:
+                payload = json.loads(body)
+                if not isinstance(payload, dict):
+                    raise ValueError("Тело запроса должно быть JSON-объектом")
+                params.update(payload)
+            if url.path == "/health":
+                return 200, self.policy.info()
+            if url.path == "/action":
+                states = _states_param(params)
+                if states is None:
+                    raise ValueError("Не указаны состояния")
+                return 200, {'actions': self.policy.act_batch(states).tolist()}
+            if url.path == "/path":
+                states = _states_param(params) or [None]
+                return 200, {'paths': [self.policy.path(state) for state in states]}
+            return 404, {'error': f"Неизвестный путь {url.path}"}
+        except (ValueError, TypeError, OverflowError) as error:
+            return 400, {'error': str(error)}
+
+    async def handle(self, reader, writer):
+        """Запросы одного соединения, пока клиент его не закроет"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {'error': "Слишком большой запрос"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = self.respond(method, target, body)
+                    keep_alive = (version == "HTTP/1.1" and
+                                  headers.get('connection', "").lower() != "close")
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                        f"Content-Type: application/json; charset=utf-8\r\n"
+                        f"Content-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write(head.encode("latin-1") + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Оборванное или некорректное соединение просто закрываем
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # Если port=0
+        return self.server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+def serve(policy, host="127.0.0.1", port=8765):
+    """Запуск PolicyServer до Ctrl+C"""
+    try:
+        asyncio.run(PolicyServer(policy, host, port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    from .planning import solve
+
+    q, _, _ = solve()
+    policy = GreedyPolicy(q, EnvironmentTables.default())
+    states = np.arange(policy.n_states)
+
+    repeat = 100000
+    start = time.perf_counter()
+    for i in range(repeat):
+        policy.act(i % policy.n_states)
+    single = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(1000):
+        policy.act_batch(states)
+    batch = (time.perf_counter() - start) / 1000
+    path = policy.path()
+    print(f"Одно состояние: {single * 1e6:.2f} мкс; пачка из {len(states)}: {batch * 1e6:.1f} мкс")
+    print(f"Путь из старта: {path['steps']} шагов, награда {path['reward']}, успех {path['success']}")
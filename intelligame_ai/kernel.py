@@ -0,0 +1,177 @@
+import array
+import importlib.util
+import time
+
+import numpy as np
+
+from .core import DENSE_DTYPES, EnvironmentTables, KeyPriorityAgent
+
+# numba импортируется только при первой компиляции: сам импорт занимает
+# сотни миллисекунд и десятки мегабайт
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+KERNEL_STORAGES = ("dense", "float32")  # Q-таблицы, которые ядро обновляет на месте
+
+# ==================== ЯДРО Q-ОБУЧЕНИЯ ====================
+def _train_episodes(q, next_state, reward, timeout_reward, terminal, success, max_steps,
+                    keys_collected, start_state, randoms, max_len,
+                    epsilon, epsilon_min, epsilon_decay, learning_rate, gamma,
+                    out_reward, out_success, out_keys):
+    """Целые эпизоды: переход среды + epsilon-жадный выбор + TD-обновление.
+
+    Все таблицы плоские (индекс s * 4 + a), поэтому функция одинаково работает
+    и на массивах NumPy под numba, и на списках Python. Случайные числа заранее
+    выданы в randoms (по два на шаг), поэтому оба варианта дают одну и ту же
+    Q-таблицу. Возвращает итоговый epsilon.
+    """
+    sa = 0
+    for episode in range(len(out_reward)):
+        state = start_state
+        steps = 0
+        total_reward = 0
+        done = False
+        base = episode * max_len * 2
+
+        while not done:
+            # Epsilon-жадный выбор действия
+            row = state * 4
+            if randoms[base + steps * 2] < epsilon:
+                action = int(randoms[base + steps * 2 + 1] * 4)
+            else:
+                action = 0
+                for a in range(1, 4):
+                    if q[row + a] > q[row + action]:
+                        action = a
+
+            # Переход среды
+            sa = state * 4 + action
+            state = next_state[sa]
+            steps += 1
+            terminated = terminal[sa]
+            if steps >= max_steps[state]:
+                r = timeout_reward[sa]
+                done = True
+            else:
+                r = reward[sa]
+                done = terminated
+            total_reward += r
+
+            # TD-обновление
+            max_future_q = 0.0
+            if not terminated:
+                next_row = state * 4
+                max_future_q = q[next_row]
+                for a in range(1, 4):
+                    if q[next_row + a] > max_future_q:
+                        max_future_q = q[next_row + a]
+            old_q = q[row + action]
+            q[row + action] = old_q + learning_rate * (r + gamma * max_future_q - old_q)
+
+            if epsilon > epsilon_min:
+                epsilon *= epsilon_decay
+
+        out_reward[episode] = total_reward
+        out_success[episode] = 1 if success[sa] else 0
+        out_keys[episode] = keys_collected[state]
+
+    return epsilon
+
+_train_episodes_jit = None
+
+def _compiled_train_episodes():
+    """_train_episodes, скомпилированная numba (компилируется один раз)"""
+    global _train_episodes_jit
+    if _train_episodes_jit is None:
+        import numba
+        _train_episodes_jit = numba.njit(cache=True)(_train_episodes)
+    return _train_episodes_jit
+
+class QLearningKernel:
+    """Обучение KeyPriorityAgent целыми пачками эпизодов в одном цикле.
+
+    С numba цикл компилируется; без нее тот же код выполняется на списках
+    Python. Результаты обоих путей совпадают при одинаковом seed: таблица
+    float32 без numba лежит в array.array('f'), который, как и numba,
+    округляет каждое обновление до float32.
+    """
+    def __init__(self, agent, tables=None, seed=None, use_numba=None):
+        if (not isinstance(agent.q_table, np.ndarray) or
+                agent.q_table.dtype not in [DENSE_DTYPES[name] for name in KERNEL_STORAGES]):
+            raise TypeError("Ядру обучения нужна плотная Q-таблица float32 или float64")
+        self.agent = agent
+        self.tables = (tables if tables is not None else EnvironmentTables.default()).dense()
+        if agent.state_size != self.tables.n_states:
+            raise ValueError("Размер Q-таблицы агента не совпадает с картой")
+        self.rng = np.random.default_rng(seed)
+        self.use_numba = HAVE_NUMBA if use_numba is None else use_numba
+        if self.use_numba and not HAVE_NUMBA:
+            raise ImportError("numba не установлена")
+
+        tables = self.tables
+        self.max_len = int(tables.max_steps.max())
+        self._tables = (tables.next_state.ravel(), tables.reward.ravel(),
+                        tables.timeout_reward.ravel(), tables.terminal.ravel(),
+                        tables.success.ravel(), tables.max_steps, tables.keys_collected)
+        if not self.use_numba:
+            self._tables = tuple(table.tolist() for table in self._tables)
+
+    def run(self, episodes, chunk=4096):
+        """Обучение на episodes эпизодах: (награды, успехи, ключи) по эпизодам"""
+        # Не больше ~4М случайных чисел за раз даже для длинных эпизодов
+        chunk = max(1, min(chunk, (1 << 22) // (2 * self.max_len)))
+        out_reward = np.zeros(episodes, dtype=self.tables.reward.dtype)
+        out_success = np.zeros(episodes, dtype=np.int64)
+        out_keys = np.zeros(episodes, dtype=np.int64)
+        # Случайные числа выдаются кусками, чтобы не держать их все в памяти
+        for begin in range(0, episodes, chunk):
+            end = min(begin + chunk, episodes)
+            self._run_chunk(out_reward[begin:end], out_success[begin:end], out_keys[begin:end])
+        return out_reward, out_success, out_keys
+
+    def _run_chunk(self, out_reward, out_success, out_keys):
+        agent = self.agent
+        episodes = len(out_reward)
+        randoms = self.rng.random(episodes * self.max_len * 2)
+        params = (self.tables.start_state, randoms, self.max_len,
+                  agent.epsilon, agent.epsilon_min, agent.epsilon_decay,
+                  agent.learning_rate, agent.gamma)
+
+        if self.use_numba:
+            agent.q_table = np.ascontiguousarray(agent.q_table)
+            q = agent.q_table.reshape(-1)
+            agent.epsilon = _compiled_train_episodes()(q, *self._tables, *params,
+                                                       out_reward, out_success, out_keys)
+        else:
+            if agent.q_table.dtype == np.float32:
+                q = array.array('f', np.ascontiguousarray(agent.q_table).tobytes())
+            else:
+                q = agent.q_table.ravel().tolist()
+            params = params[:1] + (randoms.tolist(),) + params[2:]
+            rewards, successes, keys = [0] * episodes, [0] * episodes, [0] * episodes
+            agent.epsilon = _train_episodes(q, *self._tables, *params, rewards, successes, keys)
+            agent.q_table = np.array(q, dtype=agent.q_table.dtype).reshape(agent.q_table.shape)
+            out_reward[:], out_success[:], out_keys[:] = rewards, successes, keys
+
+def check_parity(episodes=500, seed=0, storage="dense", tables=None):
+    """Проверка, что numba и чистый Python дают одинаковые Q-таблицы
+    (storage - "dense" или "float32", tables - карта, по умолчанию стандартная)
+    """
+    tables = tables if tables is not None else EnvironmentTables.default()
+    agents = []
+    for use_numba in (True, False):
+        agent = KeyPriorityAgent.for_env(tables, storage)
+        QLearningKernel(agent, tables, seed=seed, use_numba=use_numba).run(episodes)
+        agents.append(agent)
+    return (np.array_equal(agents[0].q_table, agents[1].q_table) and
+            agents[0].epsilon == agents[1].epsilon)
+
+if __name__ == "__main__":
+    if HAVE_NUMBA:
+        print("Совпадение numba и Python:", check_parity())
+    for use_numba in ([True, False] if HAVE_NUMBA else [False]):
+        kernel = QLearningKernel(KeyPriorityAgent(), seed=0, use_numba=use_numba)
+        kernel.run(10)  # Компиляция
+        start = time.perf_counter()
+        _, successes, _ = kernel.run(100000)
+        elapsed = time.perf_counter() - start
+        print(f"{'numba' if use_numba else 'python'}: {100000 / elapsed:.0f} эп/с, "
+              f"успешность {successes[-100:].mean() * 100:.1f}%")
@@ -0,0 +1,259 @@
+import numpy as np
+
+from .core import SparseQTable
+
+# ==================== АЛГОРИТМЫ ОБУЧЕНИЯ ====================
+# Все алгоритмы обновляют KeyPriorityAgent.q_table (по ней агент выбирает
+# действия, ее же сохраняют контрольные точки и читают оценка и сервер
+# политики); выбор действий и epsilon - забота агента и его способа
+# исследования (exploration.py)
+Q_LEARNING = "q_learning"
+SARSA = "sarsa"
+EXPECTED_SARSA = "expected_sarsa"
+DOUBLE_Q = "double_q"
+Q_LAMBDA = "q_lambda"
+LEARNERS = (Q_LEARNING, SARSA, EXPECTED_SARSA, DOUBLE_Q, Q_LAMBDA)
+
+TRACE_MIN = 0.01  # Следы Q(lambda) меньше этого отбрасываются
+MAX_TRACES = 256  # Предел числа следов (при gamma * lambda около 1)
+
+def learner_class(name):
+    """Класс алгоритма обучения по имени из LEARNERS"""
+    classes = {cls.name: cls for cls in (QLearning, Sarsa, ExpectedSarsa, DoubleQLearning, QLambda)}
+    if name not in classes:
+        raise ValueError(f"Неизвестный алгоритм обучения: {name}")
+    return classes[name]
+
+def make_learner(name, agent, **params):
+    """Алгоритм обучения по имени из LEARNERS"""
+    return learner_class(name)(agent, **params)
+
+def _table_rows(table, states):
+    """(массив значений, индексы строк в нем) для массива состояний"""
+    if isinstance(table, SparseQTable):
+        rows = table.rows(states)  # До обращения к data: может заменить массив
+        return table.data, rows
+    return table, states
+
+class QLearning:
+    """Одношаговое Q-обучение: цель r + gamma * max Q(s', .).
+
+    Базовый класс остальных алгоритмов: им достаточно переопределить оценку
+    следующего состояния (future), а при своих таблицах или следах - update.
+    """
+    name = Q_LEARNING
+    on_policy = False  # Нужно ли update следующее действие агента
+    batch = True  # Поддерживается ли update_batch (повтор опыта)
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def params(self):
+        """Параметры для контрольной точки (make_learner(name, agent, **params))"""
+        return {}
+
+    def tables(self):
+        """Дополнительные Q-таблицы алгоритма для контрольной точки"""
+        return {}
+
+    def load_tables(self, tables):
+        pass
+
+    def start_episode(self):
+        """Начало нового эпизода (сброс следов и т. п.)"""
+
+    def future(self, next_state_idx, next_action):
+        return np.max(self.agent.q_table[next_state_idx])
+
+    def future_batch(self, next_states, next_rows):
+        return next_rows.max(axis=1)
+
+    def update(self, state_idx, action, reward, next_state_idx, terminated, next_action=None):
+        """TD-обновление одного перехода.
+
+        После настоящего завершения (ловушка, сокровище) будущей награды нет;
+        при обрыве по лимиту шагов оценка следующего состояния сохраняется.
+        """
+        agent = self.agent
+        q_table = agent.q_table
+        old_q = q_table[state_idx, action]
+        max_future_q = 0.0 if terminated else self.future(next_state_idx, next_action)
+        new_q = old_q + agent.learning_rate * (reward + agent.gamma * max_future_q - old_q)
+
+        q_table[state_idx, action] = new_q
+
+    def update_batch(self, states, actions, rewards, next_states, terminated, weights=None):
+        """Пакетное TD-обновление (см. KeyPriorityAgent.update_batch)"""
+        if not self.batch:
+            raise ValueError(f"Повтор опыта не поддерживается алгоритмом {self.name}")
+        agent = self.agent
+        if isinstance(agent.q_table, SparseQTable):
+            future = self.future_batch(next_states, agent.q_table.take(next_states))
+        else:
+            future = self.future_batch(next_states, agent.q_table[next_states])
+        table, rows = _table_rows(agent.q_table, states)
+        future = np.where(terminated, 0.0, future)
+        td_errors = rewards + agent.gamma * future - table[rows, actions]
+
+        step = td_errors if weights is None else td_errors * weights
+        flat, inverse, counts = np.unique(rows * agent.action_size + actions,
+                                          return_inverse=True, return_counts=True)
+        mean_step = np.bincount(inverse, weights=step) / counts
+        np.add.at(table, np.divmod(flat, agent.action_size), agent.learning_rate * mean_step)
+        return td_errors
+
+class Sarsa(QLearning):
+    """SARSA: цель r + gamma * Q(s', a'), a' - действие, которое агент
+    действительно выберет следующим (с исследованием)
+    """
+    name = SARSA
+    on_policy = True
+    batch = False  # В памяти повтора нет следующих действий
+
+    def future(self, next_state_idx, next_action):
+        if next_action is None:
+            raise ValueError("SARSA нужно следующее действие агента (next_action)")
+        return self.agent.q_table[next_state_idx, next_action]
+
+class ExpectedSarsa(QLearning):
+    """Expected SARSA: цель r + gamma * E[Q(s', a')] по политике выбора
+    агента (exploration.expected_value: epsilon-жадной, по бонусам или
+    softmax). Не зависит от случайного a', поэтому подходит и для повтора
+    опыта.
+    """
+    name = EXPECTED_SARSA
+
+    def future(self, next_state_idx, next_action):
+        agent = self.agent
+        return agent.exploration.expected_value(agent, next_state_idx, agent.q_table[next_state_idx])
+
+    def future_batch(self, next_states, next_rows):
+        return self.agent.exploration.expected_value(self.agent, next_states, next_rows)
+
+class DoubleQLearning(QLearning):
+    """Двойное Q-обучение: две оценки A и B, одна выбирает argmax, другая
+    его оценивает (меньше завышение max).
+
+    Q-таблица агента хранит среднее (A + B) / 2 - по нему выбираются
+    действия; хранится только A, а B = 2 * Q - A. Обновление A или B на
+    delta меняет среднее на delta / 2.
+    """
+    name = DOUBLE_Q
+    batch = False
+
+    def __init__(self, agent):
+        super().__init__(agent)
+        self._table_a = None
+
+    @property
+    def table_a(self):
+        """Оценка A; при первом обращении - копия Q (A = B = Q, продолжение
+        с той же оценкой). Не создается, пока не нужна: при загрузке
+        контрольной точки ее заменит сохраненная.
+        """
+        if self._table_a is None:
+            agent = self.agent
+            q_table = agent.q_table
+            if isinstance(q_table, SparseQTable):
+                self._table_a = SparseQTable(agent.state_size, agent.action_size, q_table.dtype)
+                states, rows = q_table.items()
+                for state, row in zip(states.tolist(), rows):
+                    self._table_a[state] = row
+            else:
+                self._table_a = np.array(q_table)
+        return self._table_a
+
+    def tables(self):
+        return {'double_q': self.table_a}
+
+    def load_tables(self, tables):
+        self._table_a = tables['double_q']
+
+    def update(self, state_idx, action, reward, next_state_idx, terminated, next_action=None):
+        agent = self.agent
+        q_table = agent.q_table
+        table_a = self.table_a
+        value_a = table_a[state_idx, action]
+        value_b = 2 * q_table[state_idx, action] - value_a
+        update_a = self.agent.rng.random() < 0.5
+
+        future = 0.0
+        if not terminated:
+            next_a = np.asarray(table_a[next_state_idx], dtype=np.float64)
+            next_b = 2 * np.asarray(q_table[next_state_idx], dtype=np.float64) - next_a
+            if update_a:
+                future = next_b[np.argmax(next_a)]
+            else:
+                future = next_a[np.argmax(next_b)]
+
+        old_q = value_a if update_a else value_b
+        delta = agent.learning_rate * (reward + agent.gamma * future - old_q)
+        if update_a:
+            table_a[state_idx, action] = value_a + delta
+        q_table[state_idx, action] = q_table[state_idx, action] + delta / 2
+
+class QLambda(QLearning):
+    """Q(lambda) Уоткинса со сменяющими следами приемлемости.
+
+    Следы хранятся разреженно: массивы состояний, действий и значений
+    следов только для недавно посещенных пар. Следы меньше TRACE_MIN
+    отбрасываются, поэтому их не больше log(TRACE_MIN) / log(gamma *
+    lambda) (и не больше MAX_TRACES), а стоимость шага ограничена. После
+    исследовательского (не жадного) действия следы обнуляются; при
+    равенстве Q (например, в еще не посещенном состоянии) жадное - любое из
+    лучших действий.
+
+    trace_decay - lambda. При lambda от 0.5 на картах 12x12 и больше
+    штрафы за обрыв эпизода расходятся по всему пути, и агент перестает
+    доходить до сокровища; с 0.3 сходится не медленнее Q-обучения.
+    """
+    name = Q_LAMBDA
+    batch = False
+
+    def __init__(self, agent, trace_decay=0.3):
+        super().__init__(agent)
+        self.trace_decay = trace_decay
+        self.trace_states = np.zeros(MAX_TRACES, dtype=np.int64)
+        self.trace_actions = np.zeros(MAX_TRACES, dtype=np.int64)
+        self.traces = np.zeros(MAX_TRACES, dtype=np.float64)
+        self.n_traces = 0
+
+    def params(self):
+        return {'trace_decay': self.trace_decay}
+
+    def start_episode(self):
+        self.n_traces = 0
+
+    def update(self, state_idx, action, reward, next_state_idx, terminated, next_action=None):
+        agent = self.agent
+        q_table = agent.q_table
+        if q_table[state_idx, action] < np.max(q_table[state_idx]):
+            self.n_traces = 0  # Исследовательское действие: прошлое не отвечает за будущее
+
+        # Сменяющий след пары (s, a): 1, даже если она уже в списке
+        n = self.n_traces
+        states, actions, traces = self.trace_states, self.trace_actions, self.traces
+        hit = np.flatnonzero((states[:n] == state_idx) & (actions[:n] == action))
+        if hit.size:
+            traces[hit[0]] = 1.0
+        else:
+            if n == MAX_TRACES:
+                n -= 1
+                weakest = np.argmin(traces)
+                states[weakest], actions[weakest], traces[weakest] = states[n], actions[n], traces[n]
+            states[n], actions[n], traces[n] = state_idx, action, 1.0
+            n += 1
+
+        max_future_q = 0.0 if terminated else np.max(q_table[next_state_idx])
+        delta = reward + agent.gamma * max_future_q - q_table[state_idx, action]
+        table, rows = _table_rows(q_table, states[:n])
+        table[rows, actions[:n]] += agent.learning_rate * delta * traces[:n]
+
+        # Затухание и удаление слабых следов
+        traces[:n] *= agent.gamma * self.trace_decay
+        keep = np.flatnonzero(traces[:n] >= TRACE_MIN)
+        if len(keep) < n:
+            k = len(keep)
+            states[:k], actions[:k], traces[:k] = states[keep], actions[keep], traces[keep]
+            n = k
+        self.n_traces = 0 if terminated else n
@@ -0,0 +1,246 @@
+import functools
+import random
+from collections import deque
+
+import numpy as np
+
+# ==================== ПРОЦЕДУРНЫЕ КАРТЫ ====================
+LAYOUT_CACHE_SIZE = 256  # Карт в LRU-кэше cached_layout
+
+# Флаги клеток в Layout.cell_flags (клетка может совмещать несколько)
+TRAP = 1
+KEY = 2
+TREASURE = 4
+
+def step_limits(grid_size, n_keys):
+    """Лимиты шагов по умолчанию: (до сбора всех ключей, после)"""
+    return max(100, 4 * grid_size * (n_keys + 1)), max(50, 4 * grid_size)
+
+def distance_field(grid_size, cell):
+    """Манхэттенские расстояния от клетки [строка, столбец] до всех клеток"""
+    rows, cols = np.divmod(np.arange(grid_size * grid_size), grid_size)
+    return np.abs(rows - cell[0]) + np.abs(cols - cell[1])
+
+class Layout:
+    """Раскладка карты, сетка занятости и таблицы расстояний.
+
+    cell_flags - флаги TRAP/KEY/TREASURE по номеру клетки (строка * N +
+    столбец), key_ids - номер ключа в клетке или -1: любая проверка клетки
+    - одно обращение по индексу.
+
+    Поля расстояний от каждого ключа и от сокровища считаются один раз (на
+    карте 256x256 полная матрица всех пар клеток заняла бы десятки гигабайт,
+    а шагу среды нужны только они). Ближайший несобранный ключ для каждой
+    маски собранных и проверка проходимости считаются при первом обращении.
+    """
+    def __init__(self, grid_size, keys, traps=(), treasure_pos=None, start_pos=None,
+                 max_steps=None, max_steps_with_keys=None, seed=None):
+        self.grid_size = grid_size
+        self.key_positions = [list(key) for key in keys]
+        self.traps = [list(trap) for trap in traps]
+        self.treasure_pos = (list(treasure_pos) if treasure_pos is not None
+                             else [grid_size - 1, grid_size - 1])
+        self.start_pos = list(start_pos) if start_pos is not None else [0, 0]
+        self.total_keys = len(self.key_positions)
+        default_steps, default_steps_with_keys = step_limits(grid_size, self.total_keys)
+        self.max_steps = max_steps if max_steps is not None else default_steps
+        self.max_steps_with_keys = (max_steps_with_keys if max_steps_with_keys is not None
+                                    else default_steps_with_keys)
+        self.seed = seed
+
+        n_cells = grid_size * grid_size
+        self.cell_flags = bytearray(n_cells)
+        self.key_ids = [-1] * n_cells
+        for pos in self.traps:
+            self.cell_flags[self.cell(pos)] |= TRAP
+        for i, pos in enumerate(self.key_positions):
+            self.cell_flags[self.cell(pos)] |= KEY
+            self.key_ids[self.cell(pos)] = i
+        self.cell_flags[self.cell(self.treasure_pos)] |= TREASURE
+
+        self.key_fields = np.array([distance_field(grid_size, key) for key in self.key_positions],
+                                   dtype=np.int64).reshape(self.total_keys, -1)
+        self.treasure_field = distance_field(grid_size, self.treasure_pos)
+        self.treasure_distance = self.treasure_field.tolist()  # Списки для скалярного шага
+        self._nearest = {}
+        self._solution = False  # Еще не считалось (None - карта непроходима)
+        self._shaping = None
+        self._tables = {}  # (способ формирования награды, ленивые, gamma) -> EnvironmentTables
+
+    def cell(self, pos):
+        return pos[0] * self.grid_size + pos[1]
+
+    def nearest_key_distance(self, mask):
+        """Список: расстояние от каждой клетки до ближайшего ключа не из mask"""
+        nearest = self._nearest.get(mask)
+        if nearest is None:
+            remaining = [i for i in range(self.total_keys) if not mask & (1 << i)]
+            if remaining:
+                nearest = self.key_fields[remaining].min(axis=0).tolist()
+            else:
+                nearest = [0] * (self.grid_size * self.grid_size)
+            self._nearest[mask] = nearest
+        return nearest
+
+    @property
+    def solution_steps(self):
+        """Длина кратчайшего успешного пути в обход ловушек (None - его нет)"""
+        if self._solution is False:
+            self._solution = shortest_solution(self)
+        return self._solution
+
+    @property
+    def solvable(self):
+        """Есть ли путь через все ключи к сокровищу, укладывающийся в лимиты шагов"""
+        steps = self.solution_steps
+        return steps is not None and steps <= min(self.max_steps, self.max_steps_with_keys)
+
+    @property
+    def shaping(self):
+        """Потенциалы shaping.PotentialShaping этой карты (строятся один раз)"""
+        if self._shaping is None:
+            from .shaping import PotentialShaping
+            self._shaping = PotentialShaping(self)
+        return self._shaping
+
+    @property
+    def tables(self):
+        """EnvironmentTables этой карты с исходными наградами"""
+        return self.get_tables()
+
+    def get_tables(self, shaping="legacy", lazy=False, shaping_gamma=None):
+        """EnvironmentTables этой карты (строятся один раз на способ shaping);
+        lazy - core.LazyEnvironmentTables, shaping_gamma - gamma потенциального
+        бонуса (по умолчанию shaping.SHAPING_GAMMA)
+        """
+        from .shaping import SHAPING_GAMMA
+        shaping_gamma = shaping_gamma if shaping_gamma is not None else SHAPING_GAMMA
+        tables = self._tables.get((shaping, lazy, shaping_gamma))
+        if tables is None:
+            from .core import EnvironmentTables, LazyEnvironmentTables, MandatoryKeysEnvironment
+            env = MandatoryKeysEnvironment.from_layout(self, shaping=shaping,
+                                                       shaping_gamma=shaping_gamma)
+            tables = LazyEnvironmentTables(env) if lazy else EnvironmentTables(env)
+            self._tables[(shaping, lazy, shaping_gamma)] = tables
+        return tables
+
+    def config(self):
+        """Параметры MandatoryKeysEnvironment для этой карты"""
+        return {
+            'grid_size': self.grid_size,
+            'keys': [key.copy() for key in self.key_positions],
+            'traps': [trap.copy() for trap in self.traps],
+            'treasure_pos': self.treasure_pos.copy(),
+            'start_pos': self.start_pos.copy(),
+            'max_steps': self.max_steps,
+            'max_steps_with_keys': self.max_steps_with_keys,
+        }
+
+def shortest_solution(layout):
+    """Число шагов кратчайшего успешного эпизода (ловушки обходятся, на
+    сокровище можно встать только со всеми ключами) или None.
+    """
+    cells = [layout.cell(pos) for pos in
+             [layout.start_pos, layout.treasure_pos] + layout.key_positions + layout.traps]
+    if len(set(cells)) < len(cells):
+        return _state_search(layout)  # Совпадающие клетки - общий поиск по состояниям
+    return _key_order_search(layout)
+
+def _key_order_search(layout):
+    """Старт, ключи, сокровище и ловушки в разных клетках: кратчайший путь -
+    это лучший порядок сбора ключей. Расстояния между ключами - поиском в
+    ширину в обход ловушек и сокровища (до сокровища - только ловушек), по
+    одному полю на ключ; порядок - динамикой по подмножествам ключей. На
+    карте 64x64 с 10 ключами это доли секунды против секунд _state_search.
+    """
+    from .shaping import bfs_distances
+    size, n_keys = layout.grid_size, layout.total_keys
+    flags = np.frombuffer(bytes(layout.cell_flags), dtype=np.uint8)
+    points = [layout.cell(key) for key in layout.key_positions] + [layout.cell(layout.start_pos)]
+    # legs[i, j] - от ключа i (последняя строка - от старта) до ключа j
+    legs = np.array([bfs_distances(size, [key], flags & (TRAP | TREASURE))[points]
+                     for key in layout.key_positions], dtype=np.int64).T
+    final = bfs_distances(size, [layout.treasure_pos], flags & TRAP)[points]
+
+    unreachable = np.iinfo(np.int64).max // 4
+    legs[legs >= size * size] = unreachable
+    final[final >= size * size] = unreachable
+    # best[mask, j] - кратчайший путь, собравший ключи mask и последним ключ j
+    keys = np.arange(n_keys)
+    bits = 1 << keys
+    best = np.full((1 << n_keys, n_keys), unreachable, dtype=np.int64)
+    best[bits, keys] = legs[n_keys]
+    for mask in range(1, 1 << n_keys):
+        row = best[mask]
+        if row.min() >= unreachable:
+            continue
+        missing = (mask & bits) == 0
+        targets = mask | bits[missing]
+        reach = (row[:, None] + legs[:n_keys, missing]).min(axis=0)
+        best[targets, keys[missing]] = np.minimum(best[targets, keys[missing]], reach)
+    steps = (best[-1] + final[:n_keys]).min()
+    return int(steps) if steps < unreachable else None
+
+def _state_search(layout):
+    """Поиск в ширину по (клетка, маска ключей): ловушки обходятся, на
+    сокровище можно встать только со всеми ключами.
+    """
+    size = layout.grid_size
+    n_masks = 1 << layout.total_keys
+    full_mask = n_masks - 1
+    flags = layout.cell_flags
+    key_bit = [1 << i if i >= 0 else 0 for i in layout.key_ids]
+
+    start = layout.cell(layout.start_pos) * n_masks
+    visited = bytearray(size * size * n_masks)
+    visited[start] = 1
+    frontier = deque([(start, 0)])
+    while frontier:
+        state, steps = frontier.popleft()
+        cell, mask = divmod(state, n_masks)
+        row, col = divmod(cell, size)
+        for moved, target in ((row > 0, cell - size), (row < size - 1, cell + size),
+                              (col > 0, cell - 1), (col < size - 1, cell + 1)):
+            if not moved or flags[target] & TRAP:
+                continue
+            bit = key_bit[target] & ~mask
+            if flags[target] & TREASURE and not bit:
+                if mask == full_mask:
+                    return steps + 1
+                continue  # Сокровище без ключей завершает эпизод неудачей
+            following = target * n_masks + (mask | bit)
+            if not visited[following]:
+                visited[following] = 1
+                frontier.append((following, steps + 1))
+    return None
+
+def generate_layout(grid_size, n_keys, n_traps=0, seed=None, max_attempts=1000, **kwargs):
+    """Случайная проходимая карта: старт в [0, 0], сокровище, ключи и ловушки
+    в случайных клетках. Непроходимые раскладки отбрасываются.
+    """
+    if n_keys + n_traps + 2 > grid_size * grid_size:
+        raise ValueError(f"На карте {grid_size}x{grid_size} не поместятся "
+                         f"{n_keys} ключей и {n_traps} ловушек")
+    rng = random.Random(seed)
+    start_pos = [0, 0]
+    free = [[r, c] for r in range(grid_size) for c in range(grid_size) if [r, c] != start_pos]
+    for _ in range(max_attempts):
+        cells = rng.sample(free, n_keys + n_traps + 1)
+        layout = Layout(grid_size, keys=cells[1:n_keys + 1], traps=cells[n_keys + 1:],
+                        treasure_pos=cells[0], start_pos=start_pos, seed=seed, **kwargs)
+        if layout.solvable:
+            return layout
+    raise ValueError(f"Не удалось построить проходимую карту за {max_attempts} попыток")
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def cached_layout(grid_size, n_keys, n_traps=0, seed=0):
+    """generate_layout с LRU-кэшем по seed: проверка, расстояния и таблицы
+    переходов карты считаются один раз
+    """
+    return generate_layout(grid_size, n_keys, n_traps, seed)
+
+def layout_stream(grid_size, n_keys, n_traps=0, pool=LAYOUT_CACHE_SIZE, seed=None):
+    """Бесконечный поток случайных карт из pool seed (повторы берутся из кэша)"""
+    rng = random.Random(seed)
+    while True:
+        yield cached_layout(grid_size, n_keys, n_traps, rng.randrange(pool))
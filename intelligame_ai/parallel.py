@@ -0,0 +1,203 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .core import CompactKeysEnvironment, KeyPriorityAgent, MandatoryKeysEnvironment, make_tables
+from .kernel import HAVE_NUMBA
+from .trainer import Trainer
+
+# ==================== ПАРАЛЛЕЛЬНОЕ ОБУЧЕНИЕ ====================
+HOGWILD = "hogwild"
+AVERAGE = "average"
+
+def _worker(worker_id, workers, shm_name, shape, dtype, config, mode, episodes, rounds,
+            sync_every, seed, hyperparams, learner, exploration, results, barrier,
+            stop_requested, stop_latched):
+    """Процесс-обучатель: свои эпизоды, общая Q-таблица в shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        _train_worker(worker_id, workers, shm.buf, shape, dtype, config, mode, episodes, rounds,
+                      sync_every, seed, hyperparams, learner, exploration, results, barrier,
+                      stop_requested, stop_latched)
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        results.put((worker_id, None, None, None, None))
+    shm.close()
+
+def _train_worker(worker_id, workers, buffer, shape, dtype, config, mode, episodes, rounds,
+                  sync_every, seed, hyperparams, learner, exploration, results, barrier,
+                  stop_requested, stop_latched):
+    tables = np.ndarray(shape, dtype=dtype, buffer=buffer)
+    env = CompactKeysEnvironment(make_tables(MandatoryKeysEnvironment(**config)))
+    learner_name, learner_params = learner
+    agent = KeyPriorityAgent.for_env(env.tables, "auto", learner_name, **learner_params)
+    for name, value in hyperparams.items():
+        setattr(agent, name, value)
+    exploration_name, exploration_params, exploration_state = exploration
+    agent.set_exploration(exploration_name, **exploration_params)
+    agent.exploration.load_state(exploration_state)
+    if mode == HOGWILD:
+        # Обновления пишутся прямо в общую таблицу без блокировок
+        agent.q_table = tables[0]
+    else:
+        agent.q_table = tables[workers].copy()
+
+    kernel = HAVE_NUMBA and agent.learner.name == "q_learning" and exploration_name == "step"
+    trainer = Trainer(agent, env, kernel=kernel,
+                      seed=None if seed is None else seed + worker_id)
+
+    # Раундов у всех процессов поровну (барьеры усреднения), а эпизодов
+    # может быть на один меньше: последний раунд такой процесс пропускает
+    for begin in range(0, rounds * sync_every, sync_every):
+        count = min(sync_every, episodes - begin)
+        if count > 0:
+            rewards, successes, keys = trainer.run_episodes(count)
+            results.put((worker_id, rewards, successes, keys, agent.epsilon))
+
+        if mode == HOGWILD:
+            if stop_requested.is_set():
+                break
+            continue
+
+        # Усреднение: все пишут свои таблицы, процесс 0 считает среднее
+        tables[worker_id] = agent.q_table
+        barrier.wait()
+        if worker_id == 0:
+            tables[workers] = tables[:workers].mean(axis=0)
+            stop_latched.value = stop_requested.is_set()
+        barrier.wait()
+        agent.q_table[:] = tables[workers]
+        if stop_latched.value:
+            break
+
+class ParallelTrainer(Trainer):
+    """Обучение в нескольких процессах с общей Q-таблицей.
+
+    mode="hogwild" - все процессы асинхронно обновляют одну таблицу в shared
+    memory; mode="average" - каждые sync_every эпизодов таблицы процессов
+    усредняются. Алгоритмы обучения со своими таблицами (double_q) не
+    поддерживаются: общей между процессами бывает только Q-таблица.
+    Расписание исследования и счетчики посещений у каждого процесса свои.
+    """
+    def __init__(self, agent=None, env=None, workers=None, mode=HOGWILD, sync_every=1000,
+                 seed=None):
+        super().__init__(agent, env)
+        if mode not in (HOGWILD, AVERAGE):
+            raise ValueError(f"Неизвестный режим: {mode}")
+        if not isinstance(self.agent.q_table, np.ndarray):
+            raise TypeError("Для общей памяти нужна плотная Q-таблица")
+        if self.agent.learner.tables():
+            raise ValueError(f"Алгоритм {self.agent.learner.name} не поддерживается "
+                             f"при параллельном обучении")
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.sync_every = sync_every
+        self.seed = seed
+
+    def train(self, episodes, callback=None, report_every=1000, checkpoint=None,
+              checkpoint_every=None, evaluate_every=None):
+        """Обучение на заданном числе эпизодов, поделенных между процессами.
+
+        Контрольная точка и оценка жадной политики делаются только в конце:
+        до этого Q-таблица лежит в общей памяти процессов.
+        """
+        agent = self.agent
+        workers = self.workers
+        slots = 1 if self.mode == HOGWILD else workers + 1
+        shape = (slots,) + agent.q_table.shape
+        dtype = agent.q_table.dtype.str
+
+        size = int(np.prod(shape)) * agent.q_table.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        tables = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        tables[:] = agent.q_table
+
+        hyperparams = {name: getattr(agent, name) for name in
+                       ('epsilon', 'epsilon_min', 'epsilon_decay', 'learning_rate', 'gamma')}
+        # Первые episodes % workers процессов делают на эпизод больше
+        per_worker, extra = divmod(episodes, workers)
+        rounds = -(-(per_worker + (extra > 0)) // self.sync_every)
+        results = mp.Queue()
+        barrier = mp.Barrier(workers)
+        stop_requested = mp.Event()
+        stop_latched = mp.Value('b', 0)
+        processes = [
+            mp.Process(target=_worker, args=(i, workers, shm.name, shape, dtype,
+                                             self.env.tables.config, self.mode,
+                                             per_worker + (i < extra), rounds,
+                                             self.sync_every, self.seed, hyperparams,
+                                             (agent.learner.name, agent.learner.params()),
+                                             (agent.exploration.name, agent.exploration.params(),
+                                              agent.exploration.state()), results,
+                                             barrier, stop_requested, stop_latched))
+            for i in range(workers)
+        ]
+
+        stats = self.stats
+        first = reported = stats.episodes
+        epsilons = {}
+        worker_episodes = [0] * workers
+        start = time.perf_counter()
+        summary = self._summary(stats, start, first)
+        finished = 0
+
+        try:
+            for process in processes:
+                process.start()
+
+            while finished < workers:
+                try:
+                    worker_id, chunk_rewards, chunk_successes, chunk_keys, epsilon = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break
+                    continue
+                if chunk_rewards is None:
+                    finished += 1
+                    continue
+
+                stats.extend(chunk_rewards, chunk_successes, chunk_keys)
+                self.total_episodes += len(chunk_rewards)
+                self.perfect_episodes += int(chunk_successes.sum())
+                epsilons[worker_id] = epsilon
+                worker_episodes[worker_id] += len(chunk_rewards)
+                agent.epsilon = sum(epsilons.values()) / len(epsilons)
+
+                if stats.episodes - reported >= report_every:
+                    reported = stats.episodes
+                    summary = self._summary(stats, start, first)
+                    if callback is not None and callback(self, summary) is False:
+                        stop_requested.set()
+
+            for process in processes:
+                process.join()
+            failed = [process.exitcode for process in processes if process.exitcode != 0]
+            if failed:
+                raise RuntimeError(f"Процессы обучения завершились с ошибкой: {failed}")
+
+            agent.q_table = tables[-1].copy()
+            # Расписание продолжается с того места, где его оставил самый
+            # далеко ушедший процесс
+            agent.exploration.episode += max(worker_episodes)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            del tables
+            shm.close()
+            shm.unlink()
+
+        if evaluate_every:
+            self.evaluate()
+        summary = self._summary(stats, start, first)
+        if callback is not None and stats.episodes > reported:
+            callback(self, summary)
+        if checkpoint:
+            self.save_checkpoint(checkpoint)
+        return summary
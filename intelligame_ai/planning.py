@@ -0,0 +1,148 @@
+import heapq
+import time
+
+import numpy as np
+
+from .core import CompactKeysEnvironment, EnvironmentTables, KeyPriorityAgent, SparseQTable
+
+# ==================== ПЛАНИРОВАНИЕ ПО ТАБЛИЦАМ ПЕРЕХОДОВ ====================
+VALUE_ITERATION = "value_iteration"
+PRIORITIZED_SWEEPING = "prioritized_sweeping"
+PLANNERS = (VALUE_ITERATION, PRIORITIZED_SWEEPING)
+
+def value_iteration(tables=None, gamma=0.9, tol=1e-6, max_iter=10000):
+    """Оптимальная Q-функция векторной итерацией по значениям.
+
+    Q(s, a) = r(s, a) + gamma * max Q(s', .), после ловушки и сокровища
+    будущей награды нет. Лимит шагов не учитывается: это неподвижная точка
+    того же TD-обновления, что делает KeyPriorityAgent. Возвращает
+    (Q-таблица, число итераций).
+    """
+    tables = (tables if tables is not None else EnvironmentTables.default()).dense()
+    reward = tables.reward.astype(np.float64)
+    discount = np.where(tables.terminal, 0.0, gamma)
+    q = np.zeros((tables.n_states, tables.action_size))
+
+    for iteration in range(1, max_iter + 1):
+        new_q = reward + discount * q.max(axis=1)[tables.next_state]
+        delta = np.abs(new_q - q).max()
+        q = new_q
+        if delta < tol:
+            break
+    return q, iteration
+
+def prioritized_sweeping(tables=None, gamma=0.9, tol=1e-6, max_updates=None):
+    """Оптимальная Q-функция обновлениями состояний в порядке ошибки Беллмана.
+
+    После обновления состояния пересчитываются только его предшественники,
+    поэтому состояния, до которых награда не доходит, почти не трогаются.
+    Возвращает (Q-таблица, число обновлений состояний).
+    """
+    tables = (tables if tables is not None else EnvironmentTables.default()).dense()
+    n_states = tables.n_states
+    actions = range(tables.action_size)
+    max_updates = max_updates if max_updates is not None else 1000 * n_states
+
+    next_state = tables.next_state.tolist()
+    reward = tables.reward.tolist()
+    discount = np.where(tables.terminal, 0.0, gamma).tolist()
+
+    # Предшественники каждого состояния (без повторов)
+    flat_next = tables.next_state.ravel()
+    order = np.argsort(flat_next, kind='stable')
+    bounds = np.searchsorted(flat_next[order], np.arange(n_states + 1)).tolist()
+    sources = (order // tables.action_size).tolist()
+    predecessors = [sorted(set(sources[bounds[s]:bounds[s + 1]])) for s in range(n_states)]
+
+    values = [0.0] * n_states
+
+    def backup(s):
+        row_next, row_reward, row_discount = next_state[s], reward[s], discount[s]
+        return max(row_reward[a] + row_discount[a] * values[row_next[a]] for a in actions)
+
+    queue = []
+    for s in range(n_states):
+        error = abs(backup(s) - values[s])
+        if error > tol:
+            queue.append((-error, s))
+    heapq.heapify(queue)
+
+    updates = 0
+    while queue and updates < max_updates:
+        _, s = heapq.heappop(queue)
+        value = backup(s)
+        if abs(value - values[s]) <= tol:
+            continue  # Устаревшая запись очереди
+        values[s] = value
+        updates += 1
+        for p in predecessors[s]:
+            error = abs(backup(p) - values[p])
+            if error > tol:
+                heapq.heappush(queue, (-error, p))
+
+    values = np.array(values)
+    q = tables.reward + np.where(tables.terminal, 0.0, gamma) * values[tables.next_state]
+    return q, updates
+
+def solve(tables=None, gamma=0.9, method=VALUE_ITERATION, tol=1e-6):
+    """Оптимальная Q-таблица выбранным методом: (Q-таблица, итерации, секунды)"""
+    if method not in PLANNERS:
+        raise ValueError(f"Неизвестный метод планирования: {method}")
+    start = time.perf_counter()
+    if method == VALUE_ITERATION:
+        q, iterations = value_iteration(tables, gamma, tol)
+    else:
+        q, iterations = prioritized_sweeping(tables, gamma, tol)
+    return q, iterations, time.perf_counter() - start
+
+def reachable_states(tables):
+    """Булев массив состояний, достижимых из стартового при любых действиях"""
+    tables = tables.dense()
+    reachable = np.zeros(tables.n_states, dtype=bool)
+    reachable[tables.start_state] = True
+    frontier = np.array([tables.start_state])
+    while len(frontier):
+        # Из завершающих переходов дальше не идем
+        nxt = tables.next_state[frontier][~tables.terminal[frontier]]
+        nxt = np.unique(nxt[~reachable[nxt]])
+        reachable[nxt] = True
+        frontier = nxt
+    return reachable
+
+def warm_start(agent, tables=None, method=VALUE_ITERATION):
+    """Записать в Q-таблицу агента решение планировщика.
+
+    Плотная таблица заполняется целиком (с приведением к ее dtype),
+    разреженная - только достижимыми состояниями. Возвращает агента.
+    """
+    tables = tables if tables is not None else EnvironmentTables.default()
+    if agent.state_size != tables.n_states:
+        raise ValueError("Размер Q-таблицы агента не совпадает с картой")
+    q, _, _ = solve(tables, agent.gamma, method)
+
+    if isinstance(agent.q_table, SparseQTable):
+        for state in np.flatnonzero(reachable_states(tables)).tolist():
+            agent.q_table[state] = q[state]
+    else:
+        agent.q_table[:] = q
+    return agent
+
+def greedy_rollout(q, tables=None):
+    """Эпизод по жадной политике: (награда, успех, ключи, шаги)"""
+    env = CompactKeysEnvironment(tables)
+    state = env.reset()
+    done = False
+    while not done:
+        state, _, done = env.step(int(np.argmax(q[state])))
+    return env.total_reward, 1 if env.success else 0, env.keys_collected, env.steps
+
+if __name__ == "__main__":
+    for method in PLANNERS:
+        q, iterations, elapsed = solve(method=method)
+        reward, success, keys, steps = greedy_rollout(q)
+        print(f"{method}: {iterations} итераций за {elapsed * 1000:.1f} мс; "
+              f"жадная политика: награда {reward}, успех {success}, ключи {keys}, шагов {steps}")
+
+    agent = warm_start(KeyPriorityAgent())
+    q, _, _ = solve()
+    print("Совпадение с агентом:", np.allclose(agent.q_table, q))
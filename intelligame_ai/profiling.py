@@ -0,0 +1,237 @@
+import functools
+import json
+import sys
+import time
+
+from .core import CompactKeysEnvironment, KeyPriorityAgent, MandatoryKeysEnvironment
+from .trainer import Trainer
+
+# ==================== ПРОФИЛИРОВАНИЕ ====================
+# Группы замеров: по их долям видно, во что упирается обучение
+ENVIRONMENT = "environment"
+LEARNER = "learner"
+LOOP = "loop"
+RENDER = "render"
+PROFILER_OVERHEAD = "profiler"  # Время самих оберток внутри цикла
+
+class Profiler:
+    """Счетчики и таймеры горячих путей.
+
+    Замеры встраиваются заменой методов классов обертками при enable() и
+    снимаются при disable(), поэтому выключенный профилировщик ничего не
+    стоит. Цели регистрирует register(); модули GUI добавляют свои сами.
+    Цена обертки на вызов замеряется при enable() и в долях времени идет
+    отдельной группой profiler, а не в накладные расходы цикла.
+    """
+    def __init__(self):
+        self.targets = []  # (класс, метод, имя, группа, after, nested)
+        self.originals = {}  # (класс, метод) -> исходная функция
+        self.enabled = False
+        self.track_allocations = False
+        self.call_cost = 0.0  # Секунд на вызов обертки сверх самого метода
+        self.reset()
+
+    def register(self, cls, method, name, group, after=None, nested=False):
+        """Цель замеров.
+
+        after(obj, result) может добавить свои счетчики; nested=True - метод
+        вызывает другую цель той же группы и в доли времени не входит.
+        """
+        target = (cls, method, name, group, after, nested)
+        self.targets.append(target)
+        if self.enabled:
+            self._wrap(*target)
+
+    def reset(self):
+        self.timers = {}  # Имя -> [вызовы, сумма секунд, максимум, группа, nested]
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    def enable(self, track_allocations=False):
+        """Включение замеров; track_allocations - считать блоки памяти на вызов"""
+        if self.enabled:
+            self.disable()
+        self.track_allocations = track_allocations
+        self.call_cost = self._calibrate()
+        for target in self.targets:
+            self._wrap(*target)
+        self.enabled = True
+        self.reset()
+
+    def disable(self):
+        """Возврат исходных методов"""
+        for (cls, method), original in self.originals.items():
+            setattr(cls, method, original)
+        self.originals.clear()
+        self.enabled = False
+
+    def _calibrate(self, calls=10000, repeats=5):
+        """Цена обертки на вызов, не попавшая в ее же таймер.
+
+        Замеряются пустой цикл, цикл вызовов пустого метода и цикл вызовов
+        обертки; из добавки обертки вычитается то, что она записала сверх
+        самого вызова.
+        """
+        class Probe:
+            def method(self):
+                return None
+
+        probe = Profiler()
+        probe.track_allocations = self.track_allocations
+        bare = Probe().method
+        probe._wrap(Probe, 'method', 'probe', LEARNER, None, False)
+        wrapped = Probe().method
+        perf_counter = time.perf_counter
+        costs = []
+        for _ in range(repeats):
+            probe.reset()
+            start = perf_counter()
+            for _ in range(calls):
+                pass
+            empty = perf_counter()
+            for _ in range(calls):
+                bare()
+            middle = perf_counter()
+            for _ in range(calls):
+                wrapped()
+            end = perf_counter()
+            recorded = probe.timers['probe'][1] - (middle - empty - (empty - start))
+            costs.append((end - middle) - (middle - empty) - recorded)
+        # Минимум из повторов меньше всего искажен планировщиком
+        return max(0.0, min(costs) / calls)
+
+    def _wrap(self, cls, method, name, group, after, nested):
+        original = cls.__dict__[method]
+        self.originals[(cls, method)] = original
+        perf_counter = time.perf_counter
+        blocks = sys.getallocatedblocks if self.track_allocations else None
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(obj, *args, **kwargs):
+            if blocks is not None:
+                blocks_before = blocks()
+            start = perf_counter()
+            result = original(obj, *args, **kwargs)
+            elapsed = perf_counter() - start
+            # Таймер мог быть пересоздан в reset()
+            record = profiler.timers.get(name)
+            if record is None:
+                record = profiler.timers[name] = [0, 0.0, 0.0, group, nested]
+            record[0] += 1
+            record[1] += elapsed
+            if elapsed > record[2]:
+                record[2] = elapsed
+            if blocks is not None:
+                profiler.count(name + ".blocks", blocks() - blocks_before)
+            if after is not None:
+                after(obj, result)
+            return result
+
+        setattr(cls, method, wrapper)
+
+    def count(self, name, value=1):
+        """Увеличить счетчик name"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def stats(self):
+        """Словарь замеров: таймеры, счетчики и доли групп во времени"""
+        timers = {}
+        groups = {}
+        wrapped_calls = 0  # Вызовы оберток внутри цикла обучения
+        for name, (calls, total, longest, group, nested) in self.timers.items():
+            if not calls:
+                continue
+            if group != LOOP:
+                wrapped_calls += calls
+            timers[name] = {
+                'group': group,
+                'calls': calls,
+                'total_ms': total * 1000,
+                'mean_us': total / calls * 1e6,
+                'max_us': longest * 1e6,
+            }
+            if nested:
+                continue
+            groups.setdefault(group, 0.0)
+            # Цикл обучения включает время среды и агента, поэтому в долях
+            # считается только самый долгий из его таймеров
+            if group == LOOP:
+                groups[group] = max(groups[group], total)
+            else:
+                groups[group] += total
+
+        counters = dict(self.counters)
+        episodes = counters.get('episodes', 0)
+        if episodes:
+            counters['steps_per_episode'] = counters.get('episode_steps', 0) / episodes
+        for name, timer in timers.items():
+            blocks = counters.get(name + ".blocks")
+            if blocks is not None:
+                counters[name + ".blocks_per_call"] = blocks / timer['calls']
+
+        # Доля среды, агента и отрисовки; из остатка цикла вычитается цена
+        # самих оберток, остальное - накладные расходы цикла
+        measured = {group: total for group, total in groups.items() if group != LOOP}
+        loop = groups.get(LOOP, 0.0)
+        if loop:
+            rest = loop - measured.get(ENVIRONMENT, 0.0) - measured.get(LEARNER, 0.0)
+            wrappers = min(max(0.0, rest), wrapped_calls * self.call_cost)
+            measured[PROFILER_OVERHEAD] = wrappers
+            measured['loop_overhead'] = max(0.0, rest - wrappers)
+        total = sum(measured.values())
+        shares = {group: value / total * 100 for group, value in measured.items()} if total else {}
+        # Узкое место ищется среди частей самого обучения
+        work = {group: share for group, share in shares.items() if group != PROFILER_OVERHEAD}
+        return {
+            'enabled': self.enabled,
+            'elapsed': time.perf_counter() - self.started,
+            'timers': timers,
+            'counters': counters,
+            'shares': shares,
+            'call_cost_us': self.call_cost * 1e6,
+            'bound_by': max(work, key=work.get) if work else None,
+        }
+
+    def report(self):
+        """Текстовая таблица замеров"""
+        stats = self.stats()
+        lines = [f"{'Замер':<36}{'вызовов':>10}{'всего, мс':>12}{'среднее, мкс':>14}{'макс, мкс':>12}"]
+        for name, timer in sorted(stats['timers'].items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"{name:<36}{timer['calls']:>10}{timer['total_ms']:>12.1f}"
+                         f"{timer['mean_us']:>14.2f}{timer['max_us']:>12.1f}")
+        for name, value in sorted(stats['counters'].items()):
+            lines.append(f"{name:<36}{value:>10.2f}" if isinstance(value, float)
+                         else f"{name:<36}{value:>10}")
+        if stats['shares']:
+            shares = ", ".join(f"{group} {share:.0f}%" for group, share in
+                               sorted(stats['shares'].items(), key=lambda item: -item[1]))
+            lines.append(f"Доли времени: {shares}; узкое место: {stats['bound_by']}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Сохранение замеров: .csv - таблица таймеров, иначе JSON"""
+        stats = self.stats()
+        with open(path, "w", encoding="utf-8") as f:
+            if str(path).endswith(".csv"):
+                f.write("name,group,calls,total_ms,mean_us,max_us\n")
+                for name, timer in stats['timers'].items():
+                    f.write(f"{name},{timer['group']},{timer['calls']},{timer['total_ms']:.3f},"
+                            f"{timer['mean_us']:.3f},{timer['max_us']:.3f}\n")
+            else:
+                json.dump(stats, f, indent=2, ensure_ascii=False)
+
+def _count_episode(trainer, result):
+    PROFILER.count('episodes')
+    PROFILER.count('episode_steps', trainer.env.steps)
+
+PROFILER = Profiler()
+PROFILER.register(MandatoryKeysEnvironment, 'step', 'env.step', ENVIRONMENT)
+PROFILER.register(CompactKeysEnvironment, 'step', 'compact_env.step', ENVIRONMENT)
+PROFILER.register(KeyPriorityAgent, 'get_action', 'agent.get_action', LEARNER, nested=True)
+PROFILER.register(KeyPriorityAgent, 'get_action_index', 'agent.get_action_index', LEARNER)
+PROFILER.register(KeyPriorityAgent, 'update', 'agent.update', LEARNER, nested=True)
+PROFILER.register(KeyPriorityAgent, 'update_index', 'agent.update_index', LEARNER)
+PROFILER.register(KeyPriorityAgent, 'update_batch', 'agent.update_batch', LEARNER)
+PROFILER.register(Trainer, 'run_episode', 'trainer.run_episode', LOOP, _count_episode)
+PROFILER.register(Trainer, 'run_episodes', 'trainer.run_episodes', LOOP, nested=True)
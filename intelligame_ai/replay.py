@@ -0,0 +1,77 @@
+import numpy as np
+
+# ==================== ПАМЯТЬ ПОВТОРА ОПЫТА ====================
+class ReplayBuffer:
+    """Кольцевой буфер переходов в заранее выделенных массивах NumPy.
+
+    При prioritized=True переходы выбираются с вероятностью, пропорциональной
+    |TD-ошибка| ** alpha; новые переходы получают максимальный приоритет, а
+    веса важности (N * P) ** -beta нормируются на максимум в пакете.
+    """
+    def __init__(self, capacity=50000, prioritized=False, alpha=0.6, beta=0.4, seed=None):
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.terminated = np.zeros(capacity, dtype=bool)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+        self.max_priority = 1.0
+
+        self.position = 0  # Куда писать следующий переход
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, terminated):
+        """Запомнить переход (старые перезаписываются по кругу)"""
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.terminated[i] = terminated
+        self.priorities[i] = self.max_priority
+        self.position = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def sample(self, batch_size):
+        """Пакет: (индексы, (s, a, r, s', terminated), веса или None)"""
+        if self.prioritized:
+            cumulative = np.cumsum(self.priorities[:self.size])
+            total = cumulative[-1]
+            indices = np.searchsorted(cumulative, self.rng.random(batch_size) * total,
+                                      side='right')
+            indices = np.minimum(indices, self.size - 1)
+            weights = (self.size * self.priorities[indices] / total) ** -self.beta
+            weights /= weights.max()
+        else:
+            indices = self.rng.integers(0, self.size, batch_size)
+            weights = None
+        batch = (self.states[indices], self.actions[indices], self.rewards[indices],
+                 self.next_states[indices], self.terminated[indices])
+        return indices, batch, weights
+
+    def update_priorities(self, indices, td_errors):
+        """Новые приоритеты выбранных переходов по их TD-ошибкам"""
+        if not self.prioritized:
+            return
+        priorities = (np.abs(td_errors) + 1e-6) ** self.alpha
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def replay(self, agent, batch_size=32):
+        """Один пакет повтора опыта для агента; возвращает TD-ошибки"""
+        if self.size == 0:
+            return None
+        indices, batch, weights = self.sample(batch_size)
+        td_errors = agent.update_batch(*batch, weights=weights)
+        self.update_priorities(indices, td_errors)
+        return td_errors
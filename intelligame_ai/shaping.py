@@ -0,0 +1,88 @@
+import numpy as np
+
+# ==================== ФОРМИРОВАНИЕ НАГРАДЫ ====================
+# Способы поощрения обычных шагов в MandatoryKeysEnvironment:
+# "legacy" - исходные +3/-2/-1 к ключу и +5/-3 к сокровищу (сравнение идет с
+# расстоянием между старой и новой клеткой, а не со старым расстоянием до
+# ключа), "potential" - штраф за шаг плюс gamma * Phi(s') - Phi(s)
+LEGACY = "legacy"
+POTENTIAL = "potential"
+SHAPINGS = (LEGACY, POTENTIAL)
+STEP_COST = -1  # Базовая награда обычного шага при POTENTIAL
+# gamma бонуса: оптимальную политику он не меняет, только если совпадает с
+# gamma агента (Trainer подставляет gamma своего агента). По умолчанию -
+# gamma KeyPriorityAgent
+SHAPING_GAMMA = 0.9
+SHAPING_SCALE = 1.0  # Вес одной клетки расстояния
+
+def bfs_distances(grid_size, sources, blocked):
+    """Расстояния по сетке до ближайшей из клеток sources в обход клеток
+    blocked (векторный поиск в ширину: весь фронт за одну операцию).
+
+    Недостижимые клетки получают grid_size ** 2.
+    """
+    free = ~np.asarray(blocked, dtype=bool).reshape(grid_size, grid_size)
+    distances = np.full((grid_size, grid_size), grid_size * grid_size, dtype=np.int64)
+    frontier = np.zeros((grid_size, grid_size), dtype=bool)
+    for row, col in sources:
+        frontier[row, col] = True
+    distances[frontier] = 0
+    visited = frontier.copy()
+
+    distance = 0
+    while frontier.any():
+        distance += 1
+        following = np.zeros_like(frontier)
+        following[1:, :] |= frontier[:-1, :]
+        following[:-1, :] |= frontier[1:, :]
+        following[:, 1:] |= frontier[:, :-1]
+        following[:, :-1] |= frontier[:, 1:]
+        following &= free & ~visited
+        distances[following] = distance
+        visited |= following
+        frontier = following
+    return distances.ravel()
+
+class PotentialShaping:
+    """Потенциал Phi(s) = -scale * (расстояние в обход ловушек до цели).
+
+    Цель - ближайший несобранный ключ (сокровище, куда без ключей входить
+    нельзя, обходится), после сбора всех ключей - сокровище. Таблица
+    potential[маска, клетка] строится один раз на карту (maps.Layout.shaping),
+    gamma передается в bonus: у карты может быть несколько агентов.
+
+    После успеха Phi(s') = 0 (это и есть потенциал сокровища со всеми
+    ключами). После неудачи (ловушка, сокровище без ключей) gamma * Phi(s')
+    равно наименьшему потенциалу карты: бонус такого шага не больше нуля,
+    иначе гибель вдали от цели поощрялась бы на |Phi(s)|.
+    """
+    def __init__(self, layout, scale=SHAPING_SCALE):
+        from .maps import TRAP, TREASURE
+
+        size = layout.grid_size
+        flags = np.frombuffer(bytes(layout.cell_flags), dtype=np.uint8)
+        self.key_fields = np.array([bfs_distances(size, [key], flags & (TRAP | TREASURE))
+                                    for key in layout.key_positions]).reshape(layout.total_keys, -1)
+        self.treasure_field = bfs_distances(size, [layout.treasure_pos], flags & TRAP)
+
+        n_masks = 1 << layout.total_keys
+        fields = np.empty((n_masks, size * size), dtype=np.int64)
+        for mask in range(n_masks):
+            remaining = [i for i in range(layout.total_keys) if not mask & (1 << i)]
+            fields[mask] = self.key_fields[remaining].min(axis=0) if remaining else self.treasure_field
+        # Недостижимые клетки (за ловушками) получают наибольшее конечное расстояние
+        reachable = fields < size * size
+        longest = int(fields[reachable].max()) if reachable.any() else 0
+        self.potential = -scale * np.minimum(fields, longest).astype(np.float64)
+        self.potential_list = self.potential.tolist()  # Для скалярного шага
+        self.lowest = -scale * longest
+
+    def bonus(self, mask, cell, next_mask, next_cell, failed, gamma=SHAPING_GAMMA):
+        """gamma * Phi(s') - Phi(s); failed - эпизод закончился неудачей"""
+        following = self.lowest if failed else gamma * self.potential_list[next_mask][next_cell]
+        return following - self.potential_list[mask][cell]
+
+    def bonus_table(self, masks, cells, next_masks, next_cells, failed, gamma=SHAPING_GAMMA):
+        """То же для массивов переходов (EnvironmentTables)"""
+        following = np.where(failed, self.lowest, gamma * self.potential[next_masks, next_cells])
+        return following - self.potential[masks, cells]
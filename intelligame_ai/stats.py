@@ -0,0 +1,164 @@
+import numpy as np
+
+# ==================== СТАТИСТИКА ОБУЧЕНИЯ ====================
+REWARD, SUCCESS, KEYS = 0, 1, 2
+
+def lttb(x, y, threshold):
+    """Прореживание ряда до threshold точек (Largest-Triangle-Three-Buckets).
+
+    Первая и последняя точки сохраняются; из каждой корзины берется точка,
+    образующая наибольший треугольник с предыдущей выбранной точкой и средним
+    следующей корзины, поэтому пики и провалы не теряются.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    # Цикл по спискам: каждая точка просматривается один раз
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64).tolist() + [n]
+    xs, ys = x.tolist(), y.tolist()
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        begin, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_y = sum(ys[end:next_end]) / (next_end - end)
+        ax, ay = xs[a], ys[a]
+        best_area = -1.0
+        for j in range(begin, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                a = j
+        selected.append(a)
+    selected.append(n - 1)
+    return x[selected], y[selected]
+
+class RollingStats:
+    """Скользящая статистика эпизодов с постоянной памятью.
+
+    Последние window эпизодов лежат в кольцевом буфере, суммы по нему
+    обновляются за O(1) на эпизод. Итоговые счетчики считаются за все время.
+    Долгая история хранит скользящие средние в заранее выделенном массиве на
+    history_size точек: когда он заполняется, остается каждая вторая точка, а
+    шаг записи удваивается.
+    """
+    def __init__(self, window=100, history_size=2048):
+        self.window = window
+        self.ring = np.zeros((window, 3))  # Награда, успех, ключи
+        self.sums = [0.0, 0.0, 0.0]
+        self.position = 0  # Куда писать следующий эпизод
+        self.count = 0  # Эпизодов в буфере
+
+        # Итоги за все время
+        self.episodes = 0
+        self.totals = [0.0, 0.0, 0.0]
+
+        # История: эпизод, средняя награда, доля успеха, средние ключи
+        self.history = np.zeros((history_size, 4))
+        self.history_len = 0
+        self.stride = 1
+
+    def __len__(self):
+        return self.episodes
+
+    def add(self, reward, success, keys):
+        """Один эпизод"""
+        values = (reward, success, keys)
+        old = self.ring[self.position].tolist()
+        self.ring[self.position] = values
+        sums, totals = self.sums, self.totals
+        for i in range(3):
+            sums[i] += values[i] - old[i]
+            totals[i] += values[i]
+        self.position = (self.position + 1) % self.window
+        if self.position == 0:
+            # Раз за оборот буфера суммы пересчитываются заново, чтобы не
+            # копилась ошибка округления от вычитаний
+            self.sums = sums = self.ring.sum(axis=0).tolist()
+        if self.count < self.window:
+            self.count += 1
+        self.episodes += 1
+        if self.episodes % self.stride == 0:
+            self._record([self.episodes], [[total / self.count for total in sums]])
+
+    def extend(self, rewards, successes, keys):
+        """Пачка эпизодов (массивы одинаковой длины)"""
+        values = np.column_stack([rewards, successes, keys]).astype(np.float64)
+        n = len(values)
+        if n == 0:
+            return
+
+        # Скользящие средние в каждой точке пачки по хвосту буфера и пачке
+        tail = np.roll(self.ring, -self.position, axis=0)[self.window - self.count:]
+        cumulative = np.zeros((len(tail) + n + 1, 3))
+        np.cumsum(np.concatenate([tail, values]), axis=0, out=cumulative[1:])
+        ends = np.arange(len(tail) + 1, len(tail) + n + 1)
+        begins = np.maximum(ends - self.window, 0)
+        episodes = self.episodes + np.arange(1, n + 1)
+        recorded = episodes % self.stride == 0
+        if recorded.any():
+            means = (cumulative[ends] - cumulative[begins]) / (ends - begins)[:, None]
+            self._record(episodes[recorded].tolist(), means[recorded])
+
+        # Новые значения в кольцевой буфер
+        last = values[-self.window:]
+        slots = (self.position + np.arange(n - len(last), n)) % self.window
+        self.ring[slots] = last
+        self.position = (self.position + n) % self.window
+        self.count = min(self.count + n, self.window)
+        self.sums = self.ring.sum(axis=0).tolist()
+        self.episodes += n
+        self.totals = (np.array(self.totals) + values.sum(axis=0)).tolist()
+
+    def _record(self, episodes, means):
+        """Точки истории; при заполнении массива история прореживается вдвое"""
+        for episode, row in zip(episodes, means):
+            if episode % self.stride:
+                continue  # Шаг мог удвоиться внутри пачки
+            if self.history_len == len(self.history):
+                half = self.history[1::2]
+                self.history[:len(half)] = half
+                self.history_len = len(half)
+                self.stride *= 2
+                if episode % self.stride:
+                    continue
+            self.history[self.history_len, 0] = episode
+            self.history[self.history_len, 1:] = row
+            self.history_len += 1
+
+    def _mean(self, column):
+        return self.sums[column] / self.count if self.count else 0.0
+
+    @property
+    def avg_reward(self):
+        """Средняя награда за последние window эпизодов"""
+        return self._mean(REWARD)
+
+    @property
+    def success_rate(self):
+        """Доля успешных из последних window эпизодов, в процентах"""
+        return self._mean(SUCCESS) * 100
+
+    @property
+    def avg_keys(self):
+        """Среднее число ключей за последние window эпизодов"""
+        return self._mean(KEYS)
+
+    @property
+    def recent_successes(self):
+        """Успешных эпизодов среди последних window"""
+        return int(round(self.sums[SUCCESS]))
+
+    @property
+    def perfect_episodes(self):
+        """Успешных эпизодов за все время"""
+        return int(round(self.totals[SUCCESS]))
+
+    def mean(self, column):
+        """Среднее за все время по столбцу REWARD, SUCCESS или KEYS"""
+        return self.totals[column] / self.episodes if self.episodes else 0.0
+
+    def get_history(self):
+        """Массивы (эпизоды, средняя награда, доля успеха, средние ключи)"""
+        history = self.history[:self.history_len]
+        return history[:, 0], history[:, 1], history[:, 2], history[:, 3]
@@ -0,0 +1,198 @@
+import random
+import time
+
+import numpy as np
+
+from .core import CompactKeysEnvironment, KeyPriorityAgent
+from .shaping import POTENTIAL
+from .stats import RollingStats
+
+# ==================== ОБУЧЕНИЕ БЕЗ GUI ====================
+class Trainer:
+    """Цикл обучения KeyPriorityAgent в MandatoryKeysEnvironment без Qt и matplotlib"""
+    def __init__(self, agent=None, env=None, training=True, kernel=False, seed=None,
+                 replay=None, batch_size=32, replay_every=1, layouts=None, exploration=None):
+        self.env = env if env is not None else CompactKeysEnvironment()
+        self.agent = agent if agent is not None else KeyPriorityAgent.for_env(self.env.tables)
+        self.training = training
+
+        # Потенциальный бонус не меняет оптимальную политику, только если его
+        # gamma совпадает с gamma агента: таблицы карты берутся с ней
+        tables = self.env.tables
+        if tables.shaping == POTENTIAL and tables.shaping_gamma != self.agent.gamma:
+            self.env.tables = tables.layout.get_tables(tables.shaping, tables.lazy, self.agent.gamma)
+            self.env.tables.build_lists()
+            self.env.reset()
+
+        # seed фиксирует и ядро, и обычный цикл: у агента свой генератор
+        if seed is not None:
+            self.agent.rng = random.Random(seed)
+
+        # Способ исследования агента (имя из exploration.EXPLORATIONS или объект)
+        if exploration is not None:
+            self.agent.set_exploration(exploration)
+
+        # Память повтора опыта (ReplayBuffer): каждые replay_every шагов
+        # агент дополнительно учится на пакете из batch_size старых переходов
+        if replay is not None and kernel:
+            raise ValueError("Повтор опыта не поддерживается ядром обучения")
+        if replay is not None and not self.agent.learner.batch:
+            raise ValueError(f"Повтор опыта не поддерживается алгоритмом {self.agent.learner.name}")
+        self.replay = replay
+        self.batch_size = batch_size
+        self.replay_every = replay_every
+
+        # Поток карт (например, maps.layout_stream): каждый эпизод - новая
+        # карта того же размера и с тем же числом ключей
+        if layouts is not None and kernel:
+            raise ValueError("Случайные карты не поддерживаются ядром обучения")
+        self.layouts = iter(layouts) if layouts is not None else None
+
+        # Скомпилированное ядро обучения (numba, если установлена): только Q-обучение
+        self.kernel = None
+        if kernel:
+            if self.agent.learner.name != "q_learning":
+                raise ValueError(f"Ядро обучения поддерживает только Q-обучение, "
+                                 f"а не {self.agent.learner.name}")
+            if self.agent.exploration.name != "step":
+                raise ValueError(f"Ядро обучения уменьшает epsilon после каждого шага "
+                                 f"и не поддерживает исследование {self.agent.exploration.name}")
+            from .kernel import QLearningKernel
+            self.kernel = QLearningKernel(self.agent, self.env.tables, seed=seed)
+
+        # Статистика (RollingStats переживает вызовы train и контрольные точки)
+        self.total_episodes = 0
+        self.perfect_episodes = 0  # Эпизоды со всеми ключами и сокровищем
+        self.stats = RollingStats()
+        self.evaluation = None  # Последняя оценка жадной политики (evaluation.evaluate)
+
+    def run_episode(self):
+        """Один эпизод: (суммарная награда, успех, собранные ключи)"""
+        agent = self.agent
+        env = self.env
+        replay = self.replay if self.training else None
+        state = env.reset() if self.layouts is None else env.reset(next(self.layouts))
+        agent.start_episode()
+        # SARSA нужно следующее действие до обновления: оно выбирается заранее
+        on_policy = self.training and agent.learner.on_policy
+        next_action = agent.get_action_index(state, self.training) if on_policy else None
+        done = False
+        total_reward = 0
+
+        while not done:
+            action = next_action if on_policy else agent.get_action_index(state, self.training)
+            next_state, reward, done = env.step(action)
+            if on_policy and not env.terminated:
+                next_action = agent.get_action_index(next_state, self.training)
+
+            if self.training:
+                agent.update_index(state, action, reward, next_state, env.terminated, next_action)
+            if replay is not None:
+                replay.add(state, action, reward, next_state, env.terminated)
+                if env.steps % self.replay_every == 0:
+                    replay.replay(agent, self.batch_size)
+
+            state = next_state
+            total_reward += reward
+
+        # Успех = сокровище + ВСЕ ключи
+        success = 1 if env.success else 0
+
+        self.total_episodes += 1
+        if success:
+            self.perfect_episodes += 1
+
+        return total_reward, success, env.keys_collected
+
+    def run_episodes(self, episodes):
+        """Пачка эпизодов: массивы (награды, успехи, собранные ключи)"""
+        if self.kernel is not None and self.training:
+            rewards, successes, keys_collected = self.kernel.run(episodes)
+            self.total_episodes += episodes
+            self.perfect_episodes += int(successes.sum())
+            return rewards, successes, keys_collected
+
+        results = [self.run_episode() for _ in range(episodes)]
+        rewards, successes, keys = zip(*results)
+        return (np.array(rewards, dtype=self.env.tables.reward_dtype),
+                np.array(successes, dtype=np.int64), np.array(keys, dtype=np.int64))
+
+    def train(self, episodes, callback=None, report_every=1000, checkpoint=None,
+              checkpoint_every=None, evaluate_every=None):
+        """Обучение на заданном числе эпизодов.
+
+        callback(trainer, summary) вызывается каждые report_every эпизодов и
+        в конце; если он вернет False, обучение останавливается. checkpoint -
+        путь контрольной точки: она сохраняется в конце и, если задан
+        checkpoint_every, не реже чем через столько эпизодов (по границам
+        report_every). evaluate_every - так же часто оценивать жадную
+        политику по всем стартовым клеткам (self.evaluation, в сводке -
+        'greedy_success_rate'). 'epsilon' в сводке - None, если способ
+        исследования его не использует; 'exploration' - его параметр для вывода.
+        """
+        stats = self.stats
+        first = stats.episodes
+        saved = evaluated = first
+        start = time.perf_counter()
+        summary = self._summary(stats, start, first)
+
+        for begin in range(0, episodes, report_every):
+            stats.extend(*self.run_episodes(min(report_every, episodes - begin)))
+
+            if checkpoint and checkpoint_every and stats.episodes - saved >= checkpoint_every:
+                self.save_checkpoint(checkpoint)
+                saved = stats.episodes
+            if evaluate_every and stats.episodes - evaluated >= evaluate_every:
+                self.evaluate()
+                evaluated = stats.episodes
+            summary = self._summary(stats, start, first)
+            if callback is not None and callback(self, summary) is False:
+                break
+
+        if checkpoint and stats.episodes > saved:
+            self.save_checkpoint(checkpoint)
+        return summary
+
+    def evaluate(self, layouts=None):
+        """Оценка жадной политики без исследования (см. evaluation.evaluate)"""
+        from .evaluation import evaluate
+        self.evaluation = evaluate(self.agent.q_table, self.env.tables, layouts)
+        return self.evaluation
+
+    def save_checkpoint(self, path):
+        """Контрольная точка: агент, счетчики, карта и статистика"""
+        from .checkpoint import save_checkpoint
+        save_checkpoint(path, self.agent, self, self.stats)
+
+    def load_checkpoint(self, path, mmap_mode=None):
+        """Продолжение обучения с контрольной точки этой же карты.
+
+        mmap_mode - см. checkpoint.load_checkpoint; при обучении 'r'
+        заменяется на 'c': файл только читается, обновленные страницы
+        таблицы копируются в память.
+        """
+        from .checkpoint import load_checkpoint
+        if self.training and mmap_mode == 'r':
+            mmap_mode = 'c'
+        load_checkpoint(path, self.agent, self, self.stats, mmap_mode)
+
+    def _summary(self, stats, start, first=0):
+        """Сводка по последним stats.window эпизодам (RollingStats).
+
+        first - сколько эпизодов было в stats до начала этого запуска.
+        """
+        elapsed = time.perf_counter() - start
+        return {
+            'episodes': stats.episodes,
+            'total_episodes': self.total_episodes,
+            'avg_reward': stats.avg_reward,
+            'success_rate': stats.success_rate,
+            'avg_keys': stats.avg_keys,
+            'perfect_episodes': self.perfect_episodes,
+            'epsilon': self.agent.epsilon if self.agent.exploration.uses_epsilon else None,
+            'exploration': self.agent.exploration.describe(self.agent),
+            'elapsed': elapsed,
+            'episodes_per_sec': (stats.episodes - first) / elapsed if elapsed > 0 else 0.0,
+            'greedy_success_rate': (self.evaluation['success_rate']
+                                    if self.evaluation is not None else None),
+        }
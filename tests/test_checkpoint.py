@@ -0,0 +1,91 @@
+import os
+import stat
+
+import numpy as np
+import pytest
+
+from intelligame_ai import checkpoint
+from intelligame_ai.checkpoint import load_checkpoint
+from intelligame_ai.core import CompactKeysEnvironment, KeyPriorityAgent, SparseQTable
+from intelligame_ai.maps import generate_layout
+from intelligame_ai.trainer import Trainer
+
+def trained(storage, episodes=300):
+    trainer = Trainer(KeyPriorityAgent(storage=storage), seed=0)
+    trainer.train(episodes, report_every=100)
+    return trainer
+
+def same_table(a, b):
+    if isinstance(a, SparseQTable):
+        (states_a, rows_a), (states_b, rows_b) = a.items(), b.items()
+        return np.array_equal(states_a, states_b) and np.array_equal(rows_a, rows_b)
+    return a.dtype == b.dtype and np.array_equal(a, b)
+
+@pytest.mark.parametrize("storage", ["dense", "float16", "sparse"])
+@pytest.mark.parametrize("mmap_mode", [None, "r", "c"])
+def test_save_load_resume(tmp_path, storage, mmap_mode):
+    trainer = trained(storage)
+    path = tmp_path / "model.ckpt"
+    trainer.save_checkpoint(path)
+    saved = path.read_bytes()
+
+    resumed = Trainer(KeyPriorityAgent(storage=storage))
+    resumed.load_checkpoint(path, mmap_mode)
+    assert same_table(resumed.agent.q_table, trainer.agent.q_table)
+    assert resumed.agent.epsilon == trainer.agent.epsilon
+    assert resumed.total_episodes == trainer.total_episodes
+    assert resumed.stats.avg_reward == trainer.stats.avg_reward
+    assert resumed.stats.success_rate == trainer.stats.success_rate
+
+    resumed.train(200, report_every=100)
+    assert resumed.total_episodes == trainer.total_episodes + 200
+    assert not same_table(resumed.agent.q_table, trainer.agent.q_table)
+    assert path.read_bytes() == saved
+
+@pytest.mark.parametrize("storage", ["dense", "sparse"])
+def test_read_only_mmap(tmp_path, storage):
+    trainer = trained(storage, 50)
+    path = tmp_path / "model.ckpt"
+    trainer.save_checkpoint(path)
+
+    agent = load_checkpoint(path, mmap_mode='r')
+    table = agent.q_table
+    assert isinstance(table.data if storage == "sparse" else table, np.memmap)
+    state = next(iter(table.index)) if storage == "sparse" else 0
+    with pytest.raises(ValueError):
+        table[state, 0] = 1.0
+
+def test_rejects_damaged_files(tmp_path):
+    path = tmp_path / "model.ckpt"
+    trained("dense", 50).save_checkpoint(path)
+    data = path.read_bytes()
+    damaged = {
+        'truncated': data[:-100],
+        'short_header': data[:20],
+        'short_prefix': data[:10],
+        'magic': b"XXXXXXXX" + data[8:],
+        'version': data.replace(b'"version": 1', b'"version": 9', 1),
+        'header': data[:16] + b"\xff" * 20 + data[36:],
+    }
+    for name, content in damaged.items():
+        bad = tmp_path / f"{name}.ckpt"
+        bad.write_bytes(content)
+        with pytest.raises(ValueError):
+            Trainer().load_checkpoint(bad)
+
+def test_rejects_other_map(tmp_path):
+    path = tmp_path / "model.ckpt"
+    trained("dense", 50).save_checkpoint(path)
+    tables = generate_layout(6, 3, 2, seed=1).get_tables()
+    trainer = Trainer(KeyPriorityAgent.for_env(tables), CompactKeysEnvironment(tables))
+    with pytest.raises(ValueError, match="другой карты"):
+        trainer.load_checkpoint(path)
+
+@pytest.mark.skipif(os.name == "nt", reason="в Windows папку нельзя открыть для fsync")
+def test_atomic_write_syncs_directory(tmp_path, monkeypatch):
+    modes = []
+    fsync = os.fsync
+    monkeypatch.setattr(checkpoint.os, "fsync", lambda fd: modes.append(os.fstat(fd).st_mode) or fsync(fd))
+    trained("dense", 10).save_checkpoint(tmp_path / "model.ckpt")
+    assert any(stat.S_ISDIR(mode) for mode in modes)
+    assert os.listdir(tmp_path) == ["model.ckpt"]
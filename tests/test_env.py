@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from intelligame_ai.core import (DEFAULT_KEYS, CompactKeysEnvironment, EnvironmentTables,
+                                 KeyPriorityAgent, LazyEnvironmentTables,
+                                 MandatoryKeysEnvironment, VectorMandatoryKeysEnvironment)
+from intelligame_ai.shaping import LEGACY, POTENTIAL
+
+class BaselineEnvironment:
+    """Правила исходной среды (стандартная карта 6x6) - эталон наград и переходов"""
+    def reset(self):
+        self.agent_pos = [0, 0]
+        self.treasure_pos = [5, 5]
+        self.keys = [[1, 2], [3, 1], [4, 4]]
+        self.traps = [[2, 3], [5, 2]]
+        self.collected_keys = []
+        self.steps = 0
+        self.done = False
+        self.has_all_keys = False
+
+    def step(self, action):
+        """(награда, штраф по лимиту шагов): исходная среда штраф не возвращала"""
+        self.steps += 1
+        new_pos = self.agent_pos.copy()
+        if action == 0 and new_pos[0] > 0:
+            new_pos[0] -= 1
+        elif action == 1 and new_pos[0] < 5:
+            new_pos[0] += 1
+        elif action == 2 and new_pos[1] > 0:
+            new_pos[1] -= 1
+        elif action == 3 and new_pos[1] < 5:
+            new_pos[1] += 1
+
+        if new_pos in self.traps:
+            reward = -100
+            self.done = True
+        elif new_pos in self.keys:
+            reward = 50
+            self.collected_keys.append(new_pos.copy())
+            self.keys.remove(new_pos)
+            if len(self.collected_keys) == 3:
+                reward += 100
+                self.has_all_keys = True
+        elif new_pos == self.treasure_pos:
+            reward = 500 + len(self.collected_keys) * 100 if self.has_all_keys else -200
+            self.done = True
+        elif not self.has_all_keys:
+            new_dist = min(abs(key[0] - new_pos[0]) + abs(key[1] - new_pos[1]) for key in self.keys)
+            old_dist = abs(self.agent_pos[0] - new_pos[0]) + abs(self.agent_pos[1] - new_pos[1])
+            reward = 3 if new_dist < old_dist else -2 if new_dist > old_dist else -1
+        else:
+            old_dist = abs(self.agent_pos[0] - 5) + abs(self.agent_pos[1] - 5)
+            new_dist = abs(new_pos[0] - 5) + abs(new_pos[1] - 5)
+            reward = 5 if new_dist < old_dist else -3
+        self.agent_pos = new_pos
+
+        penalty = 0
+        if self.steps >= (50 if self.has_all_keys else 100):
+            self.done = True
+            if not self.has_all_keys:
+                penalty = -50
+            elif new_pos != self.treasure_pos:
+                penalty = -30
+        return reward, penalty
+
+def test_matches_baseline_environment():
+    env = MandatoryKeysEnvironment(gym_api=True)
+    baseline = BaselineEnvironment()
+    agent = KeyPriorityAgent()
+    rng = random.Random(0)
+    for _ in range(300):
+        env.reset()
+        baseline.reset()
+        done = False
+        while not done:
+            action = rng.randrange(4)
+            state, reward, terminated, truncated, _ = env.step(action)
+            expected, penalty = baseline.step(action)
+            assert reward == expected + (penalty if truncated else 0)
+            assert state['agent_pos'] == baseline.agent_pos
+            assert state['collected_keys'] == baseline.collected_keys
+            assert terminated or truncated == baseline.done
+            done = terminated or truncated
+
+            # Состояние - позиция * 2**3 + маска именно тех ключей, что собраны
+            mask = sum(1 << DEFAULT_KEYS.index(key) for key in baseline.collected_keys)
+            pos = baseline.agent_pos[0] * 6 + baseline.agent_pos[1]
+            assert agent.get_state_index(state) == pos * 8 + mask
+
+@pytest.mark.parametrize("shaping", [LEGACY, POTENTIAL])
+@pytest.mark.parametrize("layout_seed", [None, 1])
+def test_environments_match_step_for_step(shaping, layout_seed):
+    def make_env():
+        if layout_seed is None:
+            return MandatoryKeysEnvironment(gym_api=True, shaping=shaping)
+        return MandatoryKeysEnvironment.with_random_layout(7, 3, 4, seed=layout_seed,
+                                                           gym_api=True, shaping=shaping)
+
+    n = 4
+    scalar = [make_env() for _ in range(n)]
+    tables = EnvironmentTables(scalar[0])
+    compact = [CompactKeysEnvironment(tables) for _ in range(n)]
+    lazy = [CompactKeysEnvironment(LazyEnvironmentTables(scalar[0])) for _ in range(n)]
+    vector = VectorMandatoryKeysEnvironment(n, tables)
+    agent = KeyPriorityAgent.for_env(tables)
+    rng = random.Random(0)
+
+    finished = 0
+    for _ in range(3000):
+        actions = [rng.randrange(4) for _ in range(n)]
+        states, rewards, done, info = vector.step(actions)
+        for i, env in enumerate(scalar):
+            state, reward, terminated, truncated, env_info = env.step(actions[i])
+            for other in (compact[i], lazy[i]):
+                other_state, other_reward, other_done = other.step(actions[i])
+                assert other_state == agent.get_state_index(state)
+                assert other_reward == reward
+                assert (other.terminated, other.truncated) == (terminated, truncated)
+                assert other_done == (terminated or truncated)
+            assert rewards[i] == reward
+            assert (info['terminated'][i], info['truncated'][i]) == (terminated, truncated)
+            assert done[i] == (terminated or truncated)
+            if done[i]:
+                assert info['success'][i] == env_info['success']
+                assert info['keys_collected'][i] == env_info['keys_collected']
+                assert info['episode_reward'][i] == env.total_reward
+                assert info['episode_steps'][i] == env.steps
+                # Векторная среда уже сбросила эпизод
+                state, _ = env.reset()
+                for other in (compact[i], lazy[i]):
+                    other.reset()
+                finished += 1
+            assert states[i] == agent.get_state_index(state)
+    assert finished > 100
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from intelligame_ai import kernel
+from intelligame_ai.core import KeyPriorityAgent
+from intelligame_ai.kernel import QLearningKernel, check_parity
+from intelligame_ai.maps import generate_layout
+
+@pytest.mark.parametrize("storage", ["dense", "float32"])
+def test_numba_matches_python(storage):
+    pytest.importorskip("numba")
+    assert check_parity(episodes=300, seed=0, storage=storage)
+    tables = generate_layout(10, 3, 8, seed=2).get_tables()
+    assert check_parity(episodes=1000, seed=0, storage=storage, tables=tables)
+
+def test_python_kernel_without_numba(monkeypatch):
+    monkeypatch.setattr(kernel, "HAVE_NUMBA", False)
+    with pytest.raises(ImportError):
+        QLearningKernel(KeyPriorityAgent(), seed=0, use_numba=True)
+
+    agents = []
+    for _ in range(2):
+        agent = KeyPriorityAgent()
+        trainer = QLearningKernel(agent, seed=0)
+        assert not trainer.use_numba
+        trainer.run(300)
+        agents.append(agent)
+    assert np.array_equal(agents[0].q_table, agents[1].q_table)
+    assert agents[0].epsilon == agents[1].epsilon
@@ -0,0 +1,69 @@
+import pytest
+
+from intelligame_ai.core import KeyPriorityAgent
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+def make_agent(learner, **params):
+    agent = KeyPriorityAgent(learner=learner, **params)
+    agent.learning_rate = 0.5
+    agent.gamma = 0.9
+    agent.epsilon = 0.2
+    agent.q_table[5] = [1.0, 3.0, 2.0, 0.0]
+    return agent
+
+@pytest.mark.parametrize("learner, expected", [
+    ("q_learning", 0.5 * (2 + 0.9 * 3)),
+    ("sarsa", 0.5 * (2 + 0.9 * 2)),
+    ("expected_sarsa", 0.5 * (2 + 0.9 * (0.8 * 3 + 0.2 * 1.5))),
+])
+def test_one_step_update(learner, expected):
+    agent = make_agent(learner)
+    agent.learner.update(0, 1, 2, 5, False, next_action=2)
+    assert agent.q_table[0, 1] == pytest.approx(expected)
+
+    agent.learner.update(0, 3, 2, 5, True, next_action=2)
+    assert agent.q_table[0, 3] == pytest.approx(1.0)
+
+def test_sarsa_needs_next_action():
+    with pytest.raises(ValueError):
+        make_agent("sarsa").learner.update(0, 1, 2, 5, False)
+
+def test_double_q_keeps_b_as_twice_q_minus_a():
+    agent = make_agent("double_q")
+    learner = agent.learner
+    learner.table_a[5] = [4.0, 0.0, 0.0, 0.0]  # B[5] = 2 * Q - A = [-2, 6, 4, 0]
+
+    # A выбирает действие 0, B его оценивает: -2
+    agent.rng = FixedRandom(0.1)
+    learner.update(0, 1, 2, 5, False)
+    assert learner.table_a[0, 1] == pytest.approx(0.5 * (2 + 0.9 * -2))
+    assert agent.q_table[0, 1] == pytest.approx(0.5 * (2 + 0.9 * -2) / 2)
+    assert 2 * agent.q_table[0, 1] - learner.table_a[0, 1] == pytest.approx(0.0)
+
+    # B выбирает действие 1, A его оценивает: 0
+    agent.rng = FixedRandom(0.9)
+    learner.update(0, 2, 2, 5, False)
+    assert learner.table_a[0, 2] == 0.0
+    assert 2 * agent.q_table[0, 2] - learner.table_a[0, 2] == pytest.approx(0.5 * 2)
+
+def test_q_lambda_keeps_traces_on_ties():
+    agent = make_agent("q_lambda", trace_decay=0.3)
+    learner = agent.learner
+    learner.start_episode()
+    learner.update(0, 2, 0, 1, False)
+    learner.update(1, 3, 1, 2, False)  # Все Q(1, .) равны: действие 3 тоже жадное
+    assert agent.q_table[1, 3] == pytest.approx(0.5)
+    assert agent.q_table[0, 2] == pytest.approx(0.5 * 0.9 * 0.3)
+
+    # Исследовательское действие обрывает следы
+    agent.q_table[2] = [1.0, 0.0, 0.0, 0.0]
+    before = agent.q_table[0, 2]
+    learner.update(2, 1, 1, 3, False)
+    assert agent.q_table[0, 2] == before
+    assert agent.q_table[2, 1] == pytest.approx(0.5)
@@ -0,0 +1,12 @@
+import pytest
+
+from intelligame_ai.core import KeyPriorityAgent
+from intelligame_ai.parallel import AVERAGE, HOGWILD, ParallelTrainer
+
+@pytest.mark.parametrize("mode", [HOGWILD, AVERAGE])
+@pytest.mark.parametrize("episodes", [103, 3])
+def test_runs_exactly_requested_episodes(mode, episodes):
+    trainer = ParallelTrainer(KeyPriorityAgent(), workers=4, mode=mode, sync_every=10, seed=0)
+    trainer.train(episodes, report_every=50)
+    assert trainer.total_episodes == episodes
+    assert trainer.agent.exploration.episode == -(-episodes // 4)
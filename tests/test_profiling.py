@@ -0,0 +1,25 @@
+import pytest
+
+from intelligame_ai.profiling import PROFILER, PROFILER_OVERHEAD
+from intelligame_ai.trainer import Trainer
+
+@pytest.fixture
+def profiler():
+    PROFILER.enable()
+    yield PROFILER
+    PROFILER.disable()
+
+def test_wrapper_cost_is_reported_separately(profiler):
+    Trainer(seed=0).train(300, report_every=100)
+    stats = profiler.stats()
+    assert profiler.call_cost > 0
+    assert stats['counters']['episodes'] == 300
+    assert {'environment', 'learner', 'loop_overhead', PROFILER_OVERHEAD} <= stats['shares'].keys()
+    assert sum(stats['shares'].values()) == pytest.approx(100)
+    assert stats['bound_by'] != PROFILER_OVERHEAD
+
+def test_disable_restores_methods(profiler):
+    step = Trainer.run_episode
+    profiler.disable()
+    assert Trainer.run_episode is not step
+    assert not hasattr(Trainer.run_episode, '__wrapped__')
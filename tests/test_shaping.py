@@ -0,0 +1,41 @@
+import numpy as np
+
+from intelligame_ai.core import CompactKeysEnvironment, KeyPriorityAgent, MandatoryKeysEnvironment
+from intelligame_ai.maps import generate_layout
+from intelligame_ai.shaping import POTENTIAL, STEP_COST
+from intelligame_ai.trainer import Trainer
+
+def test_failure_terminals_never_rewarded():
+    layout = generate_layout(128, 2, 200, seed=3)
+    for gamma in (0.5, 0.9, 0.99):
+        tables = layout.get_tables(POTENTIAL, shaping_gamma=gamma)
+        failed = tables.terminal & ~tables.success
+        assert failed.any()
+        assert (tables.reward[failed] <= 0).all()
+        assert (tables.timeout_reward[failed] <= 0).all()
+
+def test_scalar_trap_step_not_rewarded():
+    layout = generate_layout(128, 2, 200, seed=3)
+    trap = layout.traps[0]
+    start = [trap[0] - 1, trap[1]] if trap[0] > 0 else [trap[0] + 1, trap[1]]
+    config = dict(layout.config(), start_pos=start)
+    env = MandatoryKeysEnvironment(gym_api=True, shaping=POTENTIAL, **config)
+    env.reset()
+    _, reward, terminated, _, _ = env.step(1 if trap[0] > 0 else 0)
+    assert terminated and reward <= -100
+
+def test_trainer_takes_gamma_from_agent():
+    env = CompactKeysEnvironment(generate_layout(8, 2, 4, seed=1).get_tables(POTENTIAL))
+    agent = KeyPriorityAgent.for_env(env.tables)
+    agent.gamma = 0.5
+    tables = Trainer(agent, env).env.tables
+    assert tables.shaping_gamma == 0.5
+
+    # Обычные шаги: STEP_COST + gamma * Phi(s') - Phi(s)
+    potential = tables.layout.shaping.potential
+    states = np.arange(tables.n_states)[:, None]
+    following = tables.next_state
+    plain = ~tables.terminal & (following % tables.n_masks == states % tables.n_masks)
+    expected = (STEP_COST - potential[states % tables.n_masks, states // tables.n_masks]
+                + 0.5 * potential[following % tables.n_masks, following // tables.n_masks])
+    assert np.allclose(tables.reward[plain], expected[plain])
@@ -0,0 +1,25 @@
+import numpy as np
+
+from intelligame_ai.stats import RollingStats
+
+def test_rolling_sums_do_not_drift():
+    # Выброс поглощает мелкие награды в сумме и уходит из окна, оставляя ошибку
+    stats = RollingStats(window=100)
+    stats.add(1e17, 1.0, 3)
+    for _ in range(299):
+        stats.add(1.5, 0.0, 1)
+    assert stats.sums == [150.0, 0.0, 100.0]
+    assert stats.avg_reward == 1.5
+
+def test_add_matches_extend():
+    rng = np.random.default_rng(1)
+    rewards = rng.normal(0, 100, 5000)
+    successes = rng.random(5000) < 0.5
+    keys = rng.integers(0, 4, 5000)
+    one, batch = RollingStats(window=100, history_size=64), RollingStats(window=100, history_size=64)
+    for values in zip(rewards, successes, keys):
+        one.add(*values)
+    batch.extend(rewards, successes, keys)
+    assert np.allclose(one.sums, batch.sums)
+    assert one.stride == batch.stride
+    assert np.allclose(one.history[:one.history_len], batch.history[:batch.history_len])